@@ -3,16 +3,231 @@ EduSynapse CrewAI Orchestrator
 Manages the multi-agent workflow for adaptive learning
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from functools import lru_cache
 from loguru import logger
+from pydantic import TypeAdapter
+from tenacity import AsyncRetrying, RetryCallState, stop_after_attempt, wait_random_exponential
+from contextlib import contextmanager
 import asyncio
+import httpx
+import importlib.util
+import re
+import copy
 import random
+import time
+
+try:
+    from google import genai
+    from google.genai import errors as genai_errors
+    from google.genai import types as genai_types
+    HAS_GENAI = True
+except ImportError:
+    HAS_GENAI = False
+    genai = None
+    genai_errors = None
+    genai_types = None
 
 from app.config import settings, LLMConfig
 from app.agents.query_analysis_agent import QueryAnalysisAgent
 from app.agents.information_retrieval_agent import InformationRetrievalAgent
 from app.agents.question_generation_agent import QuestionGenerationAgent
 from app.agents.feedback_agent import FeedbackAgent
+from app.models.session import LearningSession, SessionInteraction
+from app.services.adaptive_engine import AdaptiveEngine
+from app.utils.semantic_cache import SemanticCache
+
+# Precompiled serializer for session interactions (faster than per-item model_dump)
+_interactions_adapter = TypeAdapter(List[SessionInteraction])
+
+# Question sources the generator falls back to when the LLM fails; never cached
+_FALLBACK_QUESTION_SOURCES = frozenset({"academic_template", "rule_based"})
+
+# Difficulty adjustment keyed by (is_correct, understanding beyond threshold):
+# correct with >80 understanding steps up, incorrect with <40 steps down
+_DIFF_ADJUST = {
+    (True, True): AdaptiveEngine._increase_difficulty,
+    (False, True): AdaptiveEngine._decrease_difficulty,
+}
+
+
+def _is_fallback_question(question: Dict[str, Any]) -> bool:
+    """Whether a question is filler from the template/rule banks rather than the LLM"""
+    return question.get("source") in _FALLBACK_QUESTION_SOURCES
+
+
+def _retrieval_seed(topic: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stand-in query analysis for a retrieval started before the real one is known
+    
+    Uses the session's difficulty and detected subject rather than retrieval's
+    "medium"/"General" defaults, so the knowledge base is filtered for the learner.
+    """
+    return {
+        "topic": {
+            "main": topic,
+            "subject": context.get("detected_subject") or "General",
+        },
+        "recommendations": {
+            "suggested_difficulty": context.get("preferred_difficulty") or context.get("current_difficulty", "medium"),
+        },
+    }
+
+
+@contextmanager
+def _stage(agent_statuses: Dict[str, Any], name: str):
+    """Mark a pipeline stage as processing, then completed with its processing time (ms)"""
+    status = agent_statuses[name]
+    status["status"] = "processing"
+    start = time.perf_counter_ns()
+    yield status
+    status["processingTime"] = (time.perf_counter_ns() - start) // 1_000_000
+    status["status"] = "completed"
+
+
+# Fallback for non-Gemini errors (e.g. Tavily) that only carry a message
+_RATE_LIMIT_RE = re.compile(r"429|Too Many Requests|quota|rate limit", re.IGNORECASE)
+_exponential_wait = wait_random_exponential(multiplier=2, max=60)
+
+
+def _is_rate_limited(exc: BaseException) -> bool:
+    """Whether an exception signals a rate-limit / quota error"""
+    if HAS_GENAI and isinstance(exc, genai_errors.APIError):
+        return exc.code == 429
+    return _RATE_LIMIT_RE.search(str(exc)) is not None
+
+
+def _retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read the Retry-After header from an API error response, if present"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Backoff between attempts: immediate after timeouts, long for rate limits, else exponential"""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, asyncio.TimeoutError):
+        return 0
+    if exc is not None and _is_rate_limited(exc):
+        retry_after = _retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(retry_after, 120)
+        return min(max(55, settings.crewai_timeout), 120) + random.uniform(0, 5)
+    return _exponential_wait(retry_state)
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    """Log a failed attempt before backing off"""
+    exc = retry_state.outcome.exception()
+    sleep_for = retry_state.next_action.sleep if retry_state.next_action else 0
+    if isinstance(exc, asyncio.TimeoutError):
+        logger.warning(f"[Crew] Timeout on attempt {retry_state.attempt_number}")
+    else:
+        logger.warning(f"[Crew] Error on attempt {retry_state.attempt_number}: {exc}")
+    if sleep_for:
+        logger.warning(f"[Crew] Backing off for {sleep_for:.1f}s before retry")
+
+
+# Keep-alive connection pool shared by every async LLM request in the process
+_shared_httpx: Optional[httpx.AsyncClient] = None
+# httpx multiplexes requests over HTTP/2 only when the optional h2 package is present
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@lru_cache(maxsize=1)
+def _resolve_llm_client():
+    """
+    Initialize the Gemini LLM client using google-genai SDK
+    
+    Resolved once per process and shared by every crew. Async calls go
+    through one pooled httpx client so connections are reused.
+    Returns a google.genai.Client instance, or None in template-only mode.
+    Agents use client.aio.models.generate_content() for async calls.
+    """
+    global _shared_httpx
+    
+    if not HAS_GENAI:
+        logger.error("[Crew] google-genai package not installed. Install with: pip install google-genai")
+        return None
+    
+    try:
+        provider, config = LLMConfig.get_active_provider()
+        logger.info(f"[Crew] Using LLM provider: {provider}, model: {config.get('model', 'unknown')}")
+        
+        _shared_httpx = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(settings.crewai_timeout),
+        )
+        client = genai.Client(
+            api_key=config["api_key"],
+            http_options=genai_types.HttpOptions(httpx_async_client=_shared_httpx),
+        )
+        logger.info(f"[Crew] Gemini client initialized successfully")
+        return client
+        
+    except ValueError as e:
+        logger.warning(f"LLM not configured: {e}. Running in template-only mode.")
+        return None
+    except Exception as e:
+        logger.error(f"Failed to initialize LLM client: {e}")
+        return None
+
+
+_cache_embedding_service = None
+
+
+def _cache_embedder():
+    """Embedding service for the semantic cache, reusing the knowledge base model when loaded"""
+    global _cache_embedding_service
+    from app.services.knowledge_base import KnowledgeBaseService
+    
+    service = KnowledgeBaseService.embedding_service
+    if service is None:
+        if _cache_embedding_service is None:
+            from app.utils.embeddings import EmbeddingService
+            _cache_embedding_service = EmbeddingService()
+        service = _cache_embedding_service
+    return service
+
+
+async def _embed_for_cache(text: str):
+    """Embed one text for the semantic cache"""
+    return await _cache_embedder().embed_text(text)
+
+
+async def _embed_batch_for_cache(texts: List[str]):
+    """Embed many texts for the semantic cache in one model call"""
+    return await _cache_embedder().embed_texts(texts)
+
+
+# Generated questions, reused for near-duplicate topics under the same model, difficulty, type and count
+_question_cache = SemanticCache(
+    _embed_for_cache,
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.semantic_cache_ttl,
+    embed_batch_fn=_embed_batch_for_cache
+)
+
+# LLM query analyses, reused for near-duplicate learner inputs under the same topic and profile
+_analysis_cache = SemanticCache(
+    _embed_for_cache,
+    threshold=settings.query_analysis_cache_threshold,
+    ttl=settings.semantic_cache_ttl,
+    embed_batch_fn=_embed_batch_for_cache
+)
+
+# Background prefetch runs one at a time so it never crowds out live requests
+_prefetch_semaphore = asyncio.Semaphore(1)
+_PREFETCH_COUNT = 3
 
 
 class EduSynapseCrew:
@@ -30,11 +245,14 @@ class EduSynapseCrew:
         """Initialize the crew with all agents"""
         
         # Get LLM client based on configuration
-        self.llm_client = self._initialize_llm_client()
-        logger.info(f"[Crew] LLM client initialized: {self.llm_client is not None}, type: {type(self.llm_client)}")
+        self.llm_client = _resolve_llm_client()
+        logger.opt(lazy=True).debug("[Crew] LLM client initialized: {}, type: {}", lambda: self.llm_client is not None, lambda: type(self.llm_client))
         
         # Initialize agents
-        self.query_agent = QueryAnalysisAgent(llm_client=self.llm_client)
+        self.query_agent = QueryAnalysisAgent(
+            llm_client=self.llm_client,
+            analysis_cache=_analysis_cache if settings.semantic_cache_enabled else None
+        )
         self.retrieval_agent = InformationRetrievalAgent(
             llm_client=self.llm_client,
             knowledge_service=None  # Will use static method
@@ -42,35 +260,11 @@ class EduSynapseCrew:
         self.question_agent = QuestionGenerationAgent(llm_client=self.llm_client)
         self.feedback_agent = FeedbackAgent(llm_client=self.llm_client)
         
-        logger.info("EduSynapse Crew initialized")
-    
-    def _initialize_llm_client(self):
-        """
-        Initialize the Gemini LLM client using google-genai SDK
+        self.qgen_cache = _question_cache
+        self._prefetch_semaphore = _prefetch_semaphore
+        self._prefetch_tasks = set()
         
-        Returns a google.genai.Client instance.
-        Agents use client.aio.models.generate_content() for async calls.
-        """
-        
-        try:
-            provider, config = LLMConfig.get_active_provider()
-            logger.info(f"[Crew] Using LLM provider: {provider}, model: {config.get('model', 'unknown')}")
-            
-            from google import genai
-            
-            client = genai.Client(api_key=config["api_key"])
-            logger.info(f"[Crew] Gemini client initialized successfully")
-            return client
-            
-        except ImportError:
-            logger.error("[Crew] google-genai package not installed. Install with: pip install google-genai")
-            return None
-        except ValueError as e:
-            logger.warning(f"LLM not configured: {e}. Running in template-only mode.")
-            return None
-        except Exception as e:
-            logger.error(f"Failed to initialize LLM client: {e}")
-            return None
+        logger.info("EduSynapse Crew initialized")
     
     async def execute(
         self,
@@ -93,12 +287,13 @@ class EduSynapseCrew:
         Returns:
             Combined output from all agents
         """
-        context = context or {}
-        context.update({
+        # Copy rather than mutate the caller's dict
+        context = {
+            **(context or {}),
             "user_id": user_id,
             "session_id": session_id,
             "input_modality": modality,
-        })
+        }
         
         result = {
             "status": "success",
@@ -107,22 +302,37 @@ class EduSynapseCrew:
         }
         
         try:
-            # Stage 1: Query Analysis
+            # Stage 1: Query Analysis, with a speculative local knowledge base
+            # search on the session topic running alongside it (no paid Tavily calls)
             logger.info(f"[Crew] Starting Query Analysis for session {session_id}")
-            query_analysis = await self._execute_with_retry(
+            speculative_topic = context.get("topic") or user_input
+            analysis_task = asyncio.create_task(self._execute_with_retry(
                 self.query_agent.analyze,
                 user_input,
                 context
-            )
+            ))
+            speculative_task = asyncio.create_task(self.retrieval_agent.retrieve_local(
+                _retrieval_seed(speculative_topic, context),
+                context
+            ))
+            
+            try:
+                query_analysis = await analysis_task
+            except Exception:
+                speculative_task.cancel()
+                raise
             result["query_analysis"] = query_analysis
             result["agents_executed"].append("query_analysis")
             
-            # Stage 2: Information Retrieval
+            # Stage 2: Information Retrieval with the full analysis; the
+            # speculative local results are reused only if the analysis
+            # searches with the same topic, difficulty and subtopics
             logger.info(f"[Crew] Starting Information Retrieval for session {session_id}")
             retrieved_content = await self._execute_with_retry(
                 self.retrieval_agent.retrieve,
                 query_analysis,
-                context
+                context,
+                local=await self._speculative_result(speculative_task)
             )
             result["retrieved_content"] = retrieved_content
             result["agents_executed"].append("information_retrieval")
@@ -154,7 +364,6 @@ class EduSynapseCrew:
         Returns:
             Generated question with agent execution metadata
         """
-        import time
         agent_statuses = {
             "query_analysis": {"status": "pending", "processingTime": 0},
             "information_retrieval": {"status": "pending", "processingTime": 0},
@@ -173,61 +382,69 @@ class EduSynapseCrew:
             
             logger.info(f"[Crew] Starting question generation for session {session_id}, topic: '{topic}'")
             
-            # Stage 1: Analyze the topic/query
-            logger.info(f"[Crew] Stage 1: Query Analysis for topic '{query_input}'")
-            agent_statuses["query_analysis"]["status"] = "processing"
-            start_time = time.time()
-            
-            query_analysis = await self._execute_with_retry(
-                self.query_agent.analyze,
-                query_input,
-                context
-            )
-            
-            agent_statuses["query_analysis"]["processingTime"] = int((time.time() - start_time) * 1000)
-            agent_statuses["query_analysis"]["status"] = "completed"
-            logger.info(f"[Crew] Query Analysis complete: {query_analysis.get('topic', {})}")
-            
-            # Stage 2: Retrieve relevant content
-            logger.info(f"[Crew] Stage 2: Information Retrieval")
-            agent_statuses["information_retrieval"]["status"] = "processing"
-            start_time = time.time()
-            
-            retrieved_content = await self._execute_with_retry(
-                self.retrieval_agent.retrieve,
-                query_analysis,
-                context
-            )
-            
-            agent_statuses["information_retrieval"]["processingTime"] = int((time.time() - start_time) * 1000)
-            agent_statuses["information_retrieval"]["status"] = "completed"
-            logger.info(f"[Crew] Retrieved {len(retrieved_content.get('content_chunks', []))} content chunks")
+            use_cache = self._question_cache_usable(context)
+            cache_key = self._question_cache_key(context, 1)
+            if use_cache:
+                cached = await self.qgen_cache.get(
+                    cache_key,
+                    query_input,
+                    accept=lambda entry: session_id not in entry["sessions"]
+                )
+                if cached is not None:
+                    cached["sessions"].add(session_id)
+                    question = copy.deepcopy(cached["result"])
+                    question["agent_statuses"] = self._cache_hit_statuses(agent_statuses)
+                    logger.info(f"[Crew] Semantic cache hit for '{query_input}'")
+                    return question
+            
+            # Stage 1: Analyze the topic/query, starting a local knowledge base
+            # search as soon as the streamed analysis names the main topic
+            logger.debug("[Crew] Stage 1: Query Analysis for topic '{}'", query_input)
+            with _stage(agent_statuses, "query_analysis"):
+                query_analysis, early_retrieval = await self._analyze_with_early_retrieval(
+                    query_input,
+                    context
+                )
+            logger.opt(lazy=True).info("[Crew] Query Analysis complete: {}", lambda: query_analysis.get("topic", {}))
+            
+            # Stage 2: Retrieve relevant content with the full analysis
+            logger.debug("[Crew] Stage 2: Information Retrieval")
+            with _stage(agent_statuses, "information_retrieval"):
+                retrieved_content = await self._execute_with_retry(
+                    self.retrieval_agent.retrieve,
+                    query_analysis,
+                    context,
+                    local=await self._speculative_result(early_retrieval)
+                )
+            logger.opt(lazy=True).info("[Crew] Retrieved {} content chunks", lambda: len(retrieved_content.get("content_chunks", [])))
             
             # Stage 3: Generate question
-            logger.info(f"[Crew] Stage 3: Question Generation")
-            agent_statuses["question_generation"]["status"] = "processing"
-            start_time = time.time()
-            
-            question = await self._execute_with_retry(
-                self.question_agent.generate_question,
-                retrieved_content,
-                query_analysis,
-                context
-            )
-            
-            agent_statuses["question_generation"]["processingTime"] = int((time.time() - start_time) * 1000)
-            agent_statuses["question_generation"]["status"] = "completed"
-            logger.info(f"[Crew] Question generated: {question.get('question_text', '')[:100]}...")
+            logger.debug("[Crew] Stage 3: Question Generation")
+            with _stage(agent_statuses, "question_generation"):
+                question = await self._execute_with_retry(
+                    self.question_agent.generate_question,
+                    retrieved_content,
+                    query_analysis,
+                    context
+                )
+            logger.opt(lazy=True).info("[Crew] Question generated: {}...", lambda: question.get("question_text", "")[:100])
             
             # Add source content IDs for tracking
             content_chunks = retrieved_content.get("content_chunks", [])
-            question["source_content_ids"] = [
-                c.get("content_id") for c in content_chunks if c.get("content_id")
-            ]
+            question["source_content_ids"] = tuple(
+                cid for c in content_chunks if (cid := c.get("content_id"))
+            )
             
             # Add agent execution metadata
             question["agent_statuses"] = agent_statuses
             
+            if use_cache and not _is_fallback_question(question):
+                await self.qgen_cache.set(cache_key, query_input, {
+                    "result": copy.deepcopy(question),
+                    "sessions": {session_id},
+                })
+                self._schedule_prefetch(query_input, query_analysis, retrieved_content, context)
+            
             return question
             
         except Exception as e:
@@ -259,7 +476,6 @@ class EduSynapseCrew:
         Returns:
             List of generated questions with agent execution metadata
         """
-        import time
         agent_statuses = {
             "query_analysis": {"status": "pending", "processingTime": 0},
             "information_retrieval": {"status": "pending", "processingTime": 0},
@@ -278,72 +494,88 @@ class EduSynapseCrew:
             
             logger.info(f"[Crew] Starting batch question generation ({count} questions) for session {session_id}, topic: '{topic}'")
             
-            # Stage 1: Analyze the topic/query (once)
-            logger.info(f"[Crew] Stage 1: Query Analysis for topic '{query_input}'")
-            agent_statuses["query_analysis"]["status"] = "processing"
-            start_time = time.time()
-            
-            query_analysis = await self._execute_with_retry(
-                self.query_agent.analyze,
-                query_input,
-                context
-            )
+            use_cache = self._question_cache_usable(context)
+            cache_key = self._question_cache_key(context, count)
+            if use_cache:
+                previously_asked = set(
+                    context.get("previous_attempts", {}).get("previously_asked_questions", [])
+                )
+                cached = await self.qgen_cache.get(
+                    cache_key,
+                    query_input,
+                    accept=lambda entry: session_id not in entry["sessions"] and not any(
+                        q.get("question_text") in previously_asked for q in entry["result"]
+                    )
+                )
+                if cached is not None:
+                    cached["sessions"].add(session_id)
+                    logger.info(f"[Crew] Semantic cache hit for '{query_input}' ({count} questions)")
+                    return {
+                        "questions": copy.deepcopy(cached["result"]),
+                        "agent_statuses": self._cache_hit_statuses(agent_statuses),
+                        "is_fallback": False
+                    }
             
-            agent_statuses["query_analysis"]["processingTime"] = int((time.time() - start_time) * 1000)
-            agent_statuses["query_analysis"]["status"] = "completed"
-            logger.info(f"[Crew] Query Analysis complete: {query_analysis.get('topic', {})}")
+            # Request more content chunks for multiple questions
+            retrieval_context = {**context, "max_chunks": max(10, count * 2)}
+            
+            # Stage 1: Analyze the topic/query (once), starting a local knowledge
+            # base search as soon as the streamed analysis names the main topic
+            logger.debug("[Crew] Stage 1: Query Analysis for topic '{}'", query_input)
+            with _stage(agent_statuses, "query_analysis"):
+                query_analysis, early_retrieval = await self._analyze_with_early_retrieval(
+                    query_input,
+                    context,
+                    retrieval_context
+                )
+            logger.opt(lazy=True).info("[Crew] Query Analysis complete: {}", lambda: query_analysis.get("topic", {}))
             
             # Save detected subject area for custom topics
             detected_subject = query_analysis.get("topic", {}).get("subject", "General")
             if is_custom and detected_subject:
                 # Update session context with detected subject
-                from app.models.session import LearningSession
                 session = await LearningSession.get(session_id) if session_id != "unknown" else None
                 if session:
                     session.session_context["detected_subject"] = detected_subject
                     await session.save()
             
             # Stage 2: Retrieve relevant content (once with more chunks)
-            logger.info(f"[Crew] Stage 2: Information Retrieval")
-            agent_statuses["information_retrieval"]["status"] = "processing"
-            start_time = time.time()
-            
-            # Request more content chunks for multiple questions
-            context["max_chunks"] = max(10, count * 2)
-            retrieved_content = await self._execute_with_retry(
-                self.retrieval_agent.retrieve,
-                query_analysis,
-                context
-            )
-            
-            agent_statuses["information_retrieval"]["processingTime"] = int((time.time() - start_time) * 1000)
-            agent_statuses["information_retrieval"]["status"] = "completed"
-            logger.info(f"[Crew] Retrieved {len(retrieved_content.get('content_chunks', []))} content chunks")
+            logger.debug("[Crew] Stage 2: Information Retrieval")
+            with _stage(agent_statuses, "information_retrieval"):
+                retrieved_content = await self._execute_with_retry(
+                    self.retrieval_agent.retrieve,
+                    query_analysis,
+                    retrieval_context,
+                    local=await self._speculative_result(early_retrieval)
+                )
+            logger.opt(lazy=True).info("[Crew] Retrieved {} content chunks", lambda: len(retrieved_content.get("content_chunks", [])))
             
             # Stage 3: Generate all questions at once
-            logger.info(f"[Crew] Stage 3: Batch Question Generation ({count} questions)")
-            agent_statuses["question_generation"]["status"] = "processing"
-            start_time = time.time()
-            
-            questions = await self._execute_with_retry(
-                self.question_agent.generate_batch_questions,
-                retrieved_content,
-                query_analysis,
-                context,
-                count
-            )
-            
-            agent_statuses["question_generation"]["processingTime"] = int((time.time() - start_time) * 1000)
-            agent_statuses["question_generation"]["status"] = "completed"
+            logger.debug("[Crew] Stage 3: Batch Question Generation ({} questions)", count)
+            with _stage(agent_statuses, "question_generation"):
+                questions = await self._execute_with_retry(
+                    self.question_agent.generate_batch_questions,
+                    retrieved_content,
+                    query_analysis,
+                    context,
+                    count
+                )
             logger.info(f"[Crew] Generated {len(questions)} questions")
             
             # Add source content IDs for tracking
             content_chunks = retrieved_content.get("content_chunks", [])
-            source_ids = [c.get("content_id") for c in content_chunks if c.get("content_id")]
+            # One immutable tuple shared by every question in the batch
+            source_ids = tuple(cid for c in content_chunks if (cid := c.get("content_id")))
             
             for q in questions:
                 q["source_content_ids"] = source_ids
             
+            if use_cache and questions and not any(map(_is_fallback_question, questions)):
+                await self.qgen_cache.set(cache_key, query_input, {
+                    "result": copy.deepcopy(questions),
+                    "sessions": {session_id},
+                })
+            
             return {
                 "questions": questions,
                 "agent_statuses": agent_statuses,
@@ -366,6 +598,167 @@ class EduSynapseCrew:
                 "is_fallback": True
             }
 
+    def _schedule_prefetch(
+        self,
+        query_input: str,
+        query_analysis: Dict[str, Any],
+        retrieved_content: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> None:
+        """Start a background prefetch of adjacent-difficulty questions, if enabled and idle"""
+        if not settings.semantic_cache_prefetch or context.get("preferred_difficulty"):
+            return
+        if self._prefetch_semaphore.locked():
+            return
+        
+        task = asyncio.create_task(self._prefetch_adjacent(
+            query_input,
+            query_analysis,
+            retrieved_content,
+            dict(context)
+        ))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+    
+    async def _prefetch_adjacent(
+        self,
+        query_input: str,
+        query_analysis: Dict[str, Any],
+        retrieved_content: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> None:
+        """
+        Warm the semantic cache with questions one difficulty level up and down
+        
+        Reuses the foreground analysis and retrieved content, so only the
+        question generation call is spent per adjacent level.
+        """
+        async with self._prefetch_semaphore:
+            current = context.get("current_difficulty", "medium")
+            adjacent = dict.fromkeys((
+                AdaptiveEngine._increase_difficulty(current),
+                AdaptiveEngine._decrease_difficulty(current),
+            ))
+            adjacent.pop(current, None)
+            
+            content_chunks = retrieved_content.get("content_chunks", [])
+            source_ids = tuple(cid for c in content_chunks if (cid := c.get("content_id")))
+            
+            for difficulty in adjacent:
+                adjacent_context = {**context, "current_difficulty": difficulty}
+                adjacent_analysis = {
+                    **query_analysis,
+                    "recommendations": {
+                        **query_analysis.get("recommendations", {}),
+                        "suggested_difficulty": difficulty,
+                    },
+                }
+                
+                try:
+                    questions = await self._execute_with_retry(
+                        self.question_agent.generate_batch_questions,
+                        retrieved_content,
+                        adjacent_analysis,
+                        adjacent_context,
+                        _PREFETCH_COUNT,
+                        max_retries=1
+                    )
+                except Exception as e:
+                    logger.debug(f"[Crew] Prefetch at '{difficulty}' failed: {e}")
+                    continue
+                
+                entries = []
+                for q in questions:
+                    # Skip template / rule-based filler questions
+                    if _is_fallback_question(q):
+                        continue
+                    q["source_content_ids"] = source_ids
+                    q.setdefault("difficulty", difficulty)
+                    entries.append({"result": q, "sessions": set()})
+                
+                await self.qgen_cache.set_many(
+                    self._question_cache_key(adjacent_context, 1),
+                    [query_input] * len(entries),
+                    entries
+                )
+                logger.info(f"[Crew] Prefetched {len(entries)} '{difficulty}' questions for '{query_input}'")
+    
+    async def shutdown(self) -> None:
+        """Cancel background prefetch tasks, stop the feedback batcher and close the HTTP pools"""
+        tasks = list(self._prefetch_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        await self.feedback_agent.close()
+        await self.retrieval_agent.close()
+        
+        if _shared_httpx is not None and not _shared_httpx.is_closed:
+            await _shared_httpx.aclose()
+    
+    async def _speculative_result(self, task: Optional[asyncio.Task]) -> Optional[Dict[str, Any]]:
+        """Result of a speculative local retrieval, or None if there was none or it failed"""
+        if task is None:
+            return None
+        result = (await asyncio.gather(task, return_exceptions=True))[0]
+        if isinstance(result, BaseException):
+            logger.debug(f"[Crew] Speculative retrieval failed: {result}")
+            return None
+        return result
+    
+    async def _analyze_with_early_retrieval(
+        self,
+        query_input: str,
+        context: Dict[str, Any],
+        retrieval_context: Optional[Dict[str, Any]] = None
+    ) -> tuple:
+        """
+        Stream query analysis and start local retrieval once the main topic is known
+        
+        Args:
+            query_input: Topic or custom query to analyze
+            context: Session context
+            retrieval_context: Context for the early retrieval (defaults to context)
+            
+        Returns:
+            (query_analysis, local retrieval task or None). The task searches the
+            local knowledge base only, seeded with the streamed topic and the
+            session's difficulty; pass its result to retrieve() as `local`,
+            which reuses it only if the final analysis searches the same way.
+        """
+        state = {"analysis": None, "prefetch": None}
+        retrieval_context = retrieval_context if retrieval_context is not None else context
+        
+        async def consume():
+            async for update in self.query_agent.analyze_stream(query_input, context, fallback=False):
+                if not update.get("is_partial"):
+                    state["analysis"] = update
+                elif state["prefetch"] is None:
+                    early_topic = update["topic"]["main"]
+                    logger.info(f"[Crew] Early retrieval started for topic '{early_topic}'")
+                    state["prefetch"] = asyncio.create_task(self.retrieval_agent.retrieve_local(
+                        _retrieval_seed(early_topic, retrieval_context),
+                        retrieval_context
+                    ))
+        
+        # Same retry and timeout policy as every other stage; a retried stream
+        # keeps the prefetch started by an earlier attempt
+        try:
+            await self._execute_with_retry(consume)
+        except asyncio.CancelledError:
+            if state["prefetch"] is not None:
+                state["prefetch"].cancel()
+            raise
+        except Exception as e:
+            logger.warning(f"[Crew] Streaming query analysis failed: {e}")
+        
+        query_analysis = state["analysis"]
+        if query_analysis is None:
+            query_analysis = self.query_agent._default_analysis(query_input, context)
+        
+        return query_analysis, state["prefetch"]
+    
     async def evaluate_response(
         self,
         context: Dict[str, Any]
@@ -393,18 +786,16 @@ class EduSynapseCrew:
             )
             
             # Determine recommended difficulty adjustment
-            from app.services.adaptive_engine import AdaptiveEngine
-            
-            is_correct = evaluation.get("is_correct", False)
+            is_correct = bool(evaluation.get("is_correct", False))
             current_difficulty = assessment.get("difficulty", "medium")
+            understanding = evaluation.get("conceptual_understanding", 0)
             
-            # Simple adjustment logic
-            if is_correct and evaluation.get("conceptual_understanding", 0) > 80:
-                evaluation["recommended_difficulty"] = AdaptiveEngine._increase_difficulty(current_difficulty)
-            elif not is_correct and evaluation.get("conceptual_understanding", 0) < 40:
-                evaluation["recommended_difficulty"] = AdaptiveEngine._decrease_difficulty(current_difficulty)
-            else:
-                evaluation["recommended_difficulty"] = current_difficulty
+            adjust = _DIFF_ADJUST.get(
+                (is_correct, understanding > 80 if is_correct else understanding < 40)
+            )
+            evaluation["recommended_difficulty"] = (
+                adjust(current_difficulty) if adjust else current_difficulty
+            )
             
             return evaluation
             
@@ -430,17 +821,20 @@ class EduSynapseCrew:
             Personalized feedback
         """
         try:
+            response = context.get("response") or {}
+            assessment = context.get("assessment") or {}
+            
             evaluation = {
-                "is_correct": context.get("response", {}).get("is_correct", False),
-                "score": context.get("response", {}).get("score", 0),
-                "conceptual_understanding": context.get("response", {}).get("conceptual_understanding", 50),
-                "misconceptions": context.get("response", {}).get("misconceptions", []),
-                "knowledge_gaps": context.get("response", {}).get("knowledge_gaps", []),
+                "is_correct": response.get("is_correct", False),
+                "score": response.get("score", 0),
+                "conceptual_understanding": response.get("conceptual_understanding", 50),
+                "misconceptions": response.get("misconceptions", []),
+                "knowledge_gaps": response.get("knowledge_gaps", []),
             }
             
             query_analysis = {
                 "topic": {
-                    "main": context.get("assessment", {}).get("topic", ""),
+                    "main": assessment.get("topic", ""),
                 },
                 "recommendations": {}
             }
@@ -473,7 +867,6 @@ class EduSynapseCrew:
         """
         try:
             # Get session data
-            from app.models.session import LearningSession
             session = await LearningSession.get(session_id)
             
             if not session:
@@ -485,12 +878,18 @@ class EduSynapseCrew:
                     "recommendations": [],
                 }
             
+            # Serialize interactions off the event loop
+            interactions = await asyncio.to_thread(
+                _interactions_adapter.dump_python,
+                session.interactions
+            )
+            
             # Generate summary using feedback agent
             session_data = {
                 "questions_answered": session.questions_answered,
                 "correct_answers": session.correct_answers,
                 "topic_name": session.topic_name,
-                "interactions": [i.model_dump() for i in session.interactions],
+                "interactions": interactions,
                 "total_score": session.total_score,
             }
             
@@ -506,6 +905,32 @@ class EduSynapseCrew:
                 "recommendations": ["Continue practicing to improve"],
             }
     
+    def _question_cache_usable(self, context: Dict[str, Any]) -> bool:
+        """Whether generated questions for this context may be served from / stored in the cache"""
+        return (
+            settings.semantic_cache_enabled
+            and self.llm_client is not None
+            and not context.get("is_document_upload")
+            and not context.get("uploaded_content")
+        )
+    
+    def _question_cache_key(self, context: Dict[str, Any], count: int) -> tuple:
+        """Exact part of the semantic cache key; the topic/query is matched by embedding"""
+        return (
+            settings.gemini_model,
+            context.get("preferred_difficulty") or context.get("current_difficulty", "medium"),
+            context.get("preferred_type"),
+            bool(context.get("is_custom_topic", False)),
+            count,
+        )
+    
+    def _cache_hit_statuses(self, agent_statuses: Dict[str, Any]) -> Dict[str, Any]:
+        """Agent statuses reported for a response served from the semantic cache"""
+        return {
+            agent_name: {"status": "cache_hit", "processingTime": 0}
+            for agent_name in agent_statuses
+        }
+    
     async def _execute_with_retry(
         self,
         func,
@@ -516,6 +941,11 @@ class EduSynapseCrew:
         """
         Execute a function with retry logic
         
+        Retries use jittered exponential backoff; rate-limit errors wait for
+        Retry-After when the API provides it. Pacing and the concurrency bound
+        apply per LLM request at the agents' call sites (llm_request_slot), so
+        they are never held while backing off or for stages without LLM calls.
+        
         Args:
             func: Async function to execute
             *args: Positional arguments
@@ -527,38 +957,18 @@ class EduSynapseCrew:
         """
         max_retries = max_retries or settings.crewai_max_retries
         
-        for attempt in range(max_retries):
-            try:
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(max_retries),
+            wait=_retry_wait,
+            before_sleep=_log_retry,
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
                 return await asyncio.wait_for(
                     func(*args, **kwargs),
                     timeout=settings.crewai_timeout
                 )
-            except asyncio.TimeoutError:
-                logger.warning(f"[Crew] Timeout on attempt {attempt + 1}/{max_retries}")
-                if attempt == max_retries - 1:
-                    raise
-            except Exception as e:
-                # Improved backoff with jitter and special handling for rate limits
-                msg = str(e)
-                logger.warning(f"[Crew] Error on attempt {attempt + 1}/{max_retries}: {msg}")
-                if attempt == max_retries - 1:
-                    raise
-
-                # Detect rate-limit / quota errors and choose a longer sleep
-                rate_limit_indicators = ["429", "Too Many Requests", "quota", "insufficient_quota", "rate limit"]
-                if any(ind in msg for ind in rate_limit_indicators):
-                    # Use a longer wait when API indicates rate limiting
-                    backoff = min( max(55, settings.crewai_timeout), 120 )
-                    jitter = random.uniform(0, 5)
-                    sleep_for = backoff + jitter
-                    logger.warning(f"[Crew] Detected rate-limit. Backing off for {sleep_for:.1f}s before retry")
-                else:
-                    # Exponential backoff with jitter for other errors
-                    base = 2
-                    max_backoff = 60
-                    sleep_for = min(max_backoff, base * (2 ** attempt) + random.uniform(0, 1.5))
-
-                await asyncio.sleep(sleep_for)
     
     def get_crew_status(self) -> Dict[str, Any]:
         """Get status of the crew and all agents"""
@@ -587,5 +997,18 @@ class EduSynapseCrew:
                 "verbose": settings.crewai_verbose,
                 "max_retries": settings.crewai_max_retries,
                 "timeout": settings.crewai_timeout,
-            }
+            },
+            "semantic_cache": self.qgen_cache.stats(),
+            "analysis_cache": _analysis_cache.stats(),
         }
+
+
+@lru_cache(maxsize=1)
+def get_crew() -> EduSynapseCrew:
+    """
+    Get the process-wide crew instance
+    
+    Agents hold no per-request state, so one crew serves every request.
+    Usable directly or as a FastAPI dependency (Depends(get_crew)).
+    """
+    return EduSynapseCrew()
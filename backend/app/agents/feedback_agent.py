@@ -3,11 +3,567 @@ Feedback Agent
 Final agent in the pipeline - generates personalized learning guidance
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Hashable, Optional, List, Sequence, Tuple, Mapping
+from types import MappingProxyType
+from dataclasses import dataclass
 from loguru import logger
 import asyncio
+import heapq
+import copy
+import re
+from bisect import bisect_right
+from random import choice as _choice
+from statistics import fmean
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    njit = None
 
 from app.config import settings
+from app.utils import fast_json
+from app.utils.ttl_cache import TTLCache, stable_hash
+from app.utils.rate_limiter import llm_request_slot
+
+
+# Matches ```json ... ``` or ``` ... ``` around an LLM JSON payload
+_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)```')
+
+# Numeric difficulty levels (the session rating scores easy as zero)
+_DIFFICULTY_LEVELS = {"easy": 1, "medium": 2, "hard": 3}
+_difficulty_level = _DIFFICULTY_LEVELS.get
+
+# Encouragement messages by outcome
+_MSG_CORRECT = (
+    "You're doing great! Keep up the excellent work! 🌟",
+    "Fantastic! Your hard work is paying off! 💪",
+    "Brilliant answer! You're making real progress! 🎯",
+    "Perfect! You've got this concept down! ✨",
+)
+_MSG_HIGH_ACCURACY = (
+    "Don't worry about this one - you're doing well overall! 📈",
+    "Everyone makes mistakes - your overall progress is impressive! 💫",
+    "This is how we learn! Your accuracy is still great! 🌱",
+)
+_MSG_KEEP_GOING = (
+    "Learning takes time - you're on the right path! 🛤️",
+    "Every question is a learning opportunity! Keep going! 🚀",
+    "Progress isn't always linear - stay committed! 💪",
+    "You're building a strong foundation! Keep practicing! 🏗️",
+)
+_MSG_STREAK_WEEK = "Amazing! You're on a {days}-day streak! 🔥"
+_MSG_STREAK = "Great consistency! {days} days in a row! ⚡"
+
+# Static instructions and schema lead the feedback prompt so every request
+# shares the same prefix (eligible for provider-side prefix caching)
+_FEEDBACK_PROMPT_PREFIX = """Generate personalized learning feedback in JSON format:
+{
+    "summary": "Brief 1-2 sentence summary of performance",
+    "detailed_feedback": "Detailed explanation of what was done well and areas for improvement",
+    "strengths": [
+        {"concept": "concept name", "proficiency_level": 0-100, "evidence": ["evidence1"]}
+    ],
+    "weaknesses": [
+        {"concept": "concept name", "current_level": 0-100, "target_level": 80, "improvement_suggestions": ["suggestion1"]}
+    ],
+    "recommendations": [
+        {"priority": 1, "action": "specific action", "reason": "why this helps", "estimated_time_minutes": 15}
+    ],
+    "suggested_topics": ["topic1", "topic2"],
+    "suggested_difficulty": "easy|medium|hard"
+}
+
+Be encouraging but honest. Focus on growth and specific actions.
+
+Base the feedback on the following:
+"""
+
+_FEEDBACK_PROMPT_DETAILS = """
+EVALUATION RESULT:
+- Correct: {is_correct}
+- Score: {score}/{max_score}
+- Conceptual Understanding: {understanding}%
+- Misconceptions: {misconceptions}
+- Knowledge Gaps: {knowledge_gaps}
+
+LEARNER CONTEXT:
+- Topic: {topic}
+- Current Strengths: {strengths}
+- Current Weaknesses: {weaknesses}
+- Recent Accuracy: {recent_accuracy}%
+- Learning Streak: {streak_days} days"""
+
+# Session accuracy bands (upper bounds) and the recommendation for each band
+_ACCURACY_THRESHOLDS = (40, 60, 80)
+_ACCURACY_RECOMMENDATIONS = (
+    MappingProxyType({
+        "priority": 1,
+        "type": "review",
+        "title": "Review Fundamentals",
+        "description": "Focus on understanding the basic concepts before moving to more complex topics.",
+        "action": "Start with easier questions and build up gradually",
+    }),
+    MappingProxyType({
+        "priority": 1,
+        "type": "practice",
+        "title": "Targeted Practice",
+        "description": "You're making progress! Focus on your weak areas for faster improvement.",
+        "action": "Practice more questions on your weak concepts",
+    }),
+    MappingProxyType({
+        "priority": 2,
+        "type": "challenge",
+        "title": "Push Your Limits",
+        "description": "You're doing well! Try harder questions to continue growing.",
+        "action": "Increase difficulty level in your next session",
+    }),
+    MappingProxyType({
+        "priority": 3,
+        "type": "explore",
+        "title": "Explore New Topics",
+        "description": "Excellent performance! Consider exploring related advanced topics.",
+        "action": "Try a new or more advanced topic",
+    }),
+)
+
+# LLM feedback keyed by the inputs that shape it, shared across sessions
+_feedback_cache = TTLCache(maxsize=10_000, ttl=3600)
+
+
+# Profile-derived analytics for an unchanged learner snapshot, e.g. on retries
+_analytics_cache = TTLCache(maxsize=4096, ttl=300)
+
+
+def _feedback_cache_key(
+    evaluation_result: Dict[str, Any],
+    query_analysis: Dict[str, Any],
+    context: Dict[str, Any]
+) -> str:
+    """
+    Hash the prompt inputs of a feedback request
+    
+    Streak length is left out and recent accuracy is bucketed to tens,
+    so day-to-day noise does not defeat the cache.
+    """
+    learner_profile = context.get("learner_profile", {})
+    accuracy = learner_profile.get("recent_accuracy")
+    return stable_hash({
+        "is_correct": evaluation_result.get("is_correct"),
+        "score": evaluation_result.get("score"),
+        "max_score": evaluation_result.get("max_score", 10),
+        "understanding": evaluation_result.get("conceptual_understanding"),
+        "misconceptions": evaluation_result.get("misconceptions", []),
+        "knowledge_gaps": evaluation_result.get("knowledge_gaps", []),
+        "topic": query_analysis.get("topic", {}).get("main"),
+        "strengths": learner_profile.get("strengths", []),
+        "weaknesses": learner_profile.get("weaknesses", []),
+        "accuracy_bucket": accuracy // 10 if isinstance(accuracy, (int, float)) else None,
+    })
+
+
+@dataclass(slots=True, frozen=True)
+class EvalView:
+    """Evaluation fields used by the feedback helpers, read once from the result dict"""
+    is_correct: bool
+    score: float
+    max_score: float
+    conceptual_understanding: float
+    difficulty: str
+    misconceptions: Tuple[str, ...]
+    knowledge_gaps: Tuple[str, ...]
+    concepts: Tuple[str, ...]
+    
+    @classmethod
+    def from_result(cls, evaluation_result: Dict[str, Any]) -> "EvalView":
+        """Build a view from a Question Generation Agent evaluation result"""
+        get = evaluation_result.get
+        return cls(
+            is_correct=get("is_correct", False),
+            score=get("score", 0),
+            max_score=get("max_score", 10),
+            conceptual_understanding=get("conceptual_understanding", 50),
+            difficulty=get("difficulty", "medium"),
+            misconceptions=tuple(get("misconceptions") or ()),
+            knowledge_gaps=tuple(get("knowledge_gaps") or ()),
+            concepts=tuple(get("concepts") or ()),
+        )
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class WindowView:
+    """Performance window as parallel arrays, in window order"""
+    correct: np.ndarray
+    topics: Tuple[str, ...]
+    difficulties: Tuple[Optional[str], ...]
+    
+    @classmethod
+    def from_window(cls, performance_window: List[Dict[str, Any]]) -> "WindowView":
+        """Read every field the window analytics need in a single traversal"""
+        correct, topics, difficulties = [], [], []
+        for p in performance_window:
+            get = p.get
+            correct.append(bool(get("is_correct", False)))
+            topics.append(str(get("topic", "unknown")))
+            difficulties.append(get("difficulty"))
+        return cls(
+            correct=np.array(correct, dtype=np.bool_),
+            topics=tuple(topics),
+            difficulties=tuple(difficulties),
+        )
+
+
+def _retention_kernel(correct: np.ndarray, topic_ids: np.ndarray, n_topics: int) -> float:
+    """
+    Mean retention over topics answered at least twice
+    
+    Args:
+        correct: 0/1 correctness per answer, in window order
+        topic_ids: Dense topic index per answer
+        n_topics: Number of distinct topics
+        
+    Returns:
+        Retention score, or -1.0 when no topic repeats
+    """
+    counts = np.zeros(n_topics, dtype=np.int64)
+    for i in range(topic_ids.shape[0]):
+        counts[topic_ids[i]] += 1
+    
+    seen = np.zeros(n_topics, dtype=np.int64)
+    early = np.zeros(n_topics, dtype=np.float64)
+    late = np.zeros(n_topics, dtype=np.float64)
+    for i in range(topic_ids.shape[0]):
+        t = topic_ids[i]
+        if seen[t] < counts[t] // 2:
+            early[t] += correct[i]
+        else:
+            late[t] += correct[i]
+        seen[t] += 1
+    
+    total = 0.0
+    repeated = 0
+    for t in range(n_topics):
+        count = counts[t]
+        if count >= 2:
+            half = count // 2
+            total += max(late[t] / (count - half) - early[t] / half + 0.5, 0.0) * 100
+            repeated += 1
+    
+    return total / repeated if repeated else -1.0
+
+
+if HAS_NUMBA:
+    _retention_kernel = njit(cache=True, fastmath=True)(_retention_kernel)
+    # Compile at import so the first request does not pay the JIT cost
+    _retention_kernel(np.zeros(2, dtype=np.uint8), np.zeros(2, dtype=np.int64), 1)
+
+
+def _consistency_kernel(scores) -> float:
+    """
+    Population standard deviation of scores (Welford's online algorithm)
+    
+    Args:
+        scores: Score per interaction
+        
+    Returns:
+        Standard deviation
+    """
+    mean = 0.0
+    m2 = 0.0
+    n = 0
+    for i in range(len(scores)):
+        score = scores[i]
+        n += 1
+        delta = score - mean
+        mean += delta / n
+        m2 += (score - mean) * delta
+    return (m2 / n) ** 0.5 if n else 0.0
+
+
+def _difficulty_trend_kernel(levels) -> Tuple[float, float]:
+    """
+    Difficulty trend and mean level in a single running-sum pass
+    
+    Args:
+        levels: Numeric difficulty per question, in session order (non-empty)
+        
+    Returns:
+        (second-half minus first-half mean, overall mean); the trend is 0.0
+        for fewer than two questions
+    """
+    n = len(levels)
+    half = n // 2
+    total = 0
+    first = 0
+    for i in range(n):
+        if i == half:
+            first = total
+        total += levels[i]
+    
+    trend = (total - first) / (n - half) - first / half if n >= 2 else 0.0
+    return trend, total / n
+
+
+def _session_rating_kernel(accuracy: float, levels, consistency: float) -> Tuple[float, float, float, float]:
+    """
+    Session score and its contributions
+    
+    Args:
+        accuracy: Session accuracy percentage
+        levels: Numeric difficulty per question (easy=1)
+        consistency: Consistency score
+        
+    Returns:
+        (total, accuracy contribution, difficulty bonus, consistency bonus)
+    """
+    base_score = accuracy * 0.5
+    
+    # Bonus for harder difficulties (easy earns none)
+    n = len(levels)
+    if n:
+        bonus_levels = 0
+        for i in range(n):
+            bonus_levels += levels[i] - 1
+        avg_difficulty = bonus_levels / n
+    else:
+        avg_difficulty = 1.0
+    difficulty_bonus = avg_difficulty * 10
+    
+    consistency_bonus = consistency * 0.2
+    
+    total_score = min(100.0, base_score + difficulty_bonus + consistency_bonus)
+    return total_score, base_score, difficulty_bonus, consistency_bonus
+
+
+if HAS_NUMBA:
+    _consistency_kernel = njit(cache=True)(_consistency_kernel)
+    _difficulty_trend_kernel = njit(cache=True)(_difficulty_trend_kernel)
+    _session_rating_kernel = njit(cache=True)(_session_rating_kernel)
+    _consistency_kernel(np.zeros(2, dtype=np.float64))
+    _difficulty_trend_kernel(np.ones(2, dtype=np.int8))
+    _session_rating_kernel(0.0, np.ones(2, dtype=np.int8), 0.0)
+
+
+def _difficulty_levels(difficulty_progression: Sequence[str]):
+    """
+    Numeric difficulty levels for the session kernels
+    
+    Returns an int8 array for the compiled kernels, or a plain list when
+    they run as ordinary Python.
+    """
+    levels = [_difficulty_level(d, 2) for d in difficulty_progression]
+    return np.array(levels, dtype=np.int8) if HAS_NUMBA else levels
+
+
+def _analytics_cache_key(
+    evaluation: "EvalView",
+    learner_profile: Dict[str, Any],
+    context: Dict[str, Any]
+) -> Optional[Hashable]:
+    """
+    Key covering every input of the profile-derived analytics
+    
+    Returns:
+        Hashable key, or None when the profile holds unhashable values
+    """
+    key = (
+        context.get("user_id") or learner_profile.get("id"),
+        evaluation,
+        tuple(learner_profile.get("knowledge_gaps") or ()),
+        tuple(learner_profile.get("weaknesses") or ()),
+        tuple(learner_profile.get("strengths") or ()),
+        context.get("time_taken_seconds", 0),
+        context.get("expected_time_seconds", 60),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class FeedbackBatcher:
+    """
+    Micro-batcher for feedback prompts
+    
+    Prompts submitted concurrently are collected for up to `timeout_ms`
+    (or until `max_batch` are queued) and sent as one LLM call asking for a
+    JSON array with one object per prompt, each echoing its item number.
+    A batch whose response cannot be matched back to every item falls back
+    to concurrent single-prompt calls.
+    """
+    
+    __slots__ = ("llm_client", "max_batch", "timeout", "_queue", "_worker", "_flushes")
+    
+    def __init__(self, llm_client, max_batch: int = 8, timeout_ms: int = 50):
+        """
+        Args:
+            llm_client: google.genai client
+            max_batch: Maximum prompts per LLM call
+            timeout_ms: Maximum time a batch waits to fill
+        """
+        self.llm_client = llm_client
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+    
+    async def submit(self, prompt: str) -> Optional[str]:
+        """
+        Queue a prompt and wait for its response text
+        
+        Args:
+            prompt: Single-item feedback prompt
+            
+        Returns:
+            JSON response text for the prompt, or None if the LLM returned nothing
+        """
+        if self.max_batch == 1:
+            return await self._generate_single(prompt)
+        
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+    
+    async def close(self) -> None:
+        """Stop the worker and in-flight batches, failing every prompt still waiting"""
+        tasks = [task for task in (self._worker, *self._flushes) if task is not None and not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+        
+        # Prompts queued but not yet taken into a batch
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._fail_unanswered([self._queue.get_nowait()])
+    
+    @staticmethod
+    def _fail_unanswered(batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Fail the prompts in a batch that have no result yet, so their callers stop waiting"""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Feedback batcher closed"))
+    
+    async def _run(self) -> None:
+        """Drain the queue into batches bounded by size and wait time"""
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.timeout
+                while len(batch) < self.max_batch:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                
+                # Flush in the background so the next batch can start filling
+                task = asyncio.create_task(self._flush(batch))
+                self._flushes.add(task)
+                task.add_done_callback(self._flushes.discard)
+                batch = []
+        finally:
+            # Cancelled while a batch was still filling
+            self._fail_unanswered(batch)
+    
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Send a batch and resolve each prompt's future"""
+        pending = [(prompt, future) for prompt, future in batch if not future.cancelled()]
+        if not pending:
+            return
+        
+        try:
+            results: Optional[List[Optional[str]]] = None
+            if len(pending) > 1:
+                try:
+                    results = await self._generate_batch([prompt for prompt, _ in pending])
+                except Exception as e:
+                    logger.warning(f"[Feedback] Batched feedback call failed, sending individually: {e}")
+            
+            if results is None:
+                results = await asyncio.gather(
+                    *(self._generate_single(prompt) for prompt, _ in pending),
+                    return_exceptions=True
+                )
+            
+            for (_, future), result in zip(pending, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            # Cancelled mid-call (close())
+            self._fail_unanswered(pending)
+    
+    async def _generate_single(self, prompt: str) -> Optional[str]:
+        """Send one feedback prompt"""
+        async with llm_request_slot():
+            response = await self.llm_client.aio.models.generate_content(
+                model=settings.gemini_model,
+                contents=f"{prompt}\n\nRespond with valid JSON only, no markdown formatting.",
+            )
+        return response.text.strip() if response and response.text else None
+    
+    async def _generate_batch(self, prompts: List[str]) -> Optional[List[Optional[str]]]:
+        """
+        Send several feedback prompts in one call
+        
+        Each object must echo its item number, so a reordered, merged or
+        missing item is detected instead of handing one learner another's feedback.
+        
+        Returns:
+            Per-prompt JSON texts, or None if the response does not map back to every item
+        """
+        items = "\n\n".join(
+            f"=== ITEM {i} ===\n{prompt}" for i, prompt in enumerate(prompts, 1)
+        )
+        async with llm_request_slot():
+            response = await self.llm_client.aio.models.generate_content(
+                model=settings.gemini_model,
+                contents=(
+                    f"Generate feedback for each of the following {len(prompts)} independent items.\n\n"
+                    f"{items}\n\n"
+                    f"Return a JSON array with exactly {len(prompts)} objects, one per item, "
+                    "each in the format requested by its item plus an \"item\" field holding its item number. "
+                    "Treat every item independently; never use details from one item in another."
+                ),
+                config={"response_mime_type": "application/json"},
+            )
+        if not response or not response.text:
+            return None
+        
+        data = fast_json.loads(response.text)
+        if not isinstance(data, list) or len(data) != len(prompts):
+            logger.warning(f"[Feedback] Batched response had {len(data) if isinstance(data, list) else 0} items for {len(prompts)} prompts")
+            return None
+        
+        # Match objects to prompts by the echoed item number, not by position
+        by_item: Dict[int, str] = {}
+        for item in data:
+            number = item.pop("item", None) if isinstance(item, dict) else None
+            if type(number) is not int or not 1 <= number <= len(prompts) or number in by_item:
+                logger.warning(f"[Feedback] Batched response item numbers do not match the {len(prompts)} prompts")
+                return None
+            by_item[number] = fast_json.dumps(item)
+        
+        logger.debug(f"[Feedback] Batched {len(prompts)} feedback prompts into one call")
+        return [by_item[number] for number in range(1, len(prompts) + 1)]
 
 
 class FeedbackAgent:
@@ -23,14 +579,33 @@ class FeedbackAgent:
     - Provide performance metrics and analytics
     """
     
+    __slots__ = (
+        "llm_client",
+        "batcher",
+        "_invoke_llm",
+        "name",
+        "role",
+        "goal",
+        "backstory",
+        "_crew_agent_config",
+    )
+    
     def __init__(self, llm_client=None):
         """
         Initialize the Feedback Agent
         
         Args:
-            llm_client: LLM client for feedback generation
+            llm_client: LLM client for feedback generation; pass the process-wide
+                client from the crew so requests share its connection pool
         """
         self.llm_client = llm_client
+        self.batcher = FeedbackBatcher(
+            llm_client,
+            max_batch=settings.feedback_batch_size,
+            timeout_ms=settings.feedback_batch_timeout_ms
+        ) if llm_client else None
+        # Resolve the generation path once; without a client the LLM step is a no-op
+        self._invoke_llm = self._llm_generate_feedback if llm_client else self._skip_llm
         self.name = "Feedback Agent"
         self.role = "Personalized Learning Coach"
         self.goal = "Provide motivating, actionable feedback that accelerates learning"
@@ -39,6 +614,7 @@ class FeedbackAgent:
         that is encouraging yet honest. You understand the psychology of learning and know
         how to motivate students while addressing their weaknesses. You always provide
         specific, actionable recommendations."""
+        self._crew_agent_config: Optional[Mapping[str, Any]] = None
     
     async def generate_feedback(
         self,
@@ -61,51 +637,64 @@ class FeedbackAgent:
         
         try:
             # Extract key information
-            is_correct = evaluation_result.get("is_correct", False)
-            score = evaluation_result.get("score", 0)
-            misconceptions = evaluation_result.get("misconceptions", [])
-            knowledge_gaps = evaluation_result.get("knowledge_gaps", [])
+            evaluation = EvalView.from_result(evaluation_result)
             learner_profile = context.get("learner_profile", {})
             
-            # Generate feedback using LLM or rules
-            if self.llm_client:
-                feedback = await self._llm_generate_feedback(
-                    evaluation_result,
-                    query_analysis,
-                    context
-                )
-            else:
+            # Generate feedback using LLM, falling back to rules
+            feedback = await self._invoke_llm(
+                evaluation_result,
+                query_analysis,
+                context
+            )
+            if feedback is None:
                 feedback = self._rule_based_feedback(
-                    evaluation_result,
+                    evaluation,
                     query_analysis,
                     context
                 )
             
             # Add encouragement based on performance
             feedback["encouragement_message"] = self._generate_encouragement(
-                is_correct,
+                evaluation.is_correct,
                 learner_profile.get("recent_accuracy", 50),
                 learner_profile.get("current_streak_days", 0)
             )
             
             # Calculate overall performance score
             feedback["overall_performance_score"] = self._calculate_performance_score(
-                score,
-                evaluation_result.get("conceptual_understanding", 50),
-                len(misconceptions)
+                evaluation.score,
+                evaluation.conceptual_understanding,
+                len(evaluation.misconceptions)
             )
             
+            # Compute every performance-window metric in one pass
+            window = WindowView.from_window(learner_profile.get("performance_window", []))
+            metrics = self._compute_window_metrics(window, evaluation)
+            
             # Determine improvement trend
-            feedback["improvement_trend"] = self._determine_trend(
-                learner_profile.get("performance_window", [])
-            )
+            feedback["improvement_trend"] = metrics["improvement_trend"]
             
-            # Add advanced analytics
-            feedback["analytics"] = self._generate_analytics(
-                evaluation_result,
-                learner_profile,
-                context
-            )
+            # Add advanced analytics, reusing profile-derived parts when the inputs are unchanged
+            analytics_key = _analytics_cache_key(evaluation, learner_profile, context)
+            profile_analytics = _analytics_cache.get(analytics_key) if analytics_key is not None else None
+            if profile_analytics is None:
+                profile_analytics = self._generate_analytics(
+                    evaluation,
+                    learner_profile,
+                    context
+                )
+                if analytics_key is not None:
+                    _analytics_cache.set(analytics_key, profile_analytics)
+            profile_analytics = copy.deepcopy(profile_analytics)
+            
+            feedback["analytics"] = {
+                "knowledge_gap_analysis": profile_analytics["knowledge_gap_analysis"],
+                "learning_velocity": metrics["learning_velocity"],
+                "difficulty_analysis": metrics["difficulty_analysis"],
+                "concept_mastery": profile_analytics["concept_mastery"],
+                "retention_score": metrics["retention_score"],
+                "engagement_level": profile_analytics["engagement_level"],
+            }
             
             return feedback
             
@@ -115,137 +704,151 @@ class FeedbackAgent:
     
     def _generate_analytics(
         self,
-        evaluation_result: Dict[str, Any],
+        evaluation: EvalView,
         learner_profile: Dict[str, Any],
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Generate advanced analytics for the feedback"""
-        
-        performance_window = learner_profile.get("performance_window", [])
+        """Generate the analytics that depend on the evaluation and profile, not the window"""
         
         # Knowledge gap analysis
         knowledge_gap_analysis = self._analyze_knowledge_gaps(
-            evaluation_result.get("knowledge_gaps", []),
+            evaluation.knowledge_gaps,
             learner_profile.get("knowledge_gaps", [])
         )
         
-        # Learning velocity calculation
-        learning_velocity = self._calculate_learning_velocity(performance_window)
-        
-        # Difficulty appropriateness
-        difficulty_analysis = self._analyze_difficulty_fit(
-            evaluation_result.get("score", 0),
-            evaluation_result.get("difficulty", "medium"),
-            performance_window
-        )
-        
         # Concept mastery estimation
         concept_mastery = self._estimate_concept_mastery(
-            evaluation_result,
+            evaluation,
             learner_profile
         )
         
         return {
             "knowledge_gap_analysis": knowledge_gap_analysis,
-            "learning_velocity": learning_velocity,
-            "difficulty_analysis": difficulty_analysis,
             "concept_mastery": concept_mastery,
-            "retention_score": self._calculate_retention_score(performance_window),
             "engagement_level": self._estimate_engagement_level(context),
         }
     
-    def _analyze_knowledge_gaps(
+    def _compute_window_metrics(
         self,
-        current_gaps: List[str],
-        historical_gaps: List[str]
+        window: WindowView,
+        evaluation: EvalView
     ) -> Dict[str, Any]:
-        """Analyze knowledge gaps and their persistence"""
+        """
+        Compute velocity, trend, difficulty fit and retention from one window view
         
-        # Find recurring gaps
-        from collections import Counter
-        all_gaps = current_gaps + historical_gaps
-        gap_frequency = Counter(all_gaps)
+        Args:
+            window: Performance window arrays
+            evaluation: Current evaluation
+            
+        Returns:
+            improvement_trend, learning_velocity, difficulty_analysis and retention_score
+        """
+        correct = window.correct
+        n = len(correct)
+        
+        # Shared slices: the last five answers against the five before them
+        # (or the earlier part of a short window)
+        recent_rate = float(correct[-5:].mean()) if n else 0.0
+        if n >= 10:
+            velocity_older = trend_older = float(correct[-10:-5].mean())
+        else:
+            velocity_older = float(correct[:-5].mean()) if n > 5 else None
+            trend_older = float(correct[:n // 2].mean()) if n // 2 else None
         
-        recurring_gaps = [gap for gap, count in gap_frequency.items() if count > 1]
-        new_gaps = [gap for gap in current_gaps if gap not in historical_gaps]
+        # Learning velocity
+        if n < 5:
+            learning_velocity = {
+                "velocity": 0,
+                "trend": "insufficient_data",
+                "confidence": 0.3,
+            }
+        else:
+            recent_correct = recent_rate * 100
+            velocity = recent_correct - (velocity_older * 100 if velocity_older is not None else 50)
+            
+            if velocity > 10:
+                velocity_trend = "accelerating"
+            elif velocity > 0:
+                velocity_trend = "improving"
+            elif velocity > -10:
+                velocity_trend = "stable"
+            else:
+                velocity_trend = "declining"
+            
+            learning_velocity = {
+                "velocity": round(velocity, 2),
+                "trend": velocity_trend,
+                "recent_accuracy": round(recent_correct, 2),
+                "confidence": min(n / 20, 1.0),
+            }
         
-        # Priority score for gaps (higher = needs more attention)
-        gap_priorities = {
-            gap: min(count * 20, 100)
-            for gap, count in gap_frequency.items()
-        }
+        # Improvement trend
+        improvement_trend = "stable"
+        if n >= 5 and trend_older is not None:
+            difference = recent_rate - trend_older
+            if difference > 0.15:
+                improvement_trend = "improving"
+            elif difference < -0.15:
+                improvement_trend = "declining"
+        
+        # Success rate at the current difficulty over the last ten answers
+        same_difficulty = np.fromiter(
+            (d == evaluation.difficulty for d in window.difficulties[-10:]),
+            dtype=np.bool_,
+            count=min(n, 10)
+        )
+        if same_difficulty.any():
+            success_rate = float(correct[-10:][same_difficulty].mean()) * 100
+        else:
+            success_rate = 100 if evaluation.score > 5 else 0
         
         return {
-            "total_gaps": len(set(all_gaps)),
-            "recurring_gaps": recurring_gaps,
-            "new_gaps": new_gaps,
-            "gap_priorities": gap_priorities,
-            "severity": "high" if len(recurring_gaps) > 2 else ("medium" if recurring_gaps else "low"),
+            "improvement_trend": improvement_trend,
+            "learning_velocity": learning_velocity,
+            "difficulty_analysis": self._analyze_difficulty_fit(evaluation.difficulty, success_rate),
+            "retention_score": self._calculate_retention_score(correct, window.topics),
         }
     
-    def _calculate_learning_velocity(
+    def _analyze_knowledge_gaps(
         self,
-        performance_window: List[Dict[str, Any]]
+        current_gaps: Sequence[str],
+        historical_gaps: Sequence[str]
     ) -> Dict[str, Any]:
-        """Calculate how quickly the learner is improving"""
-        
-        if len(performance_window) < 5:
-            return {
-                "velocity": 0,
-                "trend": "insufficient_data",
-                "confidence": 0.3,
-            }
-        
-        # Calculate improvement rate
-        recent = performance_window[-5:]
-        older = performance_window[-10:-5] if len(performance_window) >= 10 else performance_window[:-5]
+        """Analyze knowledge gaps and their persistence"""
         
-        recent_correct = sum(1 for p in recent if p.get("is_correct", False)) / len(recent) * 100
-        older_correct = sum(1 for p in older if p.get("is_correct", False)) / len(older) * 100 if older else 50
+        # Count each gap across both lists without concatenating them
+        gap_frequency: Dict[str, int] = {}
+        for gap in current_gaps:
+            gap_frequency[gap] = gap_frequency.get(gap, 0) + 1
+        for gap in historical_gaps:
+            gap_frequency[gap] = gap_frequency.get(gap, 0) + 1
         
-        velocity = recent_correct - older_correct
+        historical = set(historical_gaps)
+        recurring_gaps = []
+        gap_priorities = {}
+        for gap, count in gap_frequency.items():
+            if count > 1:
+                recurring_gaps.append(gap)
+            # Priority score for gaps (higher = needs more attention)
+            gap_priorities[gap] = count * 20 if count < 5 else 100
         
-        # Determine trend
-        if velocity > 10:
-            trend = "accelerating"
-        elif velocity > 0:
-            trend = "improving"
-        elif velocity > -10:
-            trend = "stable"
-        else:
-            trend = "declining"
+        new_gaps = [gap for gap in current_gaps if gap not in historical]
         
         return {
-            "velocity": round(velocity, 2),
-            "trend": trend,
-            "recent_accuracy": round(recent_correct, 2),
-            "confidence": min(len(performance_window) / 20, 1.0),
+            "total_gaps": len(gap_frequency),
+            "recurring_gaps": recurring_gaps,
+            "new_gaps": new_gaps,
+            "gap_priorities": gap_priorities,
+            "severity": "high" if len(recurring_gaps) > 2 else ("medium" if recurring_gaps else "low"),
         }
     
     def _analyze_difficulty_fit(
         self,
-        score: float,
         current_difficulty: str,
-        performance_window: List[Dict[str, Any]]
+        success_rate: float
     ) -> Dict[str, Any]:
         """Analyze if the current difficulty level is appropriate"""
         
-        difficulty_map = {"easy": 1, "medium": 2, "hard": 3}
-        current_level = difficulty_map.get(current_difficulty, 2)
-        
-        # Analyze recent performance at this difficulty
-        same_difficulty = [
-            p for p in performance_window[-10:]
-            if p.get("difficulty") == current_difficulty
-        ]
-        
-        if same_difficulty:
-            avg_score = sum(p.get("score", 0) for p in same_difficulty) / len(same_difficulty)
-            success_rate = sum(1 for p in same_difficulty if p.get("is_correct", False)) / len(same_difficulty) * 100
-        else:
-            avg_score = score
-            success_rate = 100 if score > 5 else 0
-        
         # Determine recommendation
         if success_rate > 80 and current_difficulty != "hard":
             recommendation = "increase"
@@ -267,30 +870,29 @@ class FeedbackAgent:
     
     def _estimate_concept_mastery(
         self,
-        evaluation_result: Dict[str, Any],
+        evaluation: EvalView,
         learner_profile: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Estimate mastery level for concepts covered"""
         
-        concepts = evaluation_result.get("concepts", [])
-        conceptual_understanding = evaluation_result.get("conceptual_understanding", 50)
-        is_correct = evaluation_result.get("is_correct", False)
-        
         # Base mastery from this question
-        base_mastery = conceptual_understanding
+        base_mastery = evaluation.conceptual_understanding
         
         # Adjust based on correctness
-        if is_correct:
+        if evaluation.is_correct:
             base_mastery = min(100, base_mastery + 10)
         else:
             base_mastery = max(0, base_mastery - 10)
         
+        weaknesses = frozenset(learner_profile.get("weaknesses") or ())
+        strengths = frozenset(learner_profile.get("strengths") or ())
+        
         concept_mastery = {}
-        for concept in concepts:
+        for concept in evaluation.concepts:
             # Check if this is a known weakness
-            if concept in learner_profile.get("weaknesses", []):
+            if concept in weaknesses:
                 mastery = base_mastery * 0.8  # Lower mastery for known weaknesses
-            elif concept in learner_profile.get("strengths", []):
+            elif concept in strengths:
                 mastery = min(100, base_mastery * 1.2)  # Higher for strengths
             else:
                 mastery = base_mastery
@@ -304,31 +906,43 @@ class FeedbackAgent:
     
     def _calculate_retention_score(
         self,
-        performance_window: List[Dict[str, Any]]
+        correct: np.ndarray,
+        topics: Sequence[str]
     ) -> float:
         """Calculate how well the learner retains knowledge over time"""
         
-        if len(performance_window) < 10:
+        if len(correct) < 10:
             return 70.0  # Default score
         
-        # Look for patterns where the learner answered similar topics
-        from collections import defaultdict
-        topic_performance = defaultdict(list)
-        
-        for p in performance_window:
-            topic = p.get("topic", "unknown")
-            topic_performance[topic].append(p.get("is_correct", False))
-        
-        # Calculate retention (consistency in performance over time)
-        retention_scores = []
-        for topic, results in topic_performance.items():
-            if len(results) >= 2:
-                # Check if performance improved or maintained
-                early = sum(results[:len(results)//2]) / (len(results)//2) if results[:len(results)//2] else 0
-                late = sum(results[len(results)//2:]) / (len(results) - len(results)//2) if results[len(results)//2:] else 0
-                retention_scores.append(max(late - early + 0.5, 0) * 100)
-        
-        return round(sum(retention_scores) / len(retention_scores), 2) if retention_scores else 70.0
+        if HAS_NUMBA:
+            ids: Dict[str, int] = {}
+            topic_ids = np.fromiter(
+                (ids.setdefault(topic, len(ids)) for topic in topics),
+                dtype=np.int64,
+                count=len(topics)
+            )
+            score = _retention_kernel(correct.view(np.uint8), topic_ids, len(ids))
+            return round(score, 2) if score >= 0 else 70.0
+        
+        # Group answers by topic, keeping their original order within each topic
+        _, topic_ids = np.unique(topics, return_inverse=True)
+        order = np.argsort(topic_ids, kind="stable")
+        counts = np.bincount(topic_ids)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        running = np.concatenate(([0], np.cumsum(correct[order], dtype=np.int64)))
+        
+        # Calculate retention (consistency in performance over time) for topics seen twice or more
+        repeated = counts >= 2
+        if not repeated.any():
+            return 70.0
+        
+        counts, starts = counts[repeated], starts[repeated]
+        halves = counts // 2
+        early = (running[starts + halves] - running[starts]) / halves
+        late = (running[starts + counts] - running[starts + halves]) / (counts - halves)
+        retention_scores = np.maximum(late - early + 0.5, 0) * 100
+        
+        return round(float(retention_scores.mean()), 2)
     
     def _estimate_engagement_level(
         self,
@@ -355,28 +969,42 @@ class FeedbackAgent:
         evaluation_result: Dict[str, Any],
         query_analysis: Dict[str, Any],
         context: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Generate feedback using Gemini LLM via google.genai SDK"""
+    ) -> Optional[Dict[str, Any]]:
+        """Generate feedback using Gemini LLM via google.genai SDK, or None if it fails"""
+        
+        cache_key = _feedback_cache_key(evaluation_result, query_analysis, context)
+        cached = _feedback_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("[Feedback] Feedback cache hit")
+            return copy.deepcopy(cached)
         
         prompt = self._build_feedback_prompt(evaluation_result, query_analysis, context)
         
         try:
-            response = await self.llm_client.aio.models.generate_content(
-                model=settings.gemini_model,
-                contents=f"{prompt}\n\nRespond with valid JSON only, no markdown formatting.",
-            )
+            response_text = await self.batcher.submit(prompt)
             
-            if response and response.text:
-                response_text = response.text.strip()
+            if response_text:
                 logger.info(f"[Feedback] Gemini response received: {response_text[:200]}")
-                return self._parse_feedback_response(response_text)
+                feedback = self._parse_feedback_response(response_text)
+                if feedback is not None:
+                    _feedback_cache.set(cache_key, copy.deepcopy(feedback))
+                return feedback
             else:
                 logger.warning("[Feedback] Empty Gemini response")
         
         except Exception as e:
             logger.error(f"[Feedback] LLM feedback generation failed: {e}")
         
-        return self._rule_based_feedback(evaluation_result, query_analysis, context)
+        return None
+    
+    async def _skip_llm(
+        self,
+        evaluation_result: Dict[str, Any],
+        query_analysis: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> None:
+        """LLM step used when no client is configured"""
+        return None
     
     def _build_feedback_prompt(
         self,
@@ -388,58 +1016,35 @@ class FeedbackAgent:
         
         learner_profile = context.get("learner_profile", {})
         
-        prompt = f"""Generate personalized learning feedback based on the following:
-
-EVALUATION RESULT:
-- Correct: {evaluation_result.get('is_correct')}
-- Score: {evaluation_result.get('score')}/{evaluation_result.get('max_score', 10)}
-- Conceptual Understanding: {evaluation_result.get('conceptual_understanding')}%
-- Misconceptions: {evaluation_result.get('misconceptions', [])}
-- Knowledge Gaps: {evaluation_result.get('knowledge_gaps', [])}
-
-LEARNER CONTEXT:
-- Topic: {query_analysis.get('topic', {}).get('main', 'Unknown')}
-- Current Strengths: {learner_profile.get('strengths', [])}
-- Current Weaknesses: {learner_profile.get('weaknesses', [])}
-- Recent Accuracy: {learner_profile.get('recent_accuracy', 'Unknown')}%
-- Learning Streak: {learner_profile.get('current_streak_days', 0)} days
-
-Generate comprehensive feedback in JSON format:
-{{
-    "summary": "Brief 1-2 sentence summary of performance",
-    "detailed_feedback": "Detailed explanation of what was done well and areas for improvement",
-    "strengths": [
-        {{"concept": "concept name", "proficiency_level": 0-100, "evidence": ["evidence1"]}}
-    ],
-    "weaknesses": [
-        {{"concept": "concept name", "current_level": 0-100, "target_level": 80, "improvement_suggestions": ["suggestion1"]}}
-    ],
-    "recommendations": [
-        {{"priority": 1, "action": "specific action", "reason": "why this helps", "estimated_time_minutes": 15}}
-    ],
-    "suggested_topics": ["topic1", "topic2"],
-    "suggested_difficulty": "easy|medium|hard"
-}}
-
-Be encouraging but honest. Focus on growth and specific actions."""
-
-        return prompt
+        return _FEEDBACK_PROMPT_PREFIX + _FEEDBACK_PROMPT_DETAILS.format_map({
+            "is_correct": evaluation_result.get("is_correct"),
+            "score": evaluation_result.get("score"),
+            "max_score": evaluation_result.get("max_score", 10),
+            "understanding": evaluation_result.get("conceptual_understanding"),
+            "misconceptions": evaluation_result.get("misconceptions", []),
+            "knowledge_gaps": evaluation_result.get("knowledge_gaps", []),
+            "topic": query_analysis.get("topic", {}).get("main", "Unknown"),
+            "strengths": learner_profile.get("strengths", []),
+            "weaknesses": learner_profile.get("weaknesses", []),
+            "recent_accuracy": learner_profile.get("recent_accuracy", "Unknown"),
+            "streak_days": learner_profile.get("current_streak_days", 0),
+        })
     
     def _extract_json_from_response(self, response: str) -> str:
         """Extract JSON from LLM response, handling markdown code blocks"""
-        import re
-        
         if not response:
             return "{}"
         
         text = response.strip()
         
+        # Bare JSON object (the usual case) needs no extraction
+        if text.startswith('{') and text.endswith('}'):
+            return text
+        
         # Try to extract JSON from markdown code blocks
-        # Matches ```json ... ``` or ``` ... ```
-        code_block_pattern = r'```(?:json)?\s*([\s\S]*?)```'
-        matches = re.findall(code_block_pattern, text)
-        if matches:
-            text = matches[0].strip()
+        match = _CODE_BLOCK_RE.search(text)
+        if match:
+            text = match.group(1).strip()
         
         # Find the first { and last } to extract JSON object
         start = text.find('{')
@@ -449,13 +1054,17 @@ Be encouraging but honest. Focus on growth and specific actions."""
         
         return text
     
-    def _parse_feedback_response(self, response: str) -> Dict[str, Any]:
-        """Parse LLM response into feedback format"""
-        import json
+    def _parse_feedback_response(self, response: str) -> Optional[Dict[str, Any]]:
+        """Parse LLM response into feedback format, or None if it is not valid feedback JSON"""
+        cleaned_response = self._extract_json_from_response(response)
+        
+        # Reject responses that cannot be a JSON object without raising
+        if not (cleaned_response.startswith('{') and cleaned_response.endswith('}')):
+            logger.error("Feedback response contains no JSON object")
+            return None
         
         try:
-            cleaned_response = self._extract_json_from_response(response)
-            data = json.loads(cleaned_response)
+            data = fast_json.loads(cleaned_response)
             
             return {
                 "summary": data.get("summary", ""),
@@ -491,23 +1100,23 @@ Be encouraging but honest. Focus on growth and specific actions."""
                 "suggested_difficulty": data.get("suggested_difficulty", "medium"),
             }
             
-        except json.JSONDecodeError:
+        except fast_json.JSONDecodeError:
             logger.error("Failed to parse feedback JSON")
-            return self._default_feedback({})
+            return None
     
     def _rule_based_feedback(
         self,
-        evaluation_result: Dict[str, Any],
+        evaluation: EvalView,
         query_analysis: Dict[str, Any],
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Generate feedback using rules when LLM unavailable"""
         
-        is_correct = evaluation_result.get("is_correct", False)
-        score = evaluation_result.get("score", 0)
-        max_score = evaluation_result.get("max_score", 10)
-        misconceptions = evaluation_result.get("misconceptions", [])
-        knowledge_gaps = evaluation_result.get("knowledge_gaps", [])
+        is_correct = evaluation.is_correct
+        score = evaluation.score
+        max_score = evaluation.max_score
+        misconceptions = evaluation.misconceptions
+        knowledge_gaps = evaluation.knowledge_gaps
         topic = query_analysis.get("topic", {}).get("main", "this topic")
         
         # Generate summary
@@ -594,7 +1203,7 @@ Be encouraging but honest. Focus on growth and specific actions."""
             "strengths": strengths,
             "weaknesses": weaknesses,
             "recommendations": recommendations,
-            "suggested_topics": knowledge_gaps[:3] if knowledge_gaps else [topic],
+            "suggested_topics": list(knowledge_gaps[:3]) if knowledge_gaps else [topic],
             "suggested_difficulty": suggested_difficulty,
         }
     
@@ -606,37 +1215,20 @@ Be encouraging but honest. Focus on growth and specific actions."""
     ) -> str:
         """Generate encouraging message based on performance"""
         
-        messages = []
-        
         if is_correct:
-            messages = [
-                "You're doing great! Keep up the excellent work! 🌟",
-                "Fantastic! Your hard work is paying off! 💪",
-                "Brilliant answer! You're making real progress! 🎯",
-                "Perfect! You've got this concept down! ✨",
-            ]
+            messages = _MSG_CORRECT
         elif recent_accuracy > 70:
-            messages = [
-                "Don't worry about this one - you're doing well overall! 📈",
-                "Everyone makes mistakes - your overall progress is impressive! 💫",
-                "This is how we learn! Your accuracy is still great! 🌱",
-            ]
+            messages = _MSG_HIGH_ACCURACY
         else:
-            messages = [
-                "Learning takes time - you're on the right path! 🛤️",
-                "Every question is a learning opportunity! Keep going! 🚀",
-                "Progress isn't always linear - stay committed! 💪",
-                "You're building a strong foundation! Keep practicing! 🏗️",
-            ]
+            messages = _MSG_KEEP_GOING
         
         # Add streak bonus
         if streak_days >= 7:
-            messages.append(f"Amazing! You're on a {streak_days}-day streak! 🔥")
+            messages += (_MSG_STREAK_WEEK.format(days=streak_days),)
         elif streak_days >= 3:
-            messages.append(f"Great consistency! {streak_days} days in a row! ⚡")
+            messages += (_MSG_STREAK.format(days=streak_days),)
         
-        import random
-        return random.choice(messages)
+        return _choice(messages)
     
     def _calculate_performance_score(
         self,
@@ -663,33 +1255,6 @@ Be encouraging but honest. Focus on growth and specific actions."""
         
         return max(0, min(100, performance))
     
-    def _determine_trend(
-        self,
-        performance_window: List[Dict[str, Any]]
-    ) -> str:
-        """Determine performance trend"""
-        
-        if len(performance_window) < 5:
-            return "stable"
-        
-        # Compare recent vs older performance
-        older = performance_window[-10:-5] if len(performance_window) >= 10 else performance_window[:len(performance_window)//2]
-        recent = performance_window[-5:]
-        
-        if not older or not recent:
-            return "stable"
-        
-        older_correct = sum(1 for p in older if p.get("is_correct", False)) / len(older)
-        recent_correct = sum(1 for p in recent if p.get("is_correct", False)) / len(recent)
-        
-        difference = recent_correct - older_correct
-        
-        if difference > 0.15:
-            return "improving"
-        elif difference < -0.15:
-            return "declining"
-        return "stable"
-    
     def _default_feedback(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Return default feedback"""
         return {
@@ -724,10 +1289,14 @@ Be encouraging but honest. Focus on growth and specific actions."""
         # Analyze difficulty progression
         interactions = session_data.get("interactions", [])
         difficulty_progression = []
-        topic_performance = {}
-        concept_scores = {}
         time_per_question = []
         
+        # One flat row per (interaction, concept); concepts get dense ids in first-seen order
+        concept_ids: Dict[str, int] = {}
+        row_concepts: List[int] = []
+        row_scores: List[float] = []
+        row_correct: List[bool] = []
+        
         for interaction in interactions:
             agent_outputs = interaction.get("agent_outputs", {})
             
@@ -741,51 +1310,64 @@ Be encouraging but honest. Focus on growth and specific actions."""
             score = interaction.get("score", 0)
             
             for concept in concepts:
-                if concept not in concept_scores:
-                    concept_scores[concept] = {"correct": 0, "total": 0, "scores": []}
-                concept_scores[concept]["total"] += 1
-                concept_scores[concept]["scores"].append(score)
-                if is_correct:
-                    concept_scores[concept]["correct"] += 1
+                row_concepts.append(concept_ids.setdefault(concept, len(concept_ids)))
+                row_scores.append(score or 0)
+                row_correct.append(bool(is_correct))
             
             # Track time (if available)
             time_taken = interaction.get("time_taken_seconds", 0)
             if time_taken > 0:
                 time_per_question.append(time_taken)
         
-        # Identify strengths and weaknesses from concept scores
-        strengths = []
-        weaknesses = []
-        
-        for concept, data in concept_scores.items():
-            concept_accuracy = (data["correct"] / data["total"] * 100) if data["total"] > 0 else 0
-            avg_score = sum(data["scores"]) / len(data["scores"]) if data["scores"] else 0
+        # Identify strengths and weaknesses from per-concept column arrays
+        concepts = list(concept_ids)
+        strength_order: List[int] = []
+        weakness_order: List[int] = []
+        mastered_order: List[int] = []
+        
+        if concepts:
+            inverse = np.array(row_concepts, dtype=np.int64)
+            totals = np.bincount(inverse, minlength=len(concepts))
+            correct_counts = np.bincount(inverse, weights=np.array(row_correct, dtype=np.float64), minlength=len(concepts))
+            score_sums = np.bincount(inverse, weights=np.array(row_scores, dtype=np.float64), minlength=len(concepts))
+            concept_accuracy = correct_counts / totals * 100
             
-            concept_data = {
-                "concept": concept,
-                "accuracy": round(concept_accuracy, 1),
-                "questions_attempted": data["total"],
-                "average_score": round(avg_score, 1),
-            }
+            # Rank on the reported (rounded) accuracy; heapq selection is stable,
+            # so ties keep first-seen order
+            rounded = [round(a, 1) for a in concept_accuracy.tolist()]
+            accuracy_of = rounded.__getitem__
+            strong = np.flatnonzero(concept_accuracy >= 70).tolist()
+            weak = np.flatnonzero(concept_accuracy < 70).tolist()
+            strength_order = heapq.nlargest(5, strong, key=accuracy_of)
+            weakness_order = heapq.nsmallest(5, weak, key=accuracy_of)
+            mastered_order = sorted((idx for idx in strong if rounded[idx] >= 90), key=accuracy_of, reverse=True)
             
-            if concept_accuracy >= 70:
-                strengths.append(concept_data)
-            else:
-                weaknesses.append(concept_data)
+            totals = totals.tolist()
+            average_scores = (score_sums / np.maximum(totals, 1)).tolist()
         
-        # Sort by accuracy
-        strengths.sort(key=lambda x: x["accuracy"], reverse=True)
-        weaknesses.sort(key=lambda x: x["accuracy"])
+        def concept_data(idx: int) -> Dict[str, Any]:
+            return {
+                "concept": concepts[idx],
+                "accuracy": rounded[idx],
+                "questions_attempted": totals[idx],
+                "average_score": round(average_scores[idx], 1),
+            }
+        
+        # Only the reported slices are materialized as dicts
+        strengths = [concept_data(idx) for idx in strength_order]
+        weaknesses = [concept_data(idx) for idx in weakness_order]
+        mastered_concepts = [concepts[idx] for idx in mastered_order]
         
         # Analyze difficulty trend
-        difficulty_analysis = self._analyze_session_difficulty(difficulty_progression, accuracy)
+        difficulty_levels = _difficulty_levels(difficulty_progression)
+        difficulty_analysis = self._analyze_session_difficulty(difficulty_levels, accuracy)
         
         # Calculate learning metrics
         learning_metrics = {
             "questions_answered": questions_answered,
             "correct_answers": correct_answers,
             "accuracy": round(accuracy, 1),
-            "avg_time_per_question": round(sum(time_per_question) / len(time_per_question), 1) if time_per_question else 0,
+            "avg_time_per_question": round(fmean(time_per_question), 1) if time_per_question else 0,
             "difficulty_range": {
                 "min": min(difficulty_progression) if difficulty_progression else "medium",
                 "max": max(difficulty_progression) if difficulty_progression else "medium",
@@ -802,43 +1384,34 @@ Be encouraging but honest. Focus on growth and specific actions."""
         )
         
         # Performance rating
-        performance_rating = self._calculate_session_rating(accuracy, difficulty_progression, consistency=learning_metrics["consistency_score"])
+        performance_rating = self._calculate_session_rating(accuracy, difficulty_levels, consistency=learning_metrics["consistency_score"])
         
         return {
             "learning_metrics": learning_metrics,
             "difficulty_progression": difficulty_progression,
             "difficulty_analysis": difficulty_analysis,
-            "strengths": strengths[:5],  # Top 5
-            "weaknesses": weaknesses[:5],  # Top 5
+            "strengths": strengths,  # Top 5
+            "weaknesses": weaknesses,  # Top 5
             "recommendations": recommendations,
             "performance_rating": performance_rating,
             "improvement_areas": [w["concept"] for w in weaknesses[:3]],
-            "mastered_concepts": [s["concept"] for s in strengths if s["accuracy"] >= 90],
+            "mastered_concepts": mastered_concepts,
         }
     
     def _analyze_session_difficulty(
         self,
-        difficulty_progression: List[str],
+        difficulty_levels: Sequence[int],
         accuracy: float
     ) -> Dict[str, Any]:
         """Analyze difficulty progression throughout the session"""
         
-        if not difficulty_progression:
+        if not len(difficulty_levels):
             return {
                 "pattern": "unknown",
                 "recommendation": "Continue practicing",
             }
         
-        difficulty_map = {"easy": 1, "medium": 2, "hard": 3}
-        numeric_progression = [difficulty_map.get(d, 2) for d in difficulty_progression]
-        
-        # Calculate trend
-        if len(numeric_progression) >= 2:
-            first_half = sum(numeric_progression[:len(numeric_progression)//2]) / (len(numeric_progression)//2)
-            second_half = sum(numeric_progression[len(numeric_progression)//2:]) / (len(numeric_progression) - len(numeric_progression)//2)
-            trend = second_half - first_half
-        else:
-            trend = 0
+        trend, average_difficulty = _difficulty_trend_kernel(difficulty_levels)
         
         if trend > 0.5:
             pattern = "increasing"
@@ -852,7 +1425,7 @@ Be encouraging but honest. Focus on growth and specific actions."""
         
         return {
             "pattern": pattern,
-            "average_difficulty": round(sum(numeric_progression) / len(numeric_progression), 2),
+            "average_difficulty": round(average_difficulty, 2),
             "trend": round(trend, 2),
             "recommendation": recommendation,
         }
@@ -866,14 +1439,8 @@ Be encouraging but honest. Focus on growth and specific actions."""
         if len(interactions) < 2:
             return 100.0
         
-        scores = [i.get("score", 0) for i in interactions]
-        if not scores:
-            return 100.0
-        
-        # Calculate variance
-        mean = sum(scores) / len(scores)
-        variance = sum((s - mean) ** 2 for s in scores) / len(scores)
-        std_dev = variance ** 0.5
+        scores = [interaction.get("score", 0) for interaction in interactions]
+        std_dev = _consistency_kernel(np.array(scores, dtype=np.float64) if HAS_NUMBA else scores)
         
         # Convert to consistency score (lower std_dev = higher consistency)
         # Assuming scores are 0-10, max std_dev would be about 5
@@ -889,46 +1456,17 @@ Be encouraging but honest. Focus on growth and specific actions."""
     ) -> List[Dict[str, Any]]:
         """Generate actionable recommendations based on session performance"""
         
-        recommendations = []
+        # Priorities are 1-3, so bucket by priority instead of sorting at the end
+        buckets: Tuple[List[Dict[str, Any]], ...] = ([], [], [])
         
-        # Accuracy-based recommendations
-        if accuracy < 40:
-            recommendations.append({
-                "priority": 1,
-                "type": "review",
-                "title": "Review Fundamentals",
-                "description": "Focus on understanding the basic concepts before moving to more complex topics.",
-                "action": "Start with easier questions and build up gradually",
-            })
-        elif accuracy < 60:
-            recommendations.append({
-                "priority": 1,
-                "type": "practice",
-                "title": "Targeted Practice",
-                "description": "You're making progress! Focus on your weak areas for faster improvement.",
-                "action": "Practice more questions on your weak concepts",
-            })
-        elif accuracy < 80:
-            recommendations.append({
-                "priority": 2,
-                "type": "challenge",
-                "title": "Push Your Limits",
-                "description": "You're doing well! Try harder questions to continue growing.",
-                "action": "Increase difficulty level in your next session",
-            })
-        else:
-            recommendations.append({
-                "priority": 3,
-                "type": "explore",
-                "title": "Explore New Topics",
-                "description": "Excellent performance! Consider exploring related advanced topics.",
-                "action": "Try a new or more advanced topic",
-            })
+        # Accuracy-based recommendation from the threshold table
+        recommendation = dict(_ACCURACY_RECOMMENDATIONS[bisect_right(_ACCURACY_THRESHOLDS, accuracy)])
+        buckets[recommendation["priority"] - 1].append(recommendation)
         
         # Weakness-based recommendations
         if weaknesses:
             weak_concepts = [w["concept"] for w in weaknesses[:2]]
-            recommendations.append({
+            buckets[0].append({
                 "priority": 1,
                 "type": "focus",
                 "title": "Focus Areas",
@@ -938,7 +1476,7 @@ Be encouraging but honest. Focus on growth and specific actions."""
         
         # Difficulty-based recommendations
         if difficulty_analysis.get("pattern") == "decreasing":
-            recommendations.append({
+            buckets[1].append({
                 "priority": 2,
                 "type": "foundation",
                 "title": "Strengthen Foundation",
@@ -946,28 +1484,19 @@ Be encouraging but honest. Focus on growth and specific actions."""
                 "action": "Review prerequisite concepts",
             })
         
-        return sorted(recommendations, key=lambda x: x["priority"])
+        return buckets[0] + buckets[1] + buckets[2]
     
     def _calculate_session_rating(
         self,
         accuracy: float,
-        difficulty_progression: List[str],
+        difficulty_levels: Sequence[int],
         consistency: float
     ) -> Dict[str, Any]:
         """Calculate an overall session rating"""
         
-        # Base score from accuracy
-        base_score = accuracy * 0.5
-        
-        # Bonus for harder difficulties
-        difficulty_map = {"easy": 0, "medium": 1, "hard": 2}
-        avg_difficulty = sum(difficulty_map.get(d, 1) for d in difficulty_progression) / len(difficulty_progression) if difficulty_progression else 1
-        difficulty_bonus = avg_difficulty * 10
-        
-        # Consistency bonus
-        consistency_bonus = consistency * 0.2
-        
-        total_score = min(100, base_score + difficulty_bonus + consistency_bonus)
+        total_score, base_score, difficulty_bonus, consistency_bonus = _session_rating_kernel(
+            float(accuracy), difficulty_levels, float(consistency)
+        )
         
         # Determine rating
         if total_score >= 90:
@@ -997,12 +1526,24 @@ Be encouraging but honest. Focus on growth and specific actions."""
             }
         }
     
-    def get_crew_agent_config(self) -> Dict[str, Any]:
+    async def close(self) -> None:
+        """Stop the feedback batcher"""
+        if self.batcher:
+            await self.batcher.close()
+    
+    @property
+    def crew_agent_config(self) -> Mapping[str, Any]:
+        """Read-only CrewAI agent configuration, built once per agent"""
+        if self._crew_agent_config is None:
+            self._crew_agent_config = MappingProxyType({
+                "role": self.role,
+                "goal": self.goal,
+                "backstory": self.backstory,
+                "verbose": True,
+                "allow_delegation": False,
+            })
+        return self._crew_agent_config
+    
+    def get_crew_agent_config(self) -> Mapping[str, Any]:
         """Get configuration for CrewAI agent"""
-        return {
-            "role": self.role,
-            "goal": self.goal,
-            "backstory": self.backstory,
-            "verbose": True,
-            "allow_delegation": False,
-        }
+        return self.crew_agent_config
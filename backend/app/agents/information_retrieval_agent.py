@@ -4,11 +4,387 @@ Second agent in the pipeline - fetches relevant content
 Implements dynamic fallback with Tavily search for academic content
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Iterable, Iterator, Optional, List, Mapping, Sequence, Tuple
+from functools import lru_cache, partial
+from operator import itemgetter
+from types import MappingProxyType
 from loguru import logger
 import asyncio
+import hashlib
+import heapq
+import importlib.util
+import re
+
+import httpx
+
+import numpy as np
 
 from app.config import settings
+from app.utils.ttl_cache import TTLCache
+from app.utils.inflight import InFlight
+from app.utils.rate_limiter import llm_request_slot
+from app.utils import fast_json
+
+
+# Ranking boost for dynamic sources over static templates
+_SOURCE_BONUS = {
+    "tavily_ai_answer": 0.15,
+    "tavily_search": 0.1,
+    "local_knowledge_base": 0.05,
+}
+
+# Results _rank_results keeps per retrieval
+_RANKED_RESULT_LIMIT = 5
+
+def _reciprocal_rank_fusion(
+    ranked_lists: Sequence[Iterable[Dict[str, Any]]],
+    weights: Sequence[float],
+    k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists with weighted Reciprocal Rank Fusion
+    
+    Each result scores weight / (k + rank) per list it appears in; results
+    with the same content ID (or, without one, the same leading content)
+    are treated as one. The fused score is stored on a copy of each result
+    as "fusion_score", scaled so a result ranked first in every list scores 1.
+    
+    Args:
+        ranked_lists: Result lists, each best first
+        weights: Weight per list
+        k: Damping constant that flattens the gap between top ranks
+        
+    Returns:
+        Deduplicated results, highest fused score first (first seen on ties)
+    """
+    fused: Dict[str, List[Any]] = {}  # dedup key -> [score, result]
+    for results, weight in zip(ranked_lists, weights):
+        for rank, result in enumerate(results, start=1):
+            key = result.get("content_id") or result.get("content", "")[:200]
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [weight / (k + rank), result]
+            else:
+                entry[0] += weight / (k + rank)
+    
+    best_possible = sum(weights) / (k + 1)
+    return [
+        {**result, "fusion_score": score / best_possible if best_possible else 0.0}
+        for score, result in sorted(fused.values(), key=itemgetter(0), reverse=True)
+    ]
+
+
+async def _resolved(value: Any) -> Any:
+    """Awaitable for an already-computed result, so it can be gathered with live searches"""
+    return value
+
+
+def _local_fills_ranking(local_count: int) -> bool:
+    """
+    Whether local results alone fill every slot _rank_results keeps
+    
+    True when there are enough of them and, under the fusion weights, even the
+    best web hit fuses below the last local hit that makes the cut.
+    """
+    if local_count < _RANKED_RESULT_LIMIT:
+        return False
+    local_weight, k = settings.retrieval_local_weight, settings.retrieval_fusion_k
+    return (1 - local_weight) / (k + 1) < local_weight / (k + _RANKED_RESULT_LIMIT)
+
+
+def _cancel_if_local_fills(dynamic_task: asyncio.Future, local_task: asyncio.Future) -> None:
+    """Done callback cancelling the Tavily search once local retrieval turns out to fill the ranking"""
+    if local_task.cancelled() or local_task.exception() is not None:
+        return
+    if _local_fills_ranking(len(local_task.result())):
+        dynamic_task.cancel()
+
+
+# Raw Tavily responses by hashed (search depth, query); web results change slowly
+_tavily_cache = TTLCache(maxsize=1024, ttl=86400)
+
+# Pending Tavily searches by cache key, so concurrent misses share one round-trip
+_inflight = InFlight()
+
+_TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+_JSON_HEADERS = MappingProxyType({"Content-Type": "application/json"})
+# httpx multiplexes requests over HTTP/2 only when the optional h2 package is present
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Relevance filter keywords (content should include academic indicators)
+_ACADEMIC_INDICATORS = (
+    "technical", "specification", "implementation", "analysis",
+    "methodology", "framework", "architecture", "principles",
+    "algorithm", "mechanism", "protocol", "standard", "theory",
+    "research", "study", "examination", "evaluation", "assessment"
+)
+
+# Low-quality indicators (filter these out)
+_LOW_QUALITY_INDICATORS = (
+    "blog", "opinion", "personal", "beginner's guide",
+    "for dummies", "easy introduction", "simple explanation"
+)
+
+# One scan per text; the lookahead reports indicators even where they overlap
+_ACADEMIC_RE = re.compile("(?=(" + "|".join(map(re.escape, _ACADEMIC_INDICATORS)) + "))")
+_LOW_QUALITY_RE = re.compile("|".join(map(re.escape, _LOW_QUALITY_INDICATORS)))
+# Per-indicator boost, and how much of a result is scanned (Tavily snippets are front-loaded)
+_ACADEMIC_BOOST = 0.05
+_ACADEMIC_SCAN_CHARS = 2048
+
+# Search terms appended to the query per learner intent
+_INTENT_EXPANSIONS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "definition_seeking": ("definition", "meaning"),
+    "explanation_seeking": ("explanation", "how"),
+    "application_seeking": ("example", "application"),
+    "clarification_seeking": ("simple explanation", "basics"),
+})
+
+# Tavily query qualifiers per difficulty level and subject domain
+_TAVILY_DIFFICULTY_TERMS: Mapping[str, str] = MappingProxyType({
+    "easy": "introductory fundamentals",
+    "medium": "intermediate concepts and applications",
+    "hard": "advanced technical deep-dive",
+    "expert": "expert-level professional specification"
+})
+_TAVILY_DOMAIN_QUALIFIERS: Mapping[str, str] = MappingProxyType({
+    "Computer_Science": "technical documentation algorithms implementation",
+    "STEM": "scientific principles mathematical analysis",
+    "Professional_Certification": "professional standards exam preparation",
+    "Medical": "clinical guidelines physiological mechanisms",
+    "Legal": "legal framework statutory interpretation",
+    "Business": "business strategy management principles",
+    "Engineering": "engineering specifications design analysis",
+})
+
+
+@lru_cache(maxsize=2048)
+def _build_expanded_query(topic: str, subtopics: Tuple[str, ...], intent: str) -> str:
+    """Join the topic, subtopics and intent-specific terms into a search query"""
+    return " ".join((topic, *subtopics, *_INTENT_EXPANSIONS.get(intent, ())))
+
+
+@lru_cache(maxsize=256)
+def _build_tavily_suffix(difficulty: str, subject_domain: str) -> str:
+    """Difficulty and domain qualifiers appended to every Tavily query for the topic"""
+    diff_context = _TAVILY_DIFFICULTY_TERMS.get(difficulty, "intermediate concepts")
+    domain_qualifier = _TAVILY_DOMAIN_QUALIFIERS.get(subject_domain, "academic professional")
+    return f"{diff_context} {domain_qualifier} exam-style assessment concepts"
+
+
+# Structured fallback templates by subject domain ({topic} and {difficulty} are filled per request)
+_STRUCTURED_TEMPLATES = {
+    "Computer_Science": """TECHNICAL ASSESSMENT FRAMEWORK: {topic}
+
+<assessment_context>
+Domain: Computer Science / Software Engineering
+Topic: {topic}
+Difficulty: {difficulty}
+</assessment_context>
+
+<core_competencies>
+1. ALGORITHMIC UNDERSTANDING
+   - Time complexity analysis (Big-O notation)
+   - Space complexity trade-offs
+   - Optimization strategies and their limitations
+
+2. IMPLEMENTATION KNOWLEDGE
+   - Design patterns applicable to {topic}
+   - Edge cases and boundary conditions
+   - Error handling and fault tolerance
+
+3. SYSTEM DESIGN
+   - Scalability considerations for {topic}
+   - Performance bottlenecks and solutions
+   - Integration patterns with other systems
+
+4. DEBUGGING & TROUBLESHOOTING
+   - Common failure modes in {topic}
+   - Diagnostic approaches
+   - Resolution strategies
+</core_competencies>
+
+<question_blueprints>
+BLUEPRINT_A (Analysis): "Given a scenario with [Variable A] and [Variable B], evaluate the impact of {topic} on system performance. Which trade-off is unavoidable?"
+
+BLUEPRINT_B (Application): "A production system using {topic} experiences [Symptom X]. Analyze the most likely root cause and propose the optimal resolution strategy."
+
+BLUEPRINT_C (Comparison): "Compare the implementation of {topic} using approach [Method 1] versus [Method 2]. Under what conditions would each be preferred?"
+</question_blueprints>""",
+
+    "Professional_Certification": """PROFESSIONAL ASSESSMENT FRAMEWORK: {topic}
+
+<assessment_context>
+Domain: Professional Certification Standards
+Topic: {topic}
+Difficulty: {difficulty}
+</assessment_context>
+
+<competency_areas>
+1. REGULATORY KNOWLEDGE
+   - Applicable standards and frameworks for {topic}
+   - Compliance requirements
+   - Industry best practices
+
+2. PROCEDURAL EXPERTISE
+   - Standard operating procedures
+   - Decision-making frameworks
+   - Risk assessment methodologies
+
+3. PROFESSIONAL JUDGMENT
+   - Ethical considerations in {topic}
+   - Stakeholder impact analysis
+   - Documentation and reporting requirements
+</competency_areas>
+
+<question_blueprints>
+BLUEPRINT_A (Procedural): "In a scenario where [Condition X] is met, how does {topic} dictate the optimal procedural response according to [Framework Y]?"
+
+BLUEPRINT_B (Judgment): "A professional encounters [Ethical Dilemma] while implementing {topic}. Evaluate the appropriate course of action considering [Constraint Z]."
+
+BLUEPRINT_C (Integration): "How do the requirements of {topic} interact with [Related Standard W] when [Condition] exists?"
+</question_blueprints>""",
+
+    "Medical": """CLINICAL ASSESSMENT FRAMEWORK: {topic}
+
+<assessment_context>
+Domain: Medical / Biomedical Sciences
+Topic: {topic}
+Difficulty: {difficulty}
+</assessment_context>
+
+<competency_areas>
+1. MECHANISTIC UNDERSTANDING
+   - Physiological pathways related to {topic}
+   - Cellular and molecular mechanisms
+   - Homeostatic regulation
+
+2. CLINICAL APPLICATION
+   - Diagnostic criteria and differential diagnosis
+   - Treatment protocols and contraindications
+   - Patient monitoring parameters
+
+3. PATHOPHYSIOLOGY
+   - Disease mechanisms affecting {topic}
+   - Compensatory responses
+   - Therapeutic targets
+</competency_areas>
+
+<question_blueprints>
+BLUEPRINT_A (Mechanism): "Analyze the physiological pathway of {topic}. If [Inhibitor Z] is introduced, which downstream effect most clearly demonstrates understanding of the mechanism?"
+
+BLUEPRINT_B (Clinical): "A patient presents with [Symptom Complex]. Based on the pathophysiology of {topic}, which finding would most strongly support the suspected diagnosis?"
+
+BLUEPRINT_C (Therapeutic): "When treating a condition affecting {topic}, what is the primary consideration when [Comorbidity X] is present?"
+</question_blueprints>""",
+
+    "STEM": """SCIENTIFIC ASSESSMENT FRAMEWORK: {topic}
+
+<assessment_context>
+Domain: STEM (Science, Technology, Engineering, Mathematics)
+Topic: {topic}
+Difficulty: {difficulty}
+</assessment_context>
+
+<competency_areas>
+1. THEORETICAL FOUNDATIONS
+   - Fundamental principles governing {topic}
+   - Mathematical models and equations
+   - Assumptions and limitations
+
+2. EXPERIMENTAL METHODOLOGY
+   - Measurement techniques for {topic}
+   - Error analysis and uncertainty
+   - Data interpretation
+
+3. APPLICATIONS
+   - Real-world implementations of {topic}
+   - Engineering considerations
+   - Interdisciplinary connections
+</competency_areas>
+
+<question_blueprints>
+BLUEPRINT_A (Analysis): "Given the relationship between [Variable A] and [Variable B] in {topic}, predict the outcome when [Condition C] is modified. Justify your reasoning."
+
+BLUEPRINT_B (Evaluation): "An experiment investigating {topic} yields [Result X]. Evaluate potential sources of systematic error and their impact on conclusions."
+
+BLUEPRINT_C (Synthesis): "Design an approach to measure [Property P] of {topic} given the constraints of [Limitation L]. What trade-offs are inherent in your design?"
+</question_blueprints>"""
+}
+
+# Default general template for unspecified domains
+_DEFAULT_STRUCTURED_TEMPLATE = """ACADEMIC ASSESSMENT FRAMEWORK: {topic}
+
+<assessment_context>
+Domain: General Academic
+Topic: {topic}
+Difficulty: {difficulty}
+</assessment_context>
+
+<competency_areas>
+1. CONCEPTUAL UNDERSTANDING
+   - Core definitions and principles of {topic}
+   - Relationships between key concepts
+   - Historical development and context
+
+2. ANALYTICAL SKILLS
+   - Critical evaluation of {topic}
+   - Comparison with related concepts
+   - Identification of strengths and limitations
+
+3. APPLICATION
+   - Practical uses of {topic}
+   - Problem-solving approaches
+   - Real-world implications
+</competency_areas>
+
+<question_blueprints>
+BLUEPRINT_A (Analysis): "Evaluate the relationship between [Concept A] and [Concept B] within the context of {topic}. What implications arise from this relationship?"
+
+BLUEPRINT_B (Application): "Given a scenario involving {topic} and [Constraint X], determine the optimal approach and justify your reasoning."
+
+BLUEPRINT_C (Synthesis): "How does understanding {topic} contribute to solving [Problem Type Y]? Provide a structured analysis."
+</question_blueprints>
+
+<assessment_guidelines>
+- Questions should test application and analysis, NOT mere recall
+- Distractors must represent plausible misconceptions
+- Scenarios should reflect realistic professional/academic challenges
+- Explanations should illuminate underlying principles
+</assessment_guidelines>"""
+
+
+# Bound formatters per domain, resolved once at import
+_TEMPLATE_BUILDERS: Dict[str, Callable[..., str]] = {
+    domain: template.format for domain, template in _STRUCTURED_TEMPLATES.items()
+}
+_DEFAULT_TEMPLATE_BUILDER = _DEFAULT_STRUCTURED_TEMPLATE.format
+
+
+@lru_cache(maxsize=512)
+def _render_structured_template(subject_domain: str, topic: str, difficulty: str) -> str:
+    """Format the structured template for a domain, once per (domain, topic, difficulty)"""
+    builder = _TEMPLATE_BUILDERS.get(subject_domain, _DEFAULT_TEMPLATE_BUILDER)
+    return builder(topic=topic, difficulty=difficulty)
+
+
+@lru_cache(maxsize=256)
+def _profile_patterns(
+    weaknesses: Tuple[str, ...],
+    knowledge_gaps: Tuple[str, ...]
+) -> Tuple[Optional[re.Pattern], Optional[re.Pattern]]:
+    """
+    Case-insensitive matchers for a learner's weaknesses and knowledge gaps
+    
+    Each list is compiled into one escaped alternation, once per distinct profile.
+    
+    Returns:
+        (weakness pattern, gap pattern); None where the list is empty
+    """
+    return tuple(
+        re.compile("|".join(re.escape(term.lower()) for term in terms)) if terms else None
+        for terms in (weaknesses, knowledge_gaps)
+    )
 
 
 class InformationRetrievalAgent:
@@ -30,6 +406,17 @@ class InformationRetrievalAgent:
     - Filter content based on learner level and academic rigor
     """
     
+    __slots__ = (
+        "llm_client",
+        "knowledge_service",
+        "tavily_client",
+        "name",
+        "role",
+        "goal",
+        "backstory",
+        "_crew_agent_config",
+    )
+    
     def __init__(self, llm_client=None, knowledge_service=None):
         """
         Initialize the Information Retrieval Agent
@@ -48,39 +435,59 @@ class InformationRetrievalAgent:
         You have an encyclopedic knowledge of educational resources and can quickly identify
         the most relevant materials for any learning need. You understand how to match
         content difficulty to learner levels and learning styles."""
+        self._crew_agent_config: Optional[Mapping[str, Any]] = None
     
-    def _init_tavily_client(self):
-        """Initialize Tavily client for dynamic content retrieval"""
+    def _init_tavily_client(self) -> Optional[httpx.AsyncClient]:
+        """
+        Initialize the pooled async HTTP client for Tavily search
+        
+        The Tavily REST endpoint is called directly so searches are awaited
+        natively instead of tying up a worker thread each.
+        """
         if settings.tavily_api_key:
             try:
-                from tavily import TavilyClient
+                client = httpx.AsyncClient(
+                    http2=_HTTP2_AVAILABLE,
+                    limits=httpx.Limits(
+                        max_connections=settings.tavily_concurrency,
+                        max_keepalive_connections=settings.tavily_concurrency,
+                    ),
+                    timeout=httpx.Timeout(settings.tavily_timeout),
+                )
                 logger.info("[InfoRetrieval] Tavily client initialized for dynamic fallback")
-                return TavilyClient(api_key=settings.tavily_api_key)
-            except ImportError:
-                logger.warning("[InfoRetrieval] tavily-python not installed, dynamic fallback disabled")
+                return client
             except Exception as e:
                 logger.warning(f"[InfoRetrieval] Failed to initialize Tavily: {e}")
         else:
             logger.info("[InfoRetrieval] No Tavily API key configured, using static fallback only")
         return None
     
+    async def close(self) -> None:
+        """Close the Tavily connection pool"""
+        if self.tavily_client is not None and not self.tavily_client.is_closed:
+            await self.tavily_client.aclose()
+    
     async def retrieve(
         self,
         query_analysis: Dict[str, Any],
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        local: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Retrieve relevant content based on query analysis
         
         Retrieval Chain:
         1. Check for uploaded document content in context
-        2. Try local knowledge base
-        3. If insufficient, trigger Tavily dynamic search (augmented with extracted keywords)
-        4. If Tavily fails, use structured templates
+        2. Query the local knowledge base and Tavily (augmented with extracted
+           keywords) concurrently and fuse them with Reciprocal Rank Fusion;
+           Tavily is skipped once local results fill every ranked slot
+        3. If both come back empty, use structured templates
         
         Args:
             query_analysis: Output from Query Analysis Agent
             context: Session context (may contain uploaded_content and extracted_keywords)
+            local: Result of an earlier retrieve_local(), reused only if it searched
+                with the same inputs this analysis produces
             
         Returns:
             Retrieved content and metadata
@@ -98,94 +505,102 @@ class InformationRetrievalAgent:
                 logger.info(f"[InfoRetrieval] Extracted keywords: {extracted_keywords[:5]}")
         
         try:
-            # Extract search parameters from analysis
-            topic_data = query_analysis.get("topic", {})
-            if isinstance(topic_data, dict):
-                topic = topic_data.get("main", "")
-                subtopics = topic_data.get("subtopics", [])
-                subject_domain = topic_data.get("subject", "General")
-            else:
-                topic = str(topic_data) if topic_data else ""
-                subtopics = []
-                subject_domain = "General"
-            
-            # Fallback to context topic if query_analysis doesn't have it
-            if not topic:
-                topic = context.get("topic", "general")
-            
-            # Use detected subject from document upload if available
-            if is_document_upload and context.get("detected_subject"):
-                subject_domain = context.get("detected_subject", subject_domain)
-            
-            logger.info(f"[InfoRetrieval] Retrieving content for topic: '{topic}', domain: '{subject_domain}'")
-            
-            difficulty = query_analysis.get("recommendations", {}).get("suggested_difficulty", "medium")
-            intent = query_analysis.get("intent", {}).get("primary", "")
+            topic, subtopics, subject_domain, difficulty, intent, expanded_query = await self._search_inputs(
+                query_analysis,
+                context
+            )
             
-            # Expand query for better retrieval (include extracted keywords if available)
-            expanded_query = await self._expand_query(topic, subtopics, intent)
+            # Steps 1-2: Local knowledge base and Tavily run concurrently; a
+            # speculative local search is reused when it used the same inputs
+            if local is not None and local.get("key") == self._local_search_key(
+                expanded_query, topic, difficulty, subtopics, context
+            ):
+                logger.info(f"[InfoRetrieval] Reusing speculative local retrieval for topic: '{topic}'")
+                prefetched = local["results"]
+                local_task = asyncio.ensure_future(_resolved(prefetched))
+            else:
+                prefetched = None
+                local_task = asyncio.ensure_future(self._local_retrieval(
+                    query=expanded_query,
+                    topic=topic,
+                    difficulty=difficulty,
+                    learner_profile=context.get("learner_profile", {}),
+                    modality=context.get("input_modality", "text"),
+                    subtopics=subtopics
+                ))
             
-            # Augment query with extracted keywords from uploaded document
-            if extracted_keywords:
-                keyword_addition = " ".join(extracted_keywords[:5])
-                expanded_query = f"{expanded_query} {keyword_addition}"
-                logger.info(f"[InfoRetrieval] Query augmented with document keywords: '{keyword_addition}'")
+            if prefetched is not None and _local_fills_ranking(len(prefetched)):
+                # Speculative local results already fill every ranked slot
+                dynamic_task = asyncio.ensure_future(_resolved([]))
+            else:
+                dynamic_task = asyncio.ensure_future(self._tavily_dynamic_search(
+                    topic=topic,
+                    subject_domain=subject_domain,
+                    difficulty=difficulty,
+                    subtopics=subtopics + extracted_keywords[:3]  # Add keywords to subtopics for Tavily
+                ))
+                local_task.add_done_callback(partial(_cancel_if_local_fills, dynamic_task))
             
-            # Step 0: If document was uploaded, create a content chunk from it
+            # Step 0: If document was uploaded, chunk it in a worker thread meanwhile
             results = []
             if is_document_upload and uploaded_content:
-                # Create chunked content from uploaded document
-                document_chunks = self._chunk_uploaded_content(
-                    uploaded_content, 
-                    topic, 
-                    difficulty,
-                    context.get("document_metadata", {})
+                document_chunks, local_results, dynamic_results = await asyncio.gather(
+                    asyncio.to_thread(
+                        self._chunk_uploaded_content,
+                        uploaded_content,
+                        topic,
+                        difficulty,
+                        context.get("document_metadata", {})
+                    ),
+                    local_task,
+                    dynamic_task,
+                    return_exceptions=True
                 )
+                if isinstance(document_chunks, BaseException):
+                    raise document_chunks
                 results.extend(document_chunks)
                 logger.info(f"[InfoRetrieval] Added {len(document_chunks)} chunks from uploaded document")
+            else:
+                local_results, dynamic_results = await asyncio.gather(
+                    local_task,
+                    dynamic_task,
+                    return_exceptions=True
+                )
             
-            # Step 1: Try local knowledge base
-            local_results = await self._local_retrieval(
-                query=expanded_query,
-                topic=topic,
-                difficulty=difficulty,
-                learner_profile=context.get("learner_profile", {}),
-                modality=context.get("input_modality", "text")
-            )
+            # A failed source contributes nothing; the other can still serve
+            if isinstance(local_results, BaseException):
+                logger.warning(f"[InfoRetrieval] Local retrieval failed: {local_results}")
+                local_results = []
+            if dynamic_task.cancelled():
+                logger.info("[InfoRetrieval] Local results fill every ranked slot, Tavily search skipped")
+                dynamic_results = []
+            elif isinstance(dynamic_results, BaseException):
+                logger.warning(f"[InfoRetrieval] Tavily search failed: {dynamic_results}")
+                dynamic_results = []
             
-            results.extend(local_results or [])
+            # Hybrid merge: fuse both ranked lists, dropping duplicate content
+            fused_results = _reciprocal_rank_fusion(
+                [local_results or [], dynamic_results or []],
+                weights=(settings.retrieval_local_weight, 1 - settings.retrieval_local_weight),
+                k=settings.retrieval_fusion_k
+            )
+            results.extend(fused_results)
+            logger.info(
+                f"[InfoRetrieval] Fused {len(local_results or [])} local and "
+                f"{len(dynamic_results or [])} Tavily results into {len(fused_results)}"
+            )
             
-            # Step 2: Hybrid merge - if results insufficient, augment with Tavily
-            # Use threshold of 2 quality chunks for augmentation (excluding document chunks for this check)
-            non_document_results = [r for r in results if r.get("source") != "uploaded_document"]
-            if len(non_document_results) < 2:
-                logger.info(f"[InfoRetrieval] External results insufficient ({len(non_document_results)}), triggering Tavily augmentation")
-                
-                # Try Tavily dynamic search with keyword-augmented query
-                dynamic_results = await self._tavily_dynamic_search(
-                    topic=topic,
-                    subject_domain=subject_domain,
-                    difficulty=difficulty,
-                    subtopics=subtopics + extracted_keywords[:3]  # Add keywords to subtopics for Tavily
-                )
-                
-                if dynamic_results:
-                    # Hybrid merge: keep existing results and extend with Tavily results
-                    # Avoid duplicates by checking content similarity
-                    existing_content = set(r.get("content", "")[:200] for r in results)
-                    for dr in dynamic_results:
-                        if dr.get("content", "")[:200] not in existing_content:
-                            results.append(dr)
-                    logger.info(f"[InfoRetrieval] After Tavily merge: {len(results)} total results")
-                
-                # If still no results (beyond document), use structured templates
-                if not non_document_results and not dynamic_results:
-                    logger.warning(f"[InfoRetrieval] No external results after merge, using structured templates")
-                    results.extend(self._get_structured_template_content(topic, subject_domain, difficulty))
+            # If no external results at all, use structured templates
+            if not fused_results:
+                logger.warning(f"[InfoRetrieval] No external results, using structured templates")
+                results.extend(self._get_structured_template_content(topic, subject_domain, difficulty))
             
             # Rank and filter results
             ranked_results = self._rank_results(results, query_analysis, context)
             
+            # Count each served knowledge base chunk once, however many searches found it
+            await self._record_local_retrievals(ranked_results)
+            
             return {
                 "status": "success",
                 "query": expanded_query,
@@ -213,6 +628,98 @@ class InformationRetrievalAgent:
                 "total_found": 1,
             }
     
+    async def retrieve_local(
+        self,
+        query_analysis: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Search only the local knowledge base, as retrieve() would for this analysis
+        
+        Makes no Tavily calls, so it is cheap to run speculatively before the
+        query analysis is final. Pass the result to retrieve() as `local`.
+        
+        Args:
+            query_analysis: Query analysis, or a seed built from the session before it
+            context: Session context
+            
+        Returns:
+            {"key": inputs the search used, "results": local knowledge base results}
+        """
+        context = context or {}
+        topic, subtopics, _, difficulty, _, expanded_query = await self._search_inputs(query_analysis, context)
+        
+        return {
+            "key": self._local_search_key(expanded_query, topic, difficulty, subtopics, context),
+            "results": await self._local_retrieval(
+                query=expanded_query,
+                topic=topic,
+                difficulty=difficulty,
+                learner_profile=context.get("learner_profile", {}),
+                modality=context.get("input_modality", "text"),
+                subtopics=subtopics
+            ),
+        }
+    
+    async def _search_inputs(
+        self,
+        query_analysis: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> Tuple[str, List[str], str, str, str, str]:
+        """
+        Read the search parameters from a query analysis
+        
+        Returns:
+            (topic, subtopics, subject_domain, difficulty, intent, expanded_query)
+        """
+        extracted_keywords = context.get("extracted_keywords", [])
+        
+        # Extract search parameters from analysis
+        topic_data = query_analysis.get("topic", {})
+        if isinstance(topic_data, dict):
+            topic = topic_data.get("main", "")
+            subtopics = topic_data.get("subtopics", [])
+            subject_domain = topic_data.get("subject", "General")
+        else:
+            topic = str(topic_data) if topic_data else ""
+            subtopics = []
+            subject_domain = "General"
+        
+        # Fallback to context topic if query_analysis doesn't have it
+        if not topic:
+            topic = context.get("topic", "general")
+        
+        # Use detected subject from document upload if available
+        if context.get("is_document_upload") and context.get("detected_subject"):
+            subject_domain = context.get("detected_subject", subject_domain)
+        
+        logger.info(f"[InfoRetrieval] Retrieving content for topic: '{topic}', domain: '{subject_domain}'")
+        
+        difficulty = query_analysis.get("recommendations", {}).get("suggested_difficulty", "medium")
+        intent = query_analysis.get("intent", {}).get("primary", "")
+        
+        # Expand query for better retrieval (include extracted keywords if available)
+        expanded_query = await self._expand_query(topic, subtopics, intent)
+        
+        # Augment query with extracted keywords from uploaded document
+        if extracted_keywords:
+            keyword_addition = " ".join(extracted_keywords[:5])
+            expanded_query = f"{expanded_query} {keyword_addition}"
+            logger.info(f"[InfoRetrieval] Query augmented with document keywords: '{keyword_addition}'")
+        
+        return topic, subtopics, subject_domain, difficulty, intent, expanded_query
+    
+    def _local_search_key(
+        self,
+        expanded_query: str,
+        topic: str,
+        difficulty: str,
+        subtopics: List[str],
+        context: Dict[str, Any]
+    ) -> tuple:
+        """Everything _local_retrieval() searches with, to tell whether a speculative result still applies"""
+        return (expanded_query, topic, difficulty, tuple(subtopics[:3]), context.get("input_modality", "text"))
+    
     async def _expand_query(
         self,
         topic: str,
@@ -221,21 +728,8 @@ class InformationRetrievalAgent:
     ) -> str:
         """Expand the search query for better retrieval"""
         
-        # Combine topic and subtopics
-        query_parts = [topic] + subtopics
-        
-        # Add intent-specific terms
-        intent_expansions = {
-            "definition_seeking": ["definition", "meaning", "what is"],
-            "explanation_seeking": ["explanation", "how", "why", "concept"],
-            "application_seeking": ["example", "application", "use case", "practice"],
-            "clarification_seeking": ["simple explanation", "basics", "fundamentals"],
-        }
-        
-        if intent in intent_expansions:
-            query_parts.extend(intent_expansions[intent][:2])
-        
-        expanded = " ".join(query_parts)
+        # Combine topic, subtopics and intent-specific terms
+        expanded = _build_expanded_query(topic, tuple(subtopics), intent)
         
         # Rule-based expansion only (removed LLM dependency for reliability)
         # The Tavily search will handle semantic understanding
@@ -254,10 +748,11 @@ Topic: "{topic}"
 Return only the expanded query string, no explanation."""
 
         try:
-            response = await self.llm_client.aio.models.generate_content(
-                model=settings.gemini_model,
-                contents=prompt,
-            )
+            async with llm_request_slot():
+                response = await self.llm_client.aio.models.generate_content(
+                    model=settings.gemini_model,
+                    contents=prompt,
+                )
             if response and response.text:
                 return response.text.strip()
         
@@ -272,36 +767,76 @@ Return only the expanded query string, no explanation."""
         topic: str,
         difficulty: str,
         learner_profile: Dict[str, Any],
-        modality: str
+        modality: str,
+        subtopics: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        """Perform semantic retrieval from local knowledge base"""
+        """Perform hybrid (semantic + BM25 keyword) retrieval from local knowledge base"""
         
-        results = []
+        if not self.knowledge_service:
+            return []
         
-        if self.knowledge_service:
-            from app.services.knowledge_base import KnowledgeBaseService
-            
-            semantic_results = await KnowledgeBaseService.search(
-                query=query,
+        from app.services.knowledge_base import KnowledgeBaseService
+        
+        # The expanded query plus the leading subtopics
+        queries = [query, *(subtopics or [])[:3]]
+        
+        # Semantic search embeds all queries as one batch; BM25 catches exact terms it misses
+        semantic_results, keyword_results = await asyncio.gather(
+            KnowledgeBaseService.search_many(
+                queries=queries,
+                topic=topic if topic else None,
+                difficulty=difficulty,
+                limit=10,
+                modality=modality
+            ),
+            KnowledgeBaseService.bm25_search(
+                " ".join(queries),
                 topic=topic if topic else None,
                 difficulty=difficulty,
                 limit=10,
                 modality=modality
             )
-            
-            for result in semantic_results:
-                results.append({
-                    "content_id": result.content_id,
-                    "content": result.content_text,
-                    "summary": result.content_summary,
-                    "topic": result.topic,
-                    "difficulty": result.difficulty,
-                    "relevance_score": result.relevance_score,
-                    "concepts": result.concepts,
-                    "source": "local_knowledge_base"
-                })
-        
-        return results
+        )
+        
+        def to_chunk(result, with_score: bool) -> Dict[str, Any]:
+            chunk = {
+                "content_id": result.content_id,
+                "content": result.content_text,
+                "summary": result.content_summary,
+                "topic": result.topic,
+                "difficulty": result.difficulty,
+                "concepts": result.concepts,
+                "source": "local_knowledge_base"
+            }
+            if with_score:
+                chunk["relevance_score"] = result.relevance_score
+            return chunk
+        
+        # BM25 scores are relative to the best keyword hit, so they only order the
+        # keyword list and are not exposed as relevance; fusion ranks on positions
+        ranked_lists = [
+            [to_chunk(result, True) for result in semantic_results],
+            [to_chunk(result, False) for result in keyword_results],
+        ]
+        
+        return _reciprocal_rank_fusion(
+            ranked_lists,
+            (1.0 - settings.retrieval_bm25_weight, settings.retrieval_bm25_weight),
+            k=settings.retrieval_fusion_k
+        )[:10]
+    
+    async def _record_local_retrievals(self, results: List[Dict[str, Any]]) -> None:
+        """Bump the retrieval count of the local knowledge base chunks being served"""
+        
+        if not self.knowledge_service:
+            return
+        
+        from app.services.knowledge_base import KnowledgeBaseService
+        
+        await KnowledgeBaseService.record_retrievals([
+            result["content_id"] for result in results
+            if result.get("source") == "local_knowledge_base" and result.get("content_id")
+        ])
     
     def _chunk_uploaded_content(
         self,
@@ -430,90 +965,113 @@ Return only the expanded query string, no explanation."""
         """
         Perform dynamic search via Tavily API for academic content
         
-        This is the primary fallback mechanism when local KB is insufficient.
-        Uses rigorous search queries optimized for academic/professional content.
+        Runs alongside the local KB search; its results are fused with the local ones.
+        Uses rigorous search queries optimized for academic/professional content,
+        one per subtopic (searched concurrently and merged with RRF).
         """
         if not self.tavily_client:
             return []
         
         try:
-            # Build rigorous academic search query
-            difficulty_terms = {
-                "easy": "introductory fundamentals",
-                "medium": "intermediate concepts and applications",
-                "hard": "advanced technical deep-dive",
-                "expert": "expert-level professional specification"
-            }
-            diff_context = difficulty_terms.get(difficulty, "intermediate concepts")
-            
-            # Domain-specific search optimization
-            domain_qualifiers = {
-                "Computer_Science": "technical documentation algorithms implementation",
-                "STEM": "scientific principles mathematical analysis",
-                "Professional_Certification": "professional standards exam preparation",
-                "Medical": "clinical guidelines physiological mechanisms",
-                "Legal": "legal framework statutory interpretation",
-                "Business": "business strategy management principles",
-                "Engineering": "engineering specifications design analysis",
-            }
-            domain_qualifier = domain_qualifiers.get(subject_domain, "academic professional")
-            
             # Construct rigorous search query
-            search_query = f"{topic} {diff_context} {domain_qualifier} exam-style assessment concepts"
+            base_query = f"{topic} {_build_tavily_suffix(difficulty, subject_domain)}"
             
-            if subtopics:
-                search_query += f" {' '.join(subtopics[:3])}"
+            # One focused search per subtopic instead of one diluted combined query
+            queries = [base_query, *(f"{base_query} {subtopic}" for subtopic in (subtopics or [])[:3])]
             
-            logger.info(f"[InfoRetrieval] Tavily search: '{search_query}'")
+            logger.info(f"[InfoRetrieval] Tavily search: {queries}")
             
-            # Execute Tavily search (synchronously in executor)
-            loop = asyncio.get_event_loop()
-            search_results = await loop.run_in_executor(
-                None,
-                lambda: self.tavily_client.search(
-                    query=search_query,
-                    search_depth=settings.tavily_search_depth,
-                    max_results=5,
-                    include_answer=True,
-                    include_raw_content=False
-                )
+            responses = await asyncio.gather(
+                *(self._tavily_search(search_query) for search_query in queries),
+                return_exceptions=True
             )
             
             # Process and filter results for academic relevance
-            processed_results = self._process_tavily_results(
-                search_results, 
-                topic, 
-                difficulty,
-                subject_domain
-            )
+            ranked_lists = []
+            for search_query, response in zip(queries, responses):
+                if isinstance(response, Exception):
+                    logger.warning(f"[InfoRetrieval] Tavily search failed for '{search_query}': {response}")
+                    continue
+                ranked_lists.append(self._process_tavily_results(
+                    response,
+                    topic,
+                    difficulty,
+                    subject_domain
+                ))
             
-            return processed_results
+            return _reciprocal_rank_fusion(
+                ranked_lists,
+                [1.0] * len(ranked_lists),
+                k=settings.retrieval_fusion_k
+            )
             
         except Exception as e:
             logger.error(f"[InfoRetrieval] Tavily search failed: {e}")
             return []
     
+    async def _tavily_search(self, search_query: str) -> Dict[str, Any]:
+        """
+        Run one Tavily search, served from the cache or a pending identical call when possible
+        
+        Args:
+            search_query: Full search query
+            
+        Returns:
+            Raw Tavily response
+        """
+        # Identical searches within the TTL are served from the cache
+        cache_key = hashlib.blake2b(
+            f"{settings.tavily_search_depth}\x00{search_query}".encode(), digest_size=16
+        ).hexdigest()
+        search_results = _tavily_cache.get(cache_key)
+        if search_results is not None:
+            logger.debug(f"[InfoRetrieval] Tavily cache hit for '{search_query}'")
+            return search_results
+        
+        async def search() -> Dict[str, Any]:
+            # Execute Tavily search over the pooled async connection
+            response = await self.tavily_client.post(
+                _TAVILY_SEARCH_URL,
+                content=fast_json.dumps({
+                    "api_key": settings.tavily_api_key,
+                    "query": search_query,
+                    "search_depth": settings.tavily_search_depth,
+                    "max_results": 5,
+                    "include_answer": True,
+                    "include_raw_content": False,
+                }),
+                headers=_JSON_HEADERS,
+            )
+            response.raise_for_status()
+            # Parsed from the raw bytes (orjson when installed)
+            results = fast_json.loads(response.content)
+            _tavily_cache.set(cache_key, results)
+            return results
+        
+        return await _inflight.run(("tavily", cache_key), search)
+    
     def _process_tavily_results(
         self,
         tavily_response: Dict[str, Any],
         topic: str,
         difficulty: str,
         subject_domain: str
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """
         Process Tavily results and filter for academic quality
         
+        Results are yielded lazily in Tavily's order, so fusion consumes
+        them without an intermediate list.
+        
         Filters out:
         - Blog-like or informal content
         - Content that's too introductory for the requested difficulty
         - Low-relevance results
         """
-        results = []
-        
         # Extract the AI-generated answer if available (highest quality summary)
         answer = tavily_response.get("answer", "")
         if answer and len(answer) > 100:
-            results.append({
+            yield {
                 "content_id": f"tavily_answer_{topic}",
                 "content": f"""ACADEMIC CONTENT SUMMARY: {topic}
 
@@ -529,59 +1087,50 @@ ASSESSMENT CONTEXT:
                 "relevance_score": 0.9,
                 "concepts": [topic, f"{topic} applications", f"{topic} analysis"],
                 "source": "tavily_ai_answer"
-            })
+            }
         
         # Process individual search results
         search_results = tavily_response.get("results", [])
         
-        # Relevance filter keywords (content should include academic indicators)
-        academic_indicators = [
-            "technical", "specification", "implementation", "analysis",
-            "methodology", "framework", "architecture", "principles",
-            "algorithm", "mechanism", "protocol", "standard", "theory",
-            "research", "study", "examination", "evaluation", "assessment"
-        ]
-        
-        # Low-quality indicators (filter these out)
-        low_quality_indicators = [
-            "blog", "opinion", "personal", "beginner's guide", 
-            "for dummies", "easy introduction", "simple explanation"
-        ]
-        
         for result in search_results[:5]:
             content = result.get("content", "")
-            title = result.get("title", "").lower()
-            url = result.get("url", "").lower()
             score = result.get("score", 0.5)
             
+            # Cheap length check first so short snippets skip the scans entirely
+            if len(content) <= 150:
+                continue
+            
+            raw_title = result.get("title")
+            # Lowercased once; every indicator scan below reuses these copies
+            title = (raw_title or "").lower()
+            url = result.get("url", "").lower()
+            
             # Skip low-quality content
-            if any(indicator in title or indicator in url for indicator in low_quality_indicators):
+            if _LOW_QUALITY_RE.search(title) or _LOW_QUALITY_RE.search(url):
                 logger.debug(f"[InfoRetrieval] Filtered out low-quality result: {title}")
                 continue
             
-            # Boost results with academic indicators
-            academic_score = sum(1 for ind in academic_indicators if ind in content.lower())
-            adjusted_score = min(1.0, score + (academic_score * 0.05))
+            # Boost results with academic indicators (each distinct indicator counts once)
+            academic_score = len(set(_ACADEMIC_RE.findall(content[:_ACADEMIC_SCAN_CHARS].lower())))
+            adjusted_score = min(1.0, score + (academic_score * _ACADEMIC_BOOST))
             
             # Only include results with meaningful content
-            if len(content) > 150 and adjusted_score >= 0.4:
-                results.append({
-                    "content_id": f"tavily_{hash(url) % 10000}",
-                    "content": f"""TECHNICAL REFERENCE: {result.get('title', topic)}
+            if adjusted_score >= 0.4:
+                yield {
+                    "content_id": f"tavily_{hashlib.blake2b(url.encode(), digest_size=8).hexdigest()}",
+                    "content": f"""TECHNICAL REFERENCE: {raw_title if raw_title is not None else topic}
 
 {content}
 
 SOURCE: {url}
 RELEVANCE: High - Contains technical depth suitable for {difficulty} level assessment""",
-                    "summary": result.get("title", f"Content about {topic}"),
+                    "summary": raw_title if raw_title is not None else f"Content about {topic}",
                     "topic": topic,
                     "difficulty": difficulty,
                     "relevance_score": adjusted_score,
                     "concepts": [topic],
                     "source": "tavily_search"
-                })
-        
-        return results
+                }
     
     def _get_structured_template_content(
         self,
@@ -597,188 +1146,7 @@ RELEVANCE: High - Contains technical depth suitable for {difficulty} level asses
         specific content from the knowledge base or web search.
         """
         
-        # Domain-specific template blueprints
-        templates = {
-            "Computer_Science": f"""TECHNICAL ASSESSMENT FRAMEWORK: {topic}
-
-<assessment_context>
-Domain: Computer Science / Software Engineering
-Topic: {topic}
-Difficulty: {difficulty}
-</assessment_context>
-
-<core_competencies>
-1. ALGORITHMIC UNDERSTANDING
-   - Time complexity analysis (Big-O notation)
-   - Space complexity trade-offs
-   - Optimization strategies and their limitations
-
-2. IMPLEMENTATION KNOWLEDGE
-   - Design patterns applicable to {topic}
-   - Edge cases and boundary conditions
-   - Error handling and fault tolerance
-
-3. SYSTEM DESIGN
-   - Scalability considerations for {topic}
-   - Performance bottlenecks and solutions
-   - Integration patterns with other systems
-
-4. DEBUGGING & TROUBLESHOOTING
-   - Common failure modes in {topic}
-   - Diagnostic approaches
-   - Resolution strategies
-</core_competencies>
-
-<question_blueprints>
-BLUEPRINT_A (Analysis): "Given a scenario with [Variable A] and [Variable B], evaluate the impact of {topic} on system performance. Which trade-off is unavoidable?"
-
-BLUEPRINT_B (Application): "A production system using {topic} experiences [Symptom X]. Analyze the most likely root cause and propose the optimal resolution strategy."
-
-BLUEPRINT_C (Comparison): "Compare the implementation of {topic} using approach [Method 1] versus [Method 2]. Under what conditions would each be preferred?"
-</question_blueprints>""",
-
-            "Professional_Certification": f"""PROFESSIONAL ASSESSMENT FRAMEWORK: {topic}
-
-<assessment_context>
-Domain: Professional Certification Standards
-Topic: {topic}
-Difficulty: {difficulty}
-</assessment_context>
-
-<competency_areas>
-1. REGULATORY KNOWLEDGE
-   - Applicable standards and frameworks for {topic}
-   - Compliance requirements
-   - Industry best practices
-
-2. PROCEDURAL EXPERTISE
-   - Standard operating procedures
-   - Decision-making frameworks
-   - Risk assessment methodologies
-
-3. PROFESSIONAL JUDGMENT
-   - Ethical considerations in {topic}
-   - Stakeholder impact analysis
-   - Documentation and reporting requirements
-</competency_areas>
-
-<question_blueprints>
-BLUEPRINT_A (Procedural): "In a scenario where [Condition X] is met, how does {topic} dictate the optimal procedural response according to [Framework Y]?"
-
-BLUEPRINT_B (Judgment): "A professional encounters [Ethical Dilemma] while implementing {topic}. Evaluate the appropriate course of action considering [Constraint Z]."
-
-BLUEPRINT_C (Integration): "How do the requirements of {topic} interact with [Related Standard W] when [Condition] exists?"
-</question_blueprints>""",
-
-            "Medical": f"""CLINICAL ASSESSMENT FRAMEWORK: {topic}
-
-<assessment_context>
-Domain: Medical / Biomedical Sciences
-Topic: {topic}
-Difficulty: {difficulty}
-</assessment_context>
-
-<competency_areas>
-1. MECHANISTIC UNDERSTANDING
-   - Physiological pathways related to {topic}
-   - Cellular and molecular mechanisms
-   - Homeostatic regulation
-
-2. CLINICAL APPLICATION
-   - Diagnostic criteria and differential diagnosis
-   - Treatment protocols and contraindications
-   - Patient monitoring parameters
-
-3. PATHOPHYSIOLOGY
-   - Disease mechanisms affecting {topic}
-   - Compensatory responses
-   - Therapeutic targets
-</competency_areas>
-
-<question_blueprints>
-BLUEPRINT_A (Mechanism): "Analyze the physiological pathway of {topic}. If [Inhibitor Z] is introduced, which downstream effect most clearly demonstrates understanding of the mechanism?"
-
-BLUEPRINT_B (Clinical): "A patient presents with [Symptom Complex]. Based on the pathophysiology of {topic}, which finding would most strongly support the suspected diagnosis?"
-
-BLUEPRINT_C (Therapeutic): "When treating a condition affecting {topic}, what is the primary consideration when [Comorbidity X] is present?"
-</question_blueprints>""",
-
-            "STEM": f"""SCIENTIFIC ASSESSMENT FRAMEWORK: {topic}
-
-<assessment_context>
-Domain: STEM (Science, Technology, Engineering, Mathematics)
-Topic: {topic}
-Difficulty: {difficulty}
-</assessment_context>
-
-<competency_areas>
-1. THEORETICAL FOUNDATIONS
-   - Fundamental principles governing {topic}
-   - Mathematical models and equations
-   - Assumptions and limitations
-
-2. EXPERIMENTAL METHODOLOGY
-   - Measurement techniques for {topic}
-   - Error analysis and uncertainty
-   - Data interpretation
-
-3. APPLICATIONS
-   - Real-world implementations of {topic}
-   - Engineering considerations
-   - Interdisciplinary connections
-</competency_areas>
-
-<question_blueprints>
-BLUEPRINT_A (Analysis): "Given the relationship between [Variable A] and [Variable B] in {topic}, predict the outcome when [Condition C] is modified. Justify your reasoning."
-
-BLUEPRINT_B (Evaluation): "An experiment investigating {topic} yields [Result X]. Evaluate potential sources of systematic error and their impact on conclusions."
-
-BLUEPRINT_C (Synthesis): "Design an approach to measure [Property P] of {topic} given the constraints of [Limitation L]. What trade-offs are inherent in your design?"
-</question_blueprints>"""
-        }
-        
-        # Default general template for unspecified domains
-        default_template = f"""ACADEMIC ASSESSMENT FRAMEWORK: {topic}
-
-<assessment_context>
-Domain: General Academic
-Topic: {topic}
-Difficulty: {difficulty}
-</assessment_context>
-
-<competency_areas>
-1. CONCEPTUAL UNDERSTANDING
-   - Core definitions and principles of {topic}
-   - Relationships between key concepts
-   - Historical development and context
-
-2. ANALYTICAL SKILLS
-   - Critical evaluation of {topic}
-   - Comparison with related concepts
-   - Identification of strengths and limitations
-
-3. APPLICATION
-   - Practical uses of {topic}
-   - Problem-solving approaches
-   - Real-world implications
-</competency_areas>
-
-<question_blueprints>
-BLUEPRINT_A (Analysis): "Evaluate the relationship between [Concept A] and [Concept B] within the context of {topic}. What implications arise from this relationship?"
-
-BLUEPRINT_B (Application): "Given a scenario involving {topic} and [Constraint X], determine the optimal approach and justify your reasoning."
-
-BLUEPRINT_C (Synthesis): "How does understanding {topic} contribute to solving [Problem Type Y]? Provide a structured analysis."
-</question_blueprints>
-
-<assessment_guidelines>
-- Questions should test application and analysis, NOT mere recall
-- Distractors must represent plausible misconceptions
-- Scenarios should reflect realistic professional/academic challenges
-- Explanations should illuminate underlying principles
-</assessment_guidelines>"""
-        
-        template_content = templates.get(subject_domain, default_template)
+        template_content = _render_structured_template(subject_domain, topic, difficulty)
         
         return [{
             "content_id": f"template_{topic}_{subject_domain}",
@@ -797,53 +1165,73 @@ BLUEPRINT_C (Synthesis): "How does understanding {topic} contribute to solving [
         query_analysis: Dict[str, Any],
         context: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """Rank and filter results based on relevance and learner profile"""
+        """
+        Rank and filter results based on relevance and learner profile
+        
+        Fused results start from their fusion score, so the local/Tavily and
+        semantic/BM25 weighting carries through; unfused content (uploads,
+        templates) starts from its relevance score.
+        """
         
         if not results:
             return []
         
-        learner_weaknesses = context.get("learner_profile", {}).get("weaknesses", [])
-        learner_gaps = context.get("learner_profile", {}).get("knowledge_gaps", [])
+        learner_profile = context.get("learner_profile") or {}
+        weakness_pattern, gap_pattern = _profile_patterns(
+            tuple(learner_profile.get("weaknesses") or ()),
+            tuple(learner_profile.get("knowledge_gaps") or ())
+        )
+        recommended_difficulty = query_analysis.get("recommendations", {}).get("suggested_difficulty", "medium")
         
-        for result in results:
-            score = result.get("relevance_score", 0.5)
-            
-            # Boost content that addresses known weaknesses
-            content_concepts = result.get("concepts", [])
-            for concept in content_concepts:
-                if any(weakness.lower() in concept.lower() for weakness in learner_weaknesses):
-                    score += 0.1
-                if any(gap.lower() in concept.lower() for gap in learner_gaps):
-                    score += 0.15
-            
-            # Adjust for difficulty match
-            recommended_difficulty = query_analysis.get("recommendations", {}).get("suggested_difficulty", "medium")
-            if result.get("difficulty") == recommended_difficulty:
-                score += 0.1
-            
-            # Boost dynamic sources over static templates
-            source = result.get("source", "")
-            if source == "tavily_ai_answer":
-                score += 0.15
-            elif source == "tavily_search":
-                score += 0.1
-            elif source == "local_knowledge_base":
-                score += 0.05
-            
-            result["final_score"] = min(1.0, score)
+        n = len(results)
+        base_scores = np.fromiter(
+            (r.get("fusion_score", r.get("relevance_score", 0.5)) for r in results), dtype=np.float64, count=n
+        )
+        
+        # Boost content that addresses known weaknesses
+        concept_bonus = np.zeros(n)
+        if weakness_pattern or gap_pattern:
+            for i, result in enumerate(results):
+                bonus = 0.0
+                for concept in result.get("concepts", []):
+                    concept = concept.lower()
+                    if weakness_pattern and weakness_pattern.search(concept):
+                        bonus += 0.1
+                    if gap_pattern and gap_pattern.search(concept):
+                        bonus += 0.15
+                concept_bonus[i] = bonus
+        
+        # Adjust for difficulty match
+        difficulty_match = np.fromiter(
+            (r.get("difficulty") == recommended_difficulty for r in results), dtype=np.bool_, count=n
+        )
+        
+        # Boost dynamic sources over static templates
+        source_bonus = np.fromiter(
+            (_SOURCE_BONUS.get(r.get("source", ""), 0.0) for r in results), dtype=np.float64, count=n
+        )
         
-        # Sort by final score
-        ranked = sorted(results, key=lambda x: x.get("final_score", 0), reverse=True)
+        final_scores = np.minimum(1.0, base_scores + concept_bonus + 0.1 * difficulty_match + source_bonus).tolist()
+        for result, final_score in zip(results, final_scores):
+            result["final_score"] = final_score
         
-        # Return top results
-        return ranked[:5]
+        # Return top results by final score (ties keep retrieval order); a bounded
+        # heap selects the top 5 without sorting every candidate
+        return [results[i] for i in heapq.nlargest(_RANKED_RESULT_LIMIT, range(n), key=final_scores.__getitem__)]
     
-    def get_crew_agent_config(self) -> Dict[str, Any]:
+    @property
+    def crew_agent_config(self) -> Mapping[str, Any]:
+        """Read-only CrewAI agent configuration, built once per agent"""
+        if self._crew_agent_config is None:
+            self._crew_agent_config = MappingProxyType({
+                "role": self.role,
+                "goal": self.goal,
+                "backstory": self.backstory,
+                "verbose": True,
+                "allow_delegation": False,
+            })
+        return self._crew_agent_config
+    
+    def get_crew_agent_config(self) -> Mapping[str, Any]:
         """Get configuration for CrewAI agent"""
-        return {
-            "role": self.role,
-            "goal": self.goal,
-            "backstory": self.backstory,
-            "verbose": True,
-            "allow_delegation": False,
-        }
+        return self.crew_agent_config
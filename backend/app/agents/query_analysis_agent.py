@@ -3,11 +3,112 @@ Query Analysis Agent
 First agent in the pipeline - understands learner intent
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator, List, Mapping, Sequence, Tuple
+from functools import cached_property, lru_cache
+from types import MappingProxyType
 from loguru import logger
 import asyncio
+import copy
+import re
 
 from app.config import settings
+from app.utils.semantic_cache import SemanticCache
+from app.utils.rate_limiter import llm_request_slot
+from app.utils import fast_json
+
+
+# Complete "main_topic" string value in a partially streamed JSON response
+_MAIN_TOPIC_PATTERN = re.compile(r'"main_topic"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Rule-based intent keywords in priority order; each category is one C-level scan
+_INTENT_PATTERNS = tuple(
+    (re.compile("|".join(map(re.escape, keywords))), label)
+    for keywords, label in (
+        (("what is", "define", "meaning of"), "definition_seeking"),
+        (("explain", "how does", "why"), "explanation_seeking"),
+        (("example", "apply", "use"), "application_seeking"),
+        (("confused", "don't understand", "clarify"), "clarification_seeking"),
+    )
+)
+
+# Inputs simple enough for the rule-based analyzer when the fast path is enabled
+_FAST_PATH_MAX_WORDS = 4
+_DEFINITIONAL_RE = re.compile(r"^\s*(?:what\s+is|define)\s+[\w-]+\s*\??\s*$", re.IGNORECASE)
+
+# First ```json ... ``` or ``` ... ``` block in a response
+_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)```')
+
+_BACKSTORY = """You are an expert educational psychologist and learning analyst. 
+        Your specialty is understanding what students really mean when they ask questions or 
+        provide answers. You can read between the lines, identify misconceptions, and 
+        categorize learning needs with high accuracy."""
+
+# Identical for every request and placed first so provider prefix caching applies;
+# the learner input and context are appended after it
+_STATIC_PROMPT_PREFIX = f"""{_BACKSTORY}
+
+Analyze the learner input given at the end for an ACADEMIC ASSESSMENT context.
+
+Provide a structured analysis with the following:
+
+1. SUBJECT DOMAIN CLASSIFICATION:
+   - Domain: (STEM | Humanities | Professional_Certification | Computer_Science | Business | Medical | Legal | Engineering | Other)
+   - Subdomain: Specific field within the domain (e.g., "Data Structures", "Constitutional Law")
+   - Academic Level: (undergraduate | graduate | professional_certification | competitive_exam)
+
+2. INTENT CLASSIFICATION:
+   - Primary Intent: (definition_seeking | explanation_seeking | application_seeking | 
+                      clarification_seeking | assessment_response | problem_solving)
+   - Confidence: (0.0 to 1.0)
+
+3. TOPIC EXTRACTION:
+   - Main Topic: The specific technical/academic subject
+   - Subtopics: Related technical concepts
+   - Key Terminology: Domain-specific terms that should be used
+   - Prerequisites: Foundational concepts needed
+
+4. COGNITIVE RIGOR MAPPING:
+   - Bloom's Level: (remember | understand | apply | analyze | evaluate | create)
+   - Target Level: For assessment, prioritize 'analyze' or 'evaluate' over 'remember'
+   - Complexity: (foundational | intermediate | advanced | expert)
+   - Exam Context: Type of exam this might relate to (e.g., "University Exam", "Certification", "Competitive")
+
+5. LEARNER STATE:
+   - Understanding Level: (novice | developing | proficient | expert)
+   - Engagement Level: (low | medium | high)
+   - Learning Style Indicators: (theoretical | practical | visual | hands-on)
+
+6. ASSESSMENT RECOMMENDATIONS:
+   - Suggested Difficulty: (foundational | intermediate | advanced | expert)
+   - Question Type: (mcq | fill_in_blank | essay | case_study | problem_solving)
+   - Focus Areas: Specific technical concepts to assess
+   - Avoid: Generic or trivia-style questions
+
+IMPORTANT: Prioritize technical depth and professional exam standards.
+Respond in JSON format.
+
+IMPORTANT: Respond with valid JSON only, no extra text.
+
+"""
+
+
+@lru_cache(maxsize=1024)
+def _render_analysis_prompt(
+    user_input: str,
+    topic: str,
+    history_length: int,
+    weaknesses: str,
+    recent_accuracy: str
+) -> str:
+    """Append the learner input and context to the static prefix, once per distinct request"""
+    return f"""{_STATIC_PROMPT_PREFIX}LEARNER INPUT:
+"{user_input}"
+
+CONTEXT:
+- Current Topic: {topic}
+- Session History: {history_length} previous interactions
+- Known Weaknesses: {weaknesses}
+- Recent Accuracy: {recent_accuracy}%"""
 
 
 class QueryAnalysisAgent:
@@ -21,21 +122,20 @@ class QueryAnalysisAgent:
     - Interpret input in context of session history
     """
     
-    def __init__(self, llm_client=None):
+    def __init__(self, llm_client=None, analysis_cache: Optional[SemanticCache] = None):
         """
         Initialize the Query Analysis Agent
         
         Args:
             llm_client: Gemini LLM client for analysis (google.genai.Client)
+            analysis_cache: Optional semantic cache of LLM analyses for near-duplicate inputs
         """
         self.llm_client = llm_client
+        self.analysis_cache = analysis_cache
         self.name = "Query Analysis Agent"
         self.role = "Educational Intent Analyzer"
         self.goal = "Understand exactly what the learner needs and categorize their request"
-        self.backstory = """You are an expert educational psychologist and learning analyst. 
-        Your specialty is understanding what students really mean when they ask questions or 
-        provide answers. You can read between the lines, identify misconceptions, and 
-        categorize learning needs with high accuracy."""
+        self.backstory = _BACKSTORY
     
     async def analyze(
         self,
@@ -59,93 +159,222 @@ class QueryAnalysisAgent:
         
         try:
             logger.info(f"[QueryAnalysis] LLM client available: {self.llm_client is not None}")
-            if self.llm_client:
+            if self.llm_client and self._should_use_llm(user_input, context):
+                cached = await self._cached_analysis(user_input, context)
+                if cached is not None:
+                    return cached
+                
                 # Use LLM for analysis
                 logger.info(f"[QueryAnalysis] Calling LLM for topic: '{user_input[:100]}'")
                 response = await self._call_llm(prompt)
                 logger.info(f"[QueryAnalysis] LLM response received")
-                return self._parse_llm_response(response)
+                analysis = self._parse_llm_response(response)
+                await self._cache_analysis(user_input, context, analysis)
+                return analysis
             else:
                 # Fallback to rule-based analysis
-                logger.warning(f"[QueryAnalysis] No LLM client, using rule-based analysis")
+                if self.llm_client:
+                    logger.info(f"[QueryAnalysis] Simple input, using rule-based analysis")
+                else:
+                    logger.warning(f"[QueryAnalysis] No LLM client, using rule-based analysis")
                 return self._rule_based_analysis(user_input, context)
                 
         except Exception as e:
             logger.error(f"[QueryAnalysis] Query analysis failed: {e}", exc_info=True)
             return self._default_analysis(user_input, context)
     
+    async def analyze_batch(
+        self,
+        items: Sequence[Tuple[str, Optional[Dict[str, Any]]]],
+        max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze several learner inputs concurrently
+        
+        Args:
+            items: (user_input, context) pairs
+            max_concurrency: Maximum analyses in flight (defaults to settings.llm_max_concurrency)
+            
+        Returns:
+            One analysis per item, in input order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.llm_max_concurrency)
+        
+        async def analyze_one(user_input: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze(user_input, context)
+        
+        results = await asyncio.gather(
+            *(analyze_one(user_input, context) for user_input, context in items),
+            return_exceptions=True
+        )
+        
+        analyses = []
+        for (user_input, context), result in zip(items, results):
+            if isinstance(result, BaseException):
+                logger.error(f"[QueryAnalysis] Batch analysis failed for '{user_input[:100]}': {result}")
+                result = self._default_analysis(user_input, context or {})
+            analyses.append(result)
+        return analyses
+    
+    async def analyze_stream(
+        self,
+        user_input: str,
+        context: Optional[Dict[str, Any]] = None,
+        fallback: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the analysis, yielding early partial results
+        
+        Yields a partial analysis ({"topic": {"main": ...}, "is_partial": True})
+        as soon as the main topic can be read from the streamed JSON, then the
+        full analysis (same shape as analyze()) once the response completes.
+        
+        Args:
+            user_input: Raw user input (text, transcribed voice, or OCR text)
+            context: Session context including history and profile
+            fallback: Yield the default analysis if the LLM call fails; False
+                re-raises instead, for callers that retry
+        """
+        context = context or {}
+        
+        if not self.llm_client:
+            logger.warning(f"[QueryAnalysis] No LLM client, using rule-based analysis")
+            yield self._rule_based_analysis(user_input, context)
+            return
+        
+        if not self._should_use_llm(user_input, context):
+            logger.info(f"[QueryAnalysis] Simple input, using rule-based analysis")
+            yield self._rule_based_analysis(user_input, context)
+            return
+        
+        cached = await self._cached_analysis(user_input, context)
+        if cached is not None:
+            yield cached
+            return
+        
+        full_prompt = self._build_analysis_prompt(user_input, context)
+        
+        try:
+            logger.info(f"[QueryAnalysis] Streaming LLM analysis for topic: '{user_input[:100]}'")
+            text = ""
+            topic_found = False
+            # The slot covers the whole streamed request, so consumers must not
+            # block on the partial result (the crew only starts a task from it)
+            async with llm_request_slot():
+                stream = await self.llm_client.aio.models.generate_content_stream(
+                    model=settings.gemini_model,
+                    contents=full_prompt,
+                )
+                
+                async for chunk in stream:
+                    text += chunk.text or ""
+                    if not topic_found:
+                        topic = self._streamed_main_topic(text)
+                        if topic:
+                            topic_found = True
+                            yield {"topic": {"main": topic}, "is_partial": True}
+            
+            logger.info(f"[QueryAnalysis] LLM stream complete")
+            analysis = self._parse_llm_response(text or "{}")
+            await self._cache_analysis(user_input, context, analysis)
+            yield analysis
+            
+        except Exception as e:
+            logger.error(f"[QueryAnalysis] Streaming analysis failed: {e}", exc_info=True)
+            if not fallback:
+                raise
+            yield self._default_analysis(user_input, context)
+    
+    def _streamed_main_topic(self, text: str) -> Optional[str]:
+        """Decoded main topic from a partially streamed response, once its string is complete"""
+        match = _MAIN_TOPIC_PATTERN.search(text)
+        if match is None:
+            return None
+        try:
+            # The captured value is still JSON-escaped
+            topic = fast_json.loads(f'"{match.group(1)}"')
+        except fast_json.JSONDecodeError:
+            return None
+        return topic.strip() or None
+    
+    def _should_use_llm(self, user_input: str, context: Dict[str, Any]) -> bool:
+        """
+        Whether an input needs the LLM, or the rule-based analyzer is enough
+        
+        Only applies with settings.query_analysis_fast_path enabled: very short
+        inputs, plain "what is X" / "define X" questions and low-cost-mode
+        sessions skip the LLM round-trip.
+        """
+        if not settings.query_analysis_fast_path:
+            return True
+        if context.get("low_cost_mode"):
+            return False
+        return len(user_input.split()) > _FAST_PATH_MAX_WORDS and not _DEFINITIONAL_RE.match(user_input)
+    
+    def _analysis_cache_key(self, context: Dict[str, Any]) -> tuple:
+        """Exact part of the analysis cache key; the learner input is matched by embedding"""
+        learner_profile = context.get("learner_profile", {})
+        return (
+            settings.gemini_model,
+            context.get("topic", "").casefold().strip(),
+            str(learner_profile.get("weaknesses", [])),
+            str(learner_profile.get("recent_accuracy", "Unknown")),
+        )
+    
+    async def _cached_analysis(self, user_input: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Analysis of a near-duplicate input from the cache, or None"""
+        if self.analysis_cache is None:
+            return None
+        
+        cached = await self.analysis_cache.get(self._analysis_cache_key(context), user_input)
+        if cached is None:
+            return None
+        
+        logger.info(f"[QueryAnalysis] Semantic cache hit for '{user_input[:100]}'")
+        return copy.deepcopy(cached)
+    
+    async def _cache_analysis(self, user_input: str, context: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+        """Store an LLM analysis, skipping the default returned when parsing failed"""
+        main_topic = analysis.get("topic", {}).get("main")
+        if self.analysis_cache is None or not main_topic or main_topic == "general":
+            return
+        
+        await self.analysis_cache.set(self._analysis_cache_key(context), user_input, copy.deepcopy(analysis))
+    
     def _build_analysis_prompt(
         self,
         user_input: str,
         context: Dict[str, Any]
     ) -> str:
-        """Build the prompt for LLM analysis - Academic Assessment Focus"""
+        """
+        Build the prompt for LLM analysis - Academic Assessment Focus
+        
+        The instructions form a static prefix shared by every request so the
+        provider's prefix cache can reuse it; only the learner input and
+        context that follow it vary.
+        """
         
-        session_history = context.get("session_history", [])
         learner_profile = context.get("learner_profile", {})
-        topic = context.get("topic", "")
         
-        prompt = f"""Analyze the following learner input for an ACADEMIC ASSESSMENT context.
-
-LEARNER INPUT:
-"{user_input}"
-
-CONTEXT:
-- Current Topic: {topic}
-- Session History: {len(session_history)} previous interactions
-- Known Weaknesses: {learner_profile.get('weaknesses', [])}
-- Recent Accuracy: {learner_profile.get('recent_accuracy', 'Unknown')}%
-
-Provide a structured analysis with the following:
-
-1. SUBJECT DOMAIN CLASSIFICATION:
-   - Domain: (STEM | Humanities | Professional_Certification | Computer_Science | Business | Medical | Legal | Engineering | Other)
-   - Subdomain: Specific field within the domain (e.g., "Data Structures", "Constitutional Law")
-   - Academic Level: (undergraduate | graduate | professional_certification | competitive_exam)
-
-2. INTENT CLASSIFICATION:
-   - Primary Intent: (definition_seeking | explanation_seeking | application_seeking | 
-                      clarification_seeking | assessment_response | problem_solving)
-   - Confidence: (0.0 to 1.0)
-
-3. TOPIC EXTRACTION:
-   - Main Topic: The specific technical/academic subject
-   - Subtopics: Related technical concepts
-   - Key Terminology: Domain-specific terms that should be used
-   - Prerequisites: Foundational concepts needed
-
-4. COGNITIVE RIGOR MAPPING:
-   - Bloom's Level: (remember | understand | apply | analyze | evaluate | create)
-   - Target Level: For assessment, prioritize 'analyze' or 'evaluate' over 'remember'
-   - Complexity: (foundational | intermediate | advanced | expert)
-   - Exam Context: Type of exam this might relate to (e.g., "University Exam", "Certification", "Competitive")
-
-5. LEARNER STATE:
-   - Understanding Level: (novice | developing | proficient | expert)
-   - Engagement Level: (low | medium | high)
-   - Learning Style Indicators: (theoretical | practical | visual | hands-on)
-
-6. ASSESSMENT RECOMMENDATIONS:
-   - Suggested Difficulty: (foundational | intermediate | advanced | expert)
-   - Question Type: (mcq | fill_in_blank | essay | case_study | problem_solving)
-   - Focus Areas: Specific technical concepts to assess
-   - Avoid: Generic or trivia-style questions
-
-IMPORTANT: Prioritize technical depth and professional exam standards.
-Respond in JSON format."""
-
-        return prompt
+        # Rendered to strings first so the memoized builder gets a hashable key
+        return _render_analysis_prompt(
+            user_input,
+            str(context.get("topic", "")),
+            len(context.get("session_history", [])),
+            str(learner_profile.get("weaknesses", [])),
+            str(learner_profile.get("recent_accuracy", "Unknown")),
+        )
     
     async def _call_llm(self, prompt: str) -> str:
         """Call the Gemini LLM with the analysis prompt using google.genai SDK"""
         
         try:
-            full_prompt = f"{self.backstory}\n\n{prompt}\n\nIMPORTANT: Respond with valid JSON only, no extra text."
-            
-            response = await self.llm_client.aio.models.generate_content(
-                model=settings.gemini_model,
-                contents=full_prompt,
-            )
+            async with llm_request_slot():
+                response = await self.llm_client.aio.models.generate_content(
+                    model=settings.gemini_model,
+                    contents=prompt,
+                )
             
             if response and response.text:
                 return response.text
@@ -159,19 +388,19 @@ Respond in JSON format."""
     
     def _extract_json_from_response(self, response: str) -> str:
         """Extract JSON from LLM response, handling markdown code blocks"""
-        import re
-        
         if not response:
             return "{}"
         
         text = response.strip()
         
         # Try to extract JSON from markdown code blocks
-        # Matches ```json ... ``` or ``` ... ```
-        code_block_pattern = r'```(?:json)?\s*([\s\S]*?)```'
-        matches = re.findall(code_block_pattern, text)
-        if matches:
-            text = matches[0].strip()
+        match = _CODE_BLOCK_RE.search(text)
+        if match:
+            text = match.group(1).strip()
+        
+        # Already a bare object (the usual case): nothing to trim
+        if text.startswith('{') and text.endswith('}'):
+            return text
         
         # Find the first { and last } to extract JSON object
         start = text.find('{')
@@ -183,11 +412,9 @@ Respond in JSON format."""
     
     def _parse_llm_response(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into structured format"""
-        import json
-        
         try:
             cleaned_response = self._extract_json_from_response(response)
-            data = json.loads(cleaned_response)
+            data = fast_json.loads(cleaned_response)
             return {
                 "intent": {
                     "primary": data.get("intent_classification", {}).get("primary_intent", "general_question"),
@@ -205,7 +432,7 @@ Respond in JSON format."""
                 "learner_state": data.get("learner_state", {}),
                 "recommendations": data.get("assessment_recommendations", {}),
             }
-        except json.JSONDecodeError as e:
+        except fast_json.JSONDecodeError as e:
             logger.error(f"Failed to parse LLM response as JSON: {e}. Response was: {response[:200]}")
             return self._default_analysis("", {})
     
@@ -217,30 +444,22 @@ Respond in JSON format."""
         """Fallback rule-based analysis when LLM is unavailable"""
         
         input_lower = user_input.lower()
+        words = user_input.split()
+        word_count = len(words)
         
-        # Intent classification based on keywords
-        intent = "general_question"
-        if any(word in input_lower for word in ["what is", "define", "meaning of"]):
-            intent = "definition_seeking"
-        elif any(word in input_lower for word in ["explain", "how does", "why"]):
-            intent = "explanation_seeking"
-        elif any(word in input_lower for word in ["example", "apply", "use"]):
-            intent = "application_seeking"
-        elif any(word in input_lower for word in ["confused", "don't understand", "clarify"]):
-            intent = "clarification_seeking"
-        elif len(user_input.split()) < 20:
+        # Intent classification based on keywords (first matching category wins)
+        intent = next((label for pattern, label in _INTENT_PATTERNS if pattern.search(input_lower)), None)
+        if intent is None:
             # Short responses are likely assessment responses
-            intent = "assessment_response"
+            intent = "assessment_response" if word_count < 20 else "general_question"
         
         # Extract topic from context or input
         topic = context.get("topic", "")
         if not topic:
             # Simple extraction - first noun phrase
-            words = user_input.split()
             topic = " ".join(words[:3]) if words else "general"
         
         # Determine complexity based on input length and vocabulary
-        word_count = len(user_input.split())
         complexity = "basic" if word_count < 10 else "intermediate" if word_count < 50 else "advanced"
         
         # Determine difficulty recommendation
@@ -310,12 +529,17 @@ Respond in JSON format."""
             },
         }
     
-    def get_crew_agent_config(self) -> Dict[str, Any]:
-        """Get configuration for CrewAI agent"""
-        return {
+    @cached_property
+    def crew_agent_config(self) -> Mapping[str, Any]:
+        """Read-only CrewAI agent configuration, built once per agent"""
+        return MappingProxyType({
             "role": self.role,
             "goal": self.goal,
             "backstory": self.backstory,
             "verbose": True,
             "allow_delegation": False,
-        }
+        })
+    
+    def get_crew_agent_config(self) -> Mapping[str, Any]:
+        """Get configuration for CrewAI agent"""
+        return self.crew_agent_config
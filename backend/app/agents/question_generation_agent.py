@@ -3,12 +3,15 @@ Question Generation Agent
 Third agent in the pipeline - creates adaptive assessments and evaluates responses
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Mapping
+from functools import cached_property
+from types import MappingProxyType
 from loguru import logger
 import random
 import asyncio
 
 from app.config import settings
+from app.utils.rate_limiter import llm_request_slot
 
 
 class QuestionGenerationAgent:
@@ -434,10 +437,12 @@ Before outputting, verify for EACH question:
 
         try:
             logger.info(f"[QuestionGen] Using Gemini for batch generation ({count} questions)")
-            response = await self.llm_client.aio.models.generate_content(
-                model=settings.gemini_model,
-                contents=f"{prompt}\n\nIMPORTANT: Respond with valid JSON only. No markdown code blocks. No explanatory text.",
-            )
+            async with llm_request_slot():
+                response = await self.llm_client.aio.models.generate_content(
+                    model=settings.gemini_model,
+                    contents=f"{prompt}\n\nIMPORTANT: Respond with valid JSON only. No markdown code blocks. No explanatory text.",
+                    config={"response_mime_type": "application/json"},
+                )
             if response and response.text:
                 logger.info(f"[QuestionGen] Gemini batch response received")
                 return self._parse_batch_questions(
@@ -450,33 +455,10 @@ Before outputting, verify for EACH question:
         except Exception as e:
             logger.error(f"[QuestionGen] LLM batch generation failed: {e}", exc_info=True)
         
-        # Fallback: Try individual LLM generation before rule-based
-        logger.warning(f"[QuestionGen] Batch failed, attempting individual LLM generation")
-        questions = []
-        for i in range(count):
-            try:
-                content = content_chunks[i % len(content_chunks)].get("content", "") if content_chunks else ""
-                question = await self._llm_generate_question(
-                    content=content,
-                    question_type=preferred_type,
-                    difficulty=["easy", "medium", "medium", "hard", "medium"][i % 5],
-                    topic=topic,
-                    context=context
-                )
-                question["batch_index"] = i
-                questions.append(question)
-            except Exception as e:
-                logger.warning(f"[QuestionGen] Individual LLM gen failed for question {i}: {e}")
-                # Final fallback: academic template
-                question = self._academic_template_question(
-                    topic=topic,
-                    question_type=preferred_type,
-                    difficulty=["easy", "medium", "medium", "hard", "medium"][i % 5],
-                    index=i
-                )
-                question["batch_index"] = i
-                questions.append(question)
-        return questions
+        # Let the caller fall back to parallel individual generation once,
+        # instead of issuing the same N calls sequentially here
+        logger.warning(f"[QuestionGen] Batch failed, deferring to individual LLM generation")
+        return []
     
     def _parse_batch_questions(
         self,
@@ -775,10 +757,11 @@ Before outputting, verify for EACH question:
         for attempt in range(max_retries):
             try:
                 logger.info(f"[QuestionGen] Using Gemini client to generate question (attempt {attempt + 1})")
-                response = await self.llm_client.aio.models.generate_content(
-                    model=settings.gemini_model,
-                    contents=f"{prompt}\n\nRespond with valid JSON only, no markdown formatting.",
-                )
+                async with llm_request_slot():
+                    response = await self.llm_client.aio.models.generate_content(
+                        model=settings.gemini_model,
+                        contents=f"{prompt}\n\nRespond with valid JSON only, no markdown formatting.",
+                    )
                 
                 # Check for valid response
                 if response and response.text:
@@ -1247,6 +1230,7 @@ Before outputting, verify:
                 "explanation": f"Understanding {topic} at a professional level requires systematic application and deep analysis of core principles.",
                 "points": 10,
                 "time_limit_seconds": 90,
+                "source": "rule_based"
             }
         
         elif question_type == "fill_in_blank":
@@ -1268,6 +1252,7 @@ Before outputting, verify:
                 "explanation": f"This term is fundamental to professional {topic} implementation.",
                 "points": 10,
                 "time_limit_seconds": 60,
+                "source": "rule_based"
             }
         
         else:  # essay
@@ -1293,6 +1278,7 @@ Before outputting, verify:
                 "concepts": [topic] + key_concepts[:2],
                 "points": 25,
                 "time_limit_seconds": 600,
+                "source": "rule_based"
             }
     
     def _fallback_question(self, context: Dict[str, Any]) -> Dict[str, Any]:
@@ -1718,10 +1704,11 @@ Evaluate and respond in JSON:
 Respond with valid JSON only."""
         
         try:
-            result = await self.llm_client.aio.models.generate_content(
-                model=settings.gemini_model,
-                contents=prompt,
-            )
+            async with llm_request_slot():
+                result = await self.llm_client.aio.models.generate_content(
+                    model=settings.gemini_model,
+                    contents=prompt,
+                )
             
             if result and result.text:
                 import json
@@ -1757,12 +1744,17 @@ Respond with valid JSON only."""
             "next_steps": [],
         }
     
-    def get_crew_agent_config(self) -> Dict[str, Any]:
-        """Get configuration for CrewAI agent"""
-        return {
+    @cached_property
+    def crew_agent_config(self) -> Mapping[str, Any]:
+        """Read-only CrewAI agent configuration, built once per agent"""
+        return MappingProxyType({
             "role": self.role,
             "goal": self.goal,
             "backstory": self.backstory,
             "verbose": True,
             "allow_delegation": False,
-        }
+        })
+    
+    def get_crew_agent_config(self) -> Mapping[str, Any]:
+        """Get configuration for CrewAI agent"""
+        return self.crew_agent_config
@@ -25,6 +25,7 @@ class Settings(BaseSettings):
     debug: bool = True
     host: str = "0.0.0.0"
     port: int = 8000
+    uvicorn_loop: str = "auto"  # "auto" uses uvloop when installed, or "asyncio"/"uvloop"
     
     # ===========================================
     # DATABASE CONFIGURATION
@@ -49,6 +50,8 @@ class Settings(BaseSettings):
     # Tavily Search API (Dynamic Fallback)
     tavily_api_key: str = Field(default="", description="Tavily API Key for dynamic content retrieval")
     tavily_search_depth: str = "advanced"  # "basic" or "advanced"
+    tavily_concurrency: int = 8  # Pooled connections for concurrent Tavily searches
+    tavily_timeout: float = 30.0  # Seconds before a Tavily search is abandoned
     
     # ===========================================
     # CREWAI CONFIGURATION
@@ -56,18 +59,47 @@ class Settings(BaseSettings):
     crewai_verbose: bool = True
     crewai_max_retries: int = 3
     crewai_timeout: int = 120
+    llm_max_concurrency: int = 4  # Max LLM requests in flight at once (provider rate limits)
+    llm_requests_per_minute: int = 60  # Token bucket refill rate, 0 disables pacing
+    llm_burst: int = 10  # Requests allowed back-to-back after idling
+    llm_max_connections: int = 100  # Shared HTTP connection pool for the LLM client
+    llm_max_keepalive_connections: int = 50
+    feedback_batch_size: int = 1  # Feedback requests combined into one LLM call (puts several learners in one prompt), 1 disables batching
+    feedback_batch_timeout_ms: int = 50  # How long a batch waits to fill before it is sent
+    blocking_io_workers: int = 16  # Threads for blocking SDK calls (asyncio default executor)
+    query_analysis_fast_path: bool = False  # Analyze very short / plain "what is X" inputs with rules instead of the LLM
     
     # ===========================================
     # VECTOR STORE CONFIGURATION
     # ===========================================
     vector_index_path: str = "./data/vector_index.npy"
     vector_dimensions: int = 384
+    vector_ann_min_size: int = 5000  # Use an HNSW index (if hnswlib is installed) from this many vectors
+    vector_hnsw_m: int = 16  # HNSW graph degree
+    vector_hnsw_ef_construction: int = 200
+    vector_hnsw_ef_search: int = 64  # Raised to top_k when a search asks for more
+    
+    # ===========================================
+    # RETRIEVAL FUSION
+    # ===========================================
+    retrieval_fusion_k: int = 60  # Reciprocal rank fusion damping constant
+    retrieval_local_weight: float = 0.7  # Local KB share of the fused score, Tavily gets the rest
+    retrieval_bm25_weight: float = 0.3  # BM25 share of the fused local score, semantic search gets the rest
     
     # ===========================================
     # EMBEDDING MODEL
     # ===========================================
     embedding_model: str = "all-MiniLM-L6-v2"
     
+    # ===========================================
+    # SEMANTIC CACHE
+    # ===========================================
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.87  # Minimum cosine similarity for a hit
+    semantic_cache_ttl: int = 3600  # Seconds
+    semantic_cache_prefetch: bool = False  # Pre-generate adjacent-difficulty questions in the background
+    query_analysis_cache_threshold: float = 0.92  # Stricter, since near-miss inputs can change intent
+    
     # ===========================================
     # KNOWLEDGE BASE
     # ===========================================
@@ -7,7 +7,9 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
+import asyncio
 import sys
 
 from app.config import settings
@@ -27,18 +29,28 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     logger.info(f"Starting {settings.app_name} Backend...")
+    
+    # Size the pool used by asyncio.to_thread / run_in_executor(None, ...) explicitly
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.blocking_io_workers, thread_name_prefix="edusynapse-io")
+    )
     await Database.connect()
     
     # Initialize knowledge base and vector store
     from app.services.knowledge_base import KnowledgeBaseService
     await KnowledgeBaseService.initialize()
     
+    # Build the shared agent crew once
+    from app.agents.crew import get_crew
+    app.state.crew = get_crew()
+    
     logger.info(f"{settings.app_name} Backend started successfully!")
     
     yield
     
     # Shutdown
     logger.info(f"Shutting down {settings.app_name} Backend...")
+    await app.state.crew.shutdown()
     await Database.disconnect()
     logger.info("Shutdown complete")
 
@@ -117,11 +129,11 @@ async def orchestrate_agents(request: Request):
     Direct endpoint to trigger CrewAI agent orchestration
     Primarily for testing and debugging
     """
-    from app.agents.crew import EduSynapseCrew
+    from app.agents.crew import get_crew
     
     body = await request.json()
     
-    crew = EduSynapseCrew()
+    crew = get_crew()
     result = await crew.execute(
         user_input=body.get("input", ""),
         user_id=body.get("user_id"),
@@ -141,5 +153,6 @@ if __name__ == "__main__":
         "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        loop=settings.uvicorn_loop
     )
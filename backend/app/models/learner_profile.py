@@ -7,6 +7,9 @@ from beanie import Document, Indexed
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from operator import attrgetter
+
+_is_correct = attrgetter("is_correct")
 
 
 class ConceptMastery(BaseModel):
@@ -137,7 +140,7 @@ class LearnerProfile(Document):
         recent = self.performance_window[-n:] if self.performance_window else []
         if not recent:
             return 0.0
-        correct = sum(1 for p in recent if p.is_correct)
+        correct = sum(map(_is_correct, recent))
         return (correct / len(recent)) * 100
 
 
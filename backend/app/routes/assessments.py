@@ -22,7 +22,7 @@ from app.models.assessment import (
 from app.models.feedback import Feedback, FeedbackResponse
 from app.models.learner_profile import LearnerProfile
 from app.routes.auth import get_or_create_guest_user
-from app.agents.crew import EduSynapseCrew
+from app.agents.crew import EduSynapseCrew, get_crew
 
 
 router = APIRouter()
@@ -31,7 +31,8 @@ router = APIRouter()
 @router.post("/question", response_model=QuestionResponse)
 async def get_next_question(
     request: QuestionRequest,
-    current_user: User = Depends(get_or_create_guest_user)
+    current_user: User = Depends(get_or_create_guest_user),
+    crew: EduSynapseCrew = Depends(get_crew)
 ):
     """Get the next adaptive question for the session"""
     
@@ -70,8 +71,7 @@ async def get_next_question(
     }
     
     # Trigger agent orchestration for question generation
-    logger.info(f"[Assessments] Creating EduSynapseCrew for question generation, topic: {session.topic_name}")
-    crew = EduSynapseCrew()
+    logger.info(f"[Assessments] Using EduSynapseCrew for question generation, topic: {session.topic_name}")
     logger.info(f"[Assessments] Calling crew.generate_question with context")
     question_result = await crew.generate_question(context)
     logger.info(f"[Assessments] Question result received: {question_result.get('question_text', '')[:100]}")
@@ -124,7 +124,8 @@ async def get_next_question(
 @router.post("/batch-questions")
 async def get_batch_questions(
     request: BatchQuestionRequest,
-    current_user: User = Depends(get_or_create_guest_user)
+    current_user: User = Depends(get_or_create_guest_user),
+    crew: EduSynapseCrew = Depends(get_crew)
 ):
     """Generate all questions for a session at once"""
     
@@ -192,6 +193,8 @@ async def get_batch_questions(
         "custom_query": session.custom_query,
         "current_difficulty": session.current_difficulty,
         "preferred_type": request.preferred_type,
+        # Subject saved by earlier batches / at session creation; seeds the early retrieval
+        "detected_subject": session.session_context.get("detected_subject"),
         "learner_profile": {
             "strengths": profile.strengths if profile else [],
             "weaknesses": profile.weaknesses if profile else [],
@@ -210,7 +213,6 @@ async def get_batch_questions(
     
     # Generate batch questions
     logger.info(f"[Assessments] Generating {request.count} questions for session {request.session_id}")
-    crew = EduSynapseCrew()
     batch_result = await crew.generate_batch_questions(context, request.count)
     
     questions = batch_result.get("questions", [])
@@ -272,7 +274,8 @@ async def get_batch_questions(
 @router.post("/submit", response_model=AnswerEvaluation)
 async def submit_answer(
     submission: AnswerSubmission,
-    current_user: User = Depends(get_or_create_guest_user)
+    current_user: User = Depends(get_or_create_guest_user),
+    crew: EduSynapseCrew = Depends(get_crew)
 ):
     """Submit an answer for evaluation"""
     
@@ -319,7 +322,6 @@ async def submit_answer(
     }
     
     # Trigger agent orchestration for evaluation
-    crew = EduSynapseCrew()
     eval_result = await crew.evaluate_response(eval_context)
     
     # Determine if correct
@@ -429,7 +431,8 @@ async def submit_answer(
 @router.get("/feedback/{response_id}", response_model=FeedbackResponse)
 async def get_feedback(
     response_id: str,
-    current_user: User = Depends(get_or_create_guest_user)
+    current_user: User = Depends(get_or_create_guest_user),
+    crew: EduSynapseCrew = Depends(get_crew)
 ):
     """Get detailed feedback for a response"""
     
@@ -446,8 +449,6 @@ async def get_feedback(
     
     if not feedback:
         # Generate feedback using Feedback Agent
-        crew = EduSynapseCrew()
-        
         # Get session and assessment for context
         session = await LearningSession.get(response.session_id)
         assessment = await Assessment.get(response.assessment_id)
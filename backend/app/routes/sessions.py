@@ -22,7 +22,7 @@ from app.models.learner_profile import LearnerProfile
 from app.routes.auth import get_or_create_guest_user
 from app.services.preprocessing import PreprocessingService
 from app.services.document_processing import DocumentProcessingService
-from app.agents.crew import EduSynapseCrew
+from app.agents.crew import EduSynapseCrew, get_crew
 from app.config import settings
 
 
@@ -241,7 +241,8 @@ async def list_sessions(
 async def submit_input(
     session_id: str,
     input_data: SessionInput,
-    current_user: User = Depends(get_or_create_guest_user)
+    current_user: User = Depends(get_or_create_guest_user),
+    crew: EduSynapseCrew = Depends(get_crew)
 ):
     """Submit learner input to a session and trigger agent orchestration"""
     
@@ -294,7 +295,6 @@ async def submit_input(
     }
     
     # Trigger CrewAI orchestration
-    crew = EduSynapseCrew()
     agent_result = await crew.execute(
         user_input=processed_content,
         user_id=str(current_user.id),
@@ -373,7 +373,8 @@ async def resume_session(
 @router.post("/{session_id}/end", response_model=SessionSummary)
 async def end_session(
     session_id: str,
-    current_user: User = Depends(get_or_create_guest_user)
+    current_user: User = Depends(get_or_create_guest_user),
+    crew: EduSynapseCrew = Depends(get_crew)
 ):
     """End a session and get summary"""
     
@@ -439,7 +440,6 @@ async def end_session(
         await profile.save()
     
     # Generate session summary using Feedback Agent
-    crew = EduSynapseCrew()
     summary_result = await crew.generate_session_summary(session_id)
     
     # Update learner profile with session analytics for adaptive baseline
@@ -5,11 +5,15 @@ Manages difficulty adjustment and personalization logic
 
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from operator import attrgetter, itemgetter
 from loguru import logger
 
 from app.config import DifficultyLevels
 from app.models.learner_profile import LearnerProfile, PerformanceWindow
 
+# Counting correct answers by summing the flags avoids a generator frame per item
+_is_correct = attrgetter("is_correct")
+
 
 class AdaptiveEngine:
     """Engine for adaptive difficulty and learning path management"""
@@ -57,7 +61,7 @@ class AdaptiveEngine:
         
         # Calculate recent accuracy
         recent = recent_performances[-cls.MIN_QUESTIONS_FOR_ADJUSTMENT:]
-        correct = sum(1 for p in recent if p.is_correct)
+        correct = sum(map(_is_correct, recent))
         accuracy = correct / len(recent)
         
         # Determine adjustment
@@ -156,8 +160,8 @@ class AdaptiveEngine:
         older = performances[-(window_size * 2):-window_size]
         recent = performances[-window_size:]
         
-        older_accuracy = sum(1 for p in older if p.is_correct) / len(older)
-        recent_accuracy = sum(1 for p in recent if p.is_correct) / len(recent)
+        older_accuracy = sum(map(_is_correct, older)) / len(older)
+        recent_accuracy = sum(map(_is_correct, recent)) / len(recent)
         
         difference = recent_accuracy - older_accuracy
         
@@ -238,9 +242,8 @@ class AdaptiveEngine:
             
             scored_topics.append((topic, score))
         
-        # Sort by score and return top recommendation
-        scored_topics.sort(key=lambda x: x[1], reverse=True)
-        return scored_topics[0][0] if scored_topics else None
+        # Return the top-scored recommendation (first one on ties)
+        return max(scored_topics, key=itemgetter(1))[0] if scored_topics else None
     
     @classmethod
     def calculate_mastery_level(
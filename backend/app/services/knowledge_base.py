@@ -4,7 +4,10 @@ Manages educational content storage and retrieval
 """
 
 from typing import List, Optional, Dict, Any
+from operator import attrgetter, itemgetter
+from beanie.operators import In, Inc
 from loguru import logger
+import heapq
 import os
 import json
 
@@ -12,6 +15,7 @@ from app.config import settings
 from app.models.knowledge import KnowledgeChunk, KnowledgeSearchResult
 from app.utils.embeddings import EmbeddingService
 from app.utils.vector_store import VectorStore
+from app.utils.bm25 import BM25Index
 
 
 class KnowledgeBaseService:
@@ -22,6 +26,7 @@ class KnowledgeBaseService:
     
     embedding_service: Optional[EmbeddingService] = None
     vector_store: Optional[VectorStore] = None
+    bm25_index: Optional[BM25Index] = None
     
     @classmethod
     async def initialize(cls):
@@ -38,6 +43,9 @@ class KnowledgeBaseService:
             cls.vector_store = VectorStore()
             await cls.vector_store.initialize()
             
+            # Keyword index over the same chunks, filled as they are loaded
+            cls.bm25_index = BM25Index()
+            
             # Load any existing knowledge base
             await cls._load_initial_content()
             
@@ -103,6 +111,8 @@ class KnowledgeBaseService:
             logger.info(f"Rebuilding vector index from {len(chunks)} existing chunks")
             
             for chunk in chunks:
+                cls._index_keywords(chunk)
+                
                 # Generate embedding if not present
                 if not chunk.embedding_vector and cls.embedding_service:
                     embedding = await cls.embedding_service.embed_text(chunk.content_text)
@@ -170,6 +180,7 @@ class KnowledgeBaseService:
                 embedding_vector=embedding,
             )
             await chunk.insert()
+            cls._index_keywords(chunk)
             
             # Add to vector store
             if cls.vector_store and embedding:
@@ -185,6 +196,15 @@ class KnowledgeBaseService:
             logger.error(f"Failed to add content: {e}")
             return None
     
+    @classmethod
+    def _index_keywords(cls, chunk: KnowledgeChunk) -> None:
+        """Add a chunk's text, keywords and concepts to the BM25 index"""
+        if cls.bm25_index is not None:
+            cls.bm25_index.add(
+                chunk.content_id,
+                " ".join([chunk.topic, chunk.content_text, *chunk.keywords, *chunk.concepts])
+            )
+    
     @classmethod
     async def search(
         cls,
@@ -219,48 +239,15 @@ class KnowledgeBaseService:
                     top_k=limit * 2  # Get more for filtering
                 )
                 
-                # Fetch full documents and filter
-                for result in vector_results:
-                    chunk = await KnowledgeChunk.find_one(
-                        KnowledgeChunk.content_id == result.get("content_id")
-                    )
-                    
-                    if not chunk:
-                        continue
-                    
-                    # Apply filters
-                    if topic and chunk.topic.lower() != topic.lower():
-                        continue
-                    if difficulty and chunk.difficulty != difficulty:
-                        continue
-                    
-                    # Check modality suitability
-                    modality_score = 1.0
-                    if modality == "voice":
-                        modality_score = chunk.voice_suitability
-                    elif modality == "diagram":
-                        modality_score = chunk.diagram_suitability
-                    
-                    results.append(KnowledgeSearchResult(
-                        content_id=chunk.content_id,
-                        content_text=chunk.content_text,
-                        content_summary=chunk.content_summary,
-                        topic=chunk.topic,
-                        difficulty=chunk.difficulty,
-                        relevance_score=result.get("score", 0.5) * modality_score,
-                        concepts=chunk.concepts,
-                    ))
-                    
-                    # Update retrieval count
-                    chunk.times_retrieved += 1
-                    await chunk.save()
+                # Fetch full documents, filter and limit
+                results = await cls._collect_results(vector_results, topic, difficulty, modality, limit)
             
             else:
                 # Fallback to keyword search
                 results = await cls._keyword_search(query, topic, difficulty, limit)
-            
-            # Sort by relevance and limit
-            results = sorted(results, key=lambda x: x.relevance_score, reverse=True)[:limit]
+                
+                # Sort by relevance and limit
+                results = heapq.nlargest(limit, results, key=attrgetter("relevance_score"))
             
             return results
             
@@ -268,6 +255,180 @@ class KnowledgeBaseService:
             logger.error(f"Search error: {e}")
             return []
     
+    @classmethod
+    async def search_many(
+        cls,
+        queries: List[str],
+        topic: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        limit: int = 5,
+        modality: str = "text"
+    ) -> List[KnowledgeSearchResult]:
+        """
+        Search the knowledge base for several related queries at once
+        
+        All queries are embedded in one batch and scored with one matrix
+        product; hits are merged by content ID, keeping the best score.
+        
+        Args:
+            queries: Search queries (e.g. the expanded query plus subtopics)
+            topic: Filter by topic
+            difficulty: Filter by difficulty
+            limit: Maximum results
+            modality: Preferred modality
+            
+        Returns:
+            List of search results
+        """
+        if not queries:
+            return []
+        if len(queries) == 1 or not (cls.embedding_service and cls.vector_store):
+            return await cls.search(queries[0], topic, difficulty, limit, modality)
+        
+        try:
+            query_embeddings = await cls.embedding_service.embed_texts(list(queries))
+            hit_lists = await cls.vector_store.search_batch(
+                query_vectors=query_embeddings,
+                top_k=limit * 2  # Get more for filtering
+            )
+            
+            # Keep the best-scoring hit per content ID (first seen on ties)
+            best: Dict[Any, Dict[str, Any]] = {}
+            for hits in hit_lists:
+                for hit in hits:
+                    content_id = hit.get("content_id")
+                    current = best.get(content_id)
+                    if current is None or hit["score"] > current["score"]:
+                        best[content_id] = hit
+            
+            vector_results = heapq.nlargest(limit * 2, best.values(), key=itemgetter("score"))
+            return await cls._collect_results(vector_results, topic, difficulty, modality, limit)
+            
+        except Exception as e:
+            logger.error(f"Batch search error: {e}")
+            return []
+    
+    @classmethod
+    async def bm25_search(
+        cls,
+        query: str,
+        topic: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        limit: int = 5,
+        modality: str = "text"
+    ) -> List[KnowledgeSearchResult]:
+        """
+        Keyword search with BM25
+        
+        Catches exact terms (e.g. "AES-256", "Theorem 3.4") that semantic
+        search can miss.
+        
+        Args:
+            query: Search query
+            topic: Filter by topic
+            difficulty: Filter by difficulty
+            limit: Maximum results
+            modality: Preferred modality
+            
+        Returns:
+            List of search results, whose relevance scores are relative to
+            the best keyword hit and only meaningful for ordering
+        """
+        if cls.bm25_index is None:
+            return []
+        
+        try:
+            keyword_results = cls.bm25_index.search(query, top_k=limit * 2)  # Get more for filtering
+            return await cls._collect_results(keyword_results, topic, difficulty, modality, limit)
+        
+        except Exception as e:
+            logger.error(f"BM25 search error: {e}")
+            return []
+    
+    @classmethod
+    async def _collect_results(
+        cls,
+        vector_results: List[Dict[str, Any]],
+        topic: Optional[str],
+        difficulty: Optional[str],
+        modality: str,
+        limit: int
+    ) -> List[KnowledgeSearchResult]:
+        """
+        Fetch the chunks behind vector or BM25 hits, filter them and keep the top results
+        
+        Candidates are loaded with a single query and ranked on their scores;
+        retrieval counts are left to record_retrievals(), once results are served.
+        """
+        content_ids = [cid for result in vector_results if (cid := result.get("content_id"))]
+        if not content_ids:
+            return []
+        
+        chunks = {
+            chunk.content_id: chunk
+            for chunk in await KnowledgeChunk.find(In(KnowledgeChunk.content_id, content_ids)).to_list()
+        }
+        
+        candidates = []
+        for result in vector_results:
+            chunk = chunks.get(result.get("content_id"))
+            
+            if not chunk:
+                continue
+            
+            # Apply filters
+            if topic and chunk.topic.lower() != topic.lower():
+                continue
+            if difficulty and chunk.difficulty != difficulty:
+                continue
+            
+            # Check modality suitability
+            modality_score = 1.0
+            if modality == "voice":
+                modality_score = chunk.voice_suitability
+            elif modality == "diagram":
+                modality_score = chunk.diagram_suitability
+            
+            candidates.append((result.get("score", 0.5) * modality_score, chunk))
+        
+        # Sort by relevance and limit before building results
+        top = heapq.nlargest(limit, candidates, key=itemgetter(0))
+        
+        return [
+            KnowledgeSearchResult(
+                content_id=chunk.content_id,
+                content_text=chunk.content_text,
+                content_summary=chunk.content_summary,
+                topic=chunk.topic,
+                difficulty=chunk.difficulty,
+                relevance_score=relevance_score,
+                concepts=chunk.concepts,
+            )
+            for relevance_score, chunk in top
+        ]
+    
+    @classmethod
+    async def record_retrievals(cls, content_ids: List[str]) -> None:
+        """
+        Bump the retrieval count of chunks actually served to a learner
+        
+        Searches do not count their hits themselves, since a chunk can be found by
+        several searches or dropped when their results are fused and ranked.
+        
+        Args:
+            content_ids: Content IDs of the served chunks, each counted once
+        """
+        content_ids = list(dict.fromkeys(content_ids))
+        if not content_ids:
+            return
+        
+        try:
+            await KnowledgeChunk.find(
+                In(KnowledgeChunk.content_id, content_ids)
+            ).update(Inc({KnowledgeChunk.times_retrieved: 1}))
+        except Exception as e:
+            logger.error(f"Retrieval count update error: {e}")
+    
     @classmethod
     async def _keyword_search(
         cls,
@@ -4,8 +4,20 @@ EduSynapse Utils Module
 
 from app.utils.embeddings import EmbeddingService
 from app.utils.vector_store import VectorStore
+from app.utils.semantic_cache import SemanticCache
+from app.utils.rate_limiter import AsyncTokenBucket, llm_request_slot
+from app.utils.ttl_cache import TTLCache, stable_hash
+from app.utils.inflight import InFlight
+from app.utils.bm25 import BM25Index
 
 __all__ = [
     "EmbeddingService",
     "VectorStore",
+    "SemanticCache",
+    "AsyncTokenBucket",
+    "llm_request_slot",
+    "TTLCache",
+    "stable_hash",
+    "InFlight",
+    "BM25Index",
 ]
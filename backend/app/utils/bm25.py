@@ -0,0 +1,133 @@
+"""
+BM25 Index
+In-memory Okapi BM25 keyword index over knowledge chunks using NumPy
+"""
+
+from typing import List, Dict, Any
+from collections import Counter
+import math
+import re
+
+import numpy as np
+
+# Keeps identifiers like "aes-256", "sha3.4" or "3.4" together as single terms
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase BM25 terms
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Terms in order of appearance
+    """
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class BM25Index:
+    """
+    Okapi BM25 index keyed by content ID.
+
+    Documents can be added at any time; the postings arrays are rebuilt
+    lazily on the next search after a change.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Counter] = {}
+        self._dirty = True
+        self._ids: List[str] = []
+        # term -> (idf, doc indices, term frequencies)
+        self._postings: Dict[str, tuple] = {}
+        self._length_norm: np.ndarray = np.zeros(0)
+
+    def add(self, content_id: str, text: str) -> None:
+        """
+        Add or replace a document
+
+        Args:
+            content_id: Content ID of the chunk
+            text: Searchable text (content plus keywords/concepts)
+        """
+        self._docs[content_id] = Counter(tokenize(text))
+        self._dirty = True
+
+    def _build(self) -> None:
+        self._ids = list(self._docs)
+        lengths = np.fromiter(
+            (sum(terms.values()) for terms in self._docs.values()), dtype=np.float64, count=len(self._ids)
+        )
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        self._length_norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+
+        postings: Dict[str, tuple] = {}
+        for index, terms in enumerate(self._docs.values()):
+            for term, freq in terms.items():
+                entry = postings.get(term)
+                if entry is None:
+                    postings[term] = ([index], [freq])
+                else:
+                    entry[0].append(index)
+                    entry[1].append(freq)
+
+        n_docs = len(self._ids)
+        self._postings = {
+            term: (
+                math.log(1.0 + (n_docs - len(indices) + 0.5) / (len(indices) + 0.5)),
+                np.asarray(indices, dtype=np.int64),
+                np.asarray(freqs, dtype=np.float64),
+            )
+            for term, (indices, freqs) in postings.items()
+        }
+        self._dirty = False
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Score documents against a query
+
+        Args:
+            query: Keyword query
+            top_k: Number of results
+
+        Returns:
+            Hits with content_id and score in [0, 1] (relative to the best hit), best first
+        """
+        if not self._docs or top_k <= 0:
+            return []
+        if self._dirty:
+            self._build()
+
+        scores = np.zeros(len(self._ids))
+        for term in set(tokenize(query)):
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            idf, indices, freqs = entry
+            scores[indices] += idf * freqs * (self.k1 + 1.0) / (freqs + self._length_norm[indices])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+
+        best = scores[matched[0]]
+        return [
+            {"content_id": self._ids[index], "score": float(scores[index] / best)}
+            for index in matched
+        ]
+
+    @property
+    def size(self) -> int:
+        """Number of indexed documents"""
+        return len(self._docs)
@@ -0,0 +1,62 @@
+"""
+Fast JSON
+JSON helpers backed by orjson when it is installed, stdlib json otherwise
+"""
+
+from typing import Any, Union
+import json
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document
+
+    Args:
+        data: JSON text or UTF-8 bytes
+
+    Returns:
+        Parsed value
+    """
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> str:
+    """
+    Serialize a value to compact JSON text
+
+    Args:
+        value: JSON-serializable value
+
+    Returns:
+        JSON text
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, separators=(",", ":"))
+
+
+def dumps_canonical(payload: Any) -> bytes:
+    """
+    Serialize a value with sorted keys, stringifying unknown types
+
+    Args:
+        payload: Value to serialize
+
+    Returns:
+        UTF-8 JSON bytes that are stable across dict ordering
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, sort_keys=True, default=str, separators=(",", ":")).encode("utf-8")
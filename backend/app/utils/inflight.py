@@ -0,0 +1,49 @@
+"""
+In-Flight Coalescing
+Lets concurrent callers with the same key share a single pending call
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class InFlight:
+    """
+    Registry of pending calls keyed like the cache in front of them.
+
+    The first caller for a key launches the call as a task; callers that
+    arrive while it is pending await the same task. The key is dropped as
+    soon as the task settles, so results and errors are never reused here.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the pending call for `key`, launching it if there is none
+
+        Args:
+            key: Coalescing key
+            factory: Zero-argument callable returning the awaitable to run
+
+        Returns:
+            Result of the shared call (its exception is raised to every waiter)
+        """
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._pending[key] = task
+            task.add_done_callback(lambda done, key=key: self._settle(key, done))
+        # Shielded so one cancelled waiter does not cancel the others
+        return await asyncio.shield(task)
+
+    def _settle(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every waiter went away
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._pending)
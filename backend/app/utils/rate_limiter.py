@@ -0,0 +1,83 @@
+"""
+Rate Limiter
+Async token bucket used to pace outbound LLM requests
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import asyncio
+import time
+
+from app.config import settings
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_min` tokens per minute.
+
+    Waiters are served in arrival order; a non-positive rate disables limiting.
+    """
+
+    def __init__(self, rate_per_min: float, burst: int = 10):
+        """
+        Args:
+            rate_per_min: Sustained requests allowed per minute
+            burst: Maximum tokens that can accumulate while idle
+        """
+        self.rate = rate_per_min / 60.0
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Add tokens earned since the last update"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """
+        Wait until `tokens` are available and consume them
+
+        Args:
+            tokens: Number of tokens to consume
+        """
+        if self.rate <= 0:
+            return
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of {self.capacity}")
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available"""
+        self._refill()
+        return self._tokens
+
+
+# Shared by every Gemini call site in the process, so limits are charged per
+# LLM request rather than per agent call
+_llm_semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+_llm_rate_limiter = AsyncTokenBucket(settings.llm_requests_per_minute, burst=settings.llm_burst)
+
+
+@asynccontextmanager
+async def llm_request_slot() -> AsyncIterator[None]:
+    """
+    Pace and bound one outbound LLM request
+
+    Takes a token from the shared bucket (settings.llm_requests_per_minute),
+    then holds one of settings.llm_max_concurrency slots while the block runs.
+    Wrap only the provider call itself, never retry back-off or other work.
+    """
+    await _llm_rate_limiter.acquire()
+    async with _llm_semaphore:
+        yield
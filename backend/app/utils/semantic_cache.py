@@ -0,0 +1,314 @@
+"""
+Semantic Cache
+In-memory response cache that matches near-duplicate requests by embedding similarity
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from loguru import logger
+import asyncio
+import time
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Cache keyed by an exact key plus the embedding of a text.
+
+    Entries are partitioned by the exact key (e.g. model, difficulty, count);
+    within a partition a lookup hits when the cosine similarity between the
+    request text and a stored text is at least `threshold`.
+
+    Each partition's vectors are kept as one contiguous matrix, so a lookup
+    is a single matrix-vector product; the cache is bounded by `max_entries`,
+    so an exact scan stays cheap.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Awaitable[Optional[List[float]]]],
+        threshold: float = 0.87,
+        ttl: int = 3600,
+        max_entries: int = 512,
+        embed_batch_fn: Optional[Callable[[List[str]], Awaitable[Optional[List[List[float]]]]]] = None
+    ):
+        """
+        Args:
+            embed_fn: Async function returning an embedding for a text
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an entry stays valid
+            max_entries: Maximum number of entries across all keys
+            embed_batch_fn: Optional async function embedding many texts in one call
+        """
+        self.embed_fn = embed_fn
+        self.embed_batch_fn = embed_batch_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # key -> list of [normalized vector, value, expires_at]
+        self._entries: Dict[Hashable, List[list]] = {}
+        # key -> (entries list, stacked vectors of it), rebuilt only after the partition changes
+        self._matrices: Dict[Hashable, Tuple[List[list], np.ndarray]] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Recently embedded texts, so a lookup followed by a store embeds once
+        self._vector_memo: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memo_size = 256
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed and L2-normalize a text, returning None on failure"""
+        return (await self._embed_many([text]))[0]
+
+    async def _embed_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Embed and L2-normalize texts, batching those not embedded recently
+
+        Returns one normalized vector (or None on failure) per input text.
+        """
+        missing = [t for t in dict.fromkeys(texts) if t not in self._vector_memo]
+
+        if missing:
+            try:
+                if self.embed_batch_fn is not None and len(missing) > 1:
+                    embeddings = await self.embed_batch_fn(missing)
+                else:
+                    embeddings = await asyncio.gather(*(self.embed_fn(t) for t in missing))
+            except Exception as e:
+                logger.warning(f"[SemanticCache] Embedding failed: {e}")
+                embeddings = None
+
+            if embeddings is not None and len(embeddings) == len(missing):
+                for text, embedding in zip(missing, embeddings):
+                    if embedding is None or len(embedding) == 0:
+                        continue
+                    vector = np.asarray(embedding, dtype=np.float32)
+                    norm = np.linalg.norm(vector)
+                    if norm == 0:
+                        continue
+                    self._vector_memo[text] = vector / norm
+                    if len(self._vector_memo) > self._memo_size:
+                        self._vector_memo.popitem(last=False)
+
+        return [self._vector_memo.get(t) for t in texts]
+
+    def _purge_expired(self, key: Hashable) -> List[list]:
+        """Drop expired entries under a key and return the live ones"""
+        now = time.monotonic()
+        entries = self._entries.get(key, [])
+        live = [e for e in entries if e[2] > now]
+        if len(live) == len(entries):
+            return entries
+
+        self._size -= len(entries) - len(live)
+        self._matrices.pop(key, None)
+        if live:
+            self._entries[key] = live
+        else:
+            self._entries.pop(key, None)
+        return live
+
+    def _matrix(self, key: Hashable, entries: List[list]) -> np.ndarray:
+        """
+        Contiguous (n, dim) matrix of a partition's vectors
+
+        The cached matrix is only reused for the very list it was built from,
+        so rows always line up with `entries`.
+        """
+        cached = self._matrices.get(key)
+        if cached is not None and cached[0] is entries and cached[1].shape[0] == len(entries):
+            return cached[1]
+
+        matrix = np.ascontiguousarray(np.stack([e[0] for e in entries]))
+        if self._entries.get(key) is entries:
+            self._matrices[key] = (entries, matrix)
+        return matrix
+
+    def _ranked_candidates(self, similarities: np.ndarray) -> np.ndarray:
+        """Indices at or above the threshold, most similar first"""
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        return candidates[np.argsort(-similarities[candidates])]
+
+    async def get(
+        self,
+        key: Hashable,
+        text: str,
+        accept: Optional[Callable[[Any], bool]] = None
+    ) -> Optional[Any]:
+        """
+        Look up the most similar live entry for a text
+
+        Args:
+            key: Exact partition key
+            text: Text whose embedding is compared
+            accept: Optional predicate an entry's value must satisfy
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        entries = self._purge_expired(key)
+        if not entries or not text:
+            self.misses += 1
+            return None
+
+        vector = await self._embed(text)
+        # The partition may have been purged or replaced while embedding
+        entries = self._purge_expired(key)
+        if vector is None or not entries:
+            self.misses += 1
+            return None
+
+        similarities = self._matrix(key, entries) @ vector
+        for idx in self._ranked_candidates(similarities):
+            value = entries[idx][1]
+            if accept is None or accept(value):
+                self.hits += 1
+                logger.debug(f"[SemanticCache] Hit (similarity {similarities[idx]:.3f})")
+                return value
+
+        self.misses += 1
+        return None
+
+    async def get_many(
+        self,
+        key: Hashable,
+        texts: Sequence[str],
+        accept: Optional[Callable[[Any], bool]] = None
+    ) -> List[Optional[Any]]:
+        """
+        Look up several texts under one key with a single embedding call
+
+        Args:
+            key: Exact partition key
+            texts: Texts whose embeddings are compared
+            accept: Optional predicate an entry's value must satisfy
+
+        Returns:
+            Cached value or None for each text
+        """
+        entries = self._purge_expired(key)
+        if not entries or not texts:
+            self.misses += len(texts)
+            return [None] * len(texts)
+
+        vectors = await self._embed_many(texts)
+        # The partition may have been purged or replaced while embedding
+        entries = self._purge_expired(key)
+        valid = [i for i, v in enumerate(vectors) if v is not None]
+        results: List[Optional[Any]] = [None] * len(texts)
+
+        if valid and entries:
+            # One matrix product scores every text against every entry
+            similarities = np.stack([vectors[i] for i in valid]) @ self._matrix(key, entries).T
+            for row, text_idx in enumerate(valid):
+                for idx in self._ranked_candidates(similarities[row]):
+                    value = entries[idx][1]
+                    if accept is None or accept(value):
+                        results[text_idx] = value
+                        break
+
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        self.misses += len(texts) - hits
+        return results
+
+    async def set(self, key: Hashable, text: str, value: Any) -> None:
+        """
+        Store a value under a key and text
+
+        Args:
+            key: Exact partition key
+            text: Text whose embedding indexes the value
+            value: Value to cache
+        """
+        if not text:
+            return
+
+        await self.set_many(key, [text], [value])
+
+    async def set_many(self, key: Hashable, texts: Sequence[str], values: Sequence[Any]) -> None:
+        """
+        Store several values under one key with a single embedding call
+
+        Args:
+            key: Exact partition key
+            texts: Text indexing each value
+            values: Values to cache
+        """
+        vectors = await self._embed_many(texts)
+        self._purge_expired(key)
+        expires_at = time.monotonic() + self.ttl
+
+        for vector, value in zip(vectors, values):
+            if vector is None:
+                continue
+            if self._size >= self.max_entries:
+                self._evict_oldest()
+            self._entries.setdefault(key, []).append([vector, value, expires_at])
+            self._matrices.pop(key, None)
+            self._size += 1
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        embed_text: str,
+        compute: Callable[[], Awaitable[Any]],
+        accept: Optional[Callable[[Any], bool]] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Return a cached value or compute and store a new one
+
+        Args:
+            key: Exact partition key
+            embed_text: Text whose embedding is compared
+            compute: Async function producing the value on a miss
+            accept: Optional predicate a cached value must satisfy
+            cacheable: Optional predicate deciding whether to store a computed value
+
+        Returns:
+            Cached or freshly computed value
+        """
+        cached = await self.get(key, embed_text, accept)
+        if cached is not None:
+            return cached
+
+        value = await compute()
+        if cacheable is None or cacheable(value):
+            await self.set(key, embed_text, value)
+        return value
+
+    def _evict_oldest(self) -> None:
+        """Evict the entry closest to expiry"""
+        oldest_key, oldest_idx, oldest_expiry = None, -1, float("inf")
+        for key, entries in self._entries.items():
+            for idx, entry in enumerate(entries):
+                if entry[2] < oldest_expiry:
+                    oldest_key, oldest_idx, oldest_expiry = key, idx, entry[2]
+
+        if oldest_key is not None:
+            entries = self._entries[oldest_key]
+            entries.pop(oldest_idx)
+            self._matrices.pop(oldest_key, None)
+            if not entries:
+                del self._entries[oldest_key]
+            self._size -= 1
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._entries.clear()
+        self._matrices.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,100 @@
+"""
+TTL Cache
+Bounded in-memory LRU cache whose entries expire after a fixed time
+"""
+
+from typing import Any, Dict, Hashable, Optional
+from collections import OrderedDict
+import hashlib
+import time
+
+from app.utils.fast_json import dumps_canonical
+
+
+def stable_hash(payload: Any) -> str:
+    """
+    SHA-256 of a canonical JSON encoding of a payload
+
+    Args:
+        payload: JSON-serializable value (unknown types are stringified)
+
+    Returns:
+        Hex digest that is stable across dict ordering
+    """
+    return hashlib.sha256(dumps_canonical(payload)).hexdigest()
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry expiry.
+
+    Expired entries are dropped when read; the least recently used entry is
+    evicted once `maxsize` is exceeded.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        """
+        Args:
+            maxsize: Maximum number of entries
+            ttl: Seconds an entry stays valid
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at, value)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a live value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+        }
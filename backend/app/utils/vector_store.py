@@ -1,6 +1,6 @@
 """
 Vector Store
-Manages vector storage and similarity search using NumPy (no C++ dependencies)
+Manages vector storage and similarity search using NumPy, with an optional hnswlib graph for large indexes
 """
 
 from typing import List, Dict, Any, Optional
@@ -9,17 +9,32 @@ import os
 import json
 import numpy as np
 
+try:
+    import hnswlib
+    HAS_HNSWLIB = True
+except ImportError:
+    HAS_HNSWLIB = False
+    hnswlib = None
+
 from app.config import settings
 
 
 class VectorStore:
-    """Vector store using NumPy for cosine similarity search"""
+    """
+    Vector store using NumPy for cosine similarity search
+    
+    Large indexes are also loaded into an HNSW graph when hnswlib is
+    installed, turning each search into an approximate O(log n) lookup;
+    smaller indexes (or installs without hnswlib) use the exact scan.
+    """
     
     _vectors: Optional[np.ndarray] = None
+    _hnsw_index = None
     _initialized = False
     _id_to_metadata: Dict[int, Dict[str, Any]] = {}
     _content_id_to_index: Dict[str, int] = {}
     _next_id: int = 0
+    # Vectors added since the last build; built vectors live only in _vectors
     _vector_list: List[List[float]] = []
     
     async def initialize(self):
@@ -49,8 +64,9 @@ class VectorStore:
         # Load vectors
         vectors_path = settings.vector_index_path
         if os.path.exists(vectors_path):
-            self._vectors = np.load(vectors_path)
-            self._vector_list = self._vectors.tolist()
+            self._vectors = self._normalize(np.load(vectors_path).astype(np.float32, copy=False))
+            self._vector_list = []
+            self._build_ann_index()
         
         # Load metadata
         metadata_path = settings.vector_index_path + ".meta.json"
@@ -70,8 +86,7 @@ class VectorStore:
             os.makedirs(os.path.dirname(settings.vector_index_path), exist_ok=True)
             
             # Save vectors
-            if self._vector_list:
-                self._vectors = np.array(self._vector_list, dtype=np.float32)
+            if self._vectors is not None:
                 np.save(settings.vector_index_path, self._vectors)
             
             # Save metadata
@@ -110,7 +125,7 @@ class VectorStore:
             if vector_id in self._content_id_to_index:
                 return True
             
-            # Add to vector list
+            # Queue for the next build
             index_id = self._next_id
             self._vector_list.append(vector)
             
@@ -128,22 +143,21 @@ class VectorStore:
             return False
     
     async def build_index(self):
-        """Build the vector index (convert list to numpy array and save)"""
-        if not self._vector_list:
+        """Build the vector index (append queued vectors to the numpy array and save)"""
+        if not self._vector_list and self._vectors is None:
             logger.warning("No vectors to build index from")
             return False
         
         try:
-            # Convert to numpy array for efficient search
-            self._vectors = np.array(self._vector_list, dtype=np.float32)
-            
-            # Normalize vectors for cosine similarity
-            norms = np.linalg.norm(self._vectors, axis=1, keepdims=True)
-            norms[norms == 0] = 1  # Avoid division by zero
-            self._vectors = self._vectors / norms
+            # Only newly added vectors are converted; built ones are not kept as Python lists
+            if self._vector_list:
+                pending = self._normalize(np.array(self._vector_list, dtype=np.float32))
+                self._vectors = pending if self._vectors is None else np.concatenate((self._vectors, pending))
+                self._vector_list = []
             
             # Save index
             self._save_index()
+            self._build_ann_index()
             
             logger.info(f"Built and saved vector index with {self._next_id} vectors")
             return True
@@ -152,6 +166,45 @@ class VectorStore:
             logger.error(f"Failed to build index: {e}")
             return False
     
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows so dot products are cosine similarities"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1  # Avoid division by zero
+        return vectors / norms
+    
+    def _build_ann_index(self):
+        """Build the HNSW graph over the current vectors, or drop it for small indexes"""
+        self._hnsw_index = None
+        if not HAS_HNSWLIB or self._vectors is None or len(self._vectors) < settings.vector_ann_min_size:
+            return
+        
+        try:
+            # Inner product over the stored vectors matches the exact scan's scores
+            index = hnswlib.Index(space="ip", dim=self._vectors.shape[1])
+            index.init_index(
+                max_elements=len(self._vectors),
+                M=settings.vector_hnsw_m,
+                ef_construction=settings.vector_hnsw_ef_construction
+            )
+            index.add_items(self._vectors, np.arange(len(self._vectors)))
+            index.set_ef(settings.vector_hnsw_ef_search)
+            self._hnsw_index = index
+            logger.info(f"Built HNSW index over {len(self._vectors)} vectors")
+        except Exception as e:
+            logger.warning(f"Failed to build HNSW index, using exact search: {e}")
+    
+    def _ann_search(self, queries: np.ndarray, top_k: int, include_distances: bool) -> List[List[Dict[str, Any]]]:
+        """Approximate top-k for normalized query rows using the HNSW graph"""
+        k = min(top_k, len(self._vectors))
+        self._hnsw_index.set_ef(max(settings.vector_hnsw_ef_search, k))
+        labels, distances = self._hnsw_index.knn_query(queries, k=k)
+        # hnswlib's inner-product distance is 1 - dot
+        return [
+            self._build_results(row_labels, 1 - row_distances, include_distances)
+            for row_labels, row_distances in zip(labels, distances)
+        ]
+    
     async def search(
         self,
         query_vector: List[float],
@@ -179,32 +232,87 @@ class VectorStore:
             if query_norm > 0:
                 query = query / query_norm
             
+            if self._hnsw_index is not None:
+                return self._ann_search(query[np.newaxis, :], top_k, include_distances)[0]
+            
             # Compute cosine similarities (dot product of normalized vectors)
             similarities = np.dot(self._vectors, query)
             
-            # Get top-k indices
-            top_indices = np.argsort(similarities)[::-1][:top_k]
-            
-            results = []
-            for idx in top_indices:
-                idx = int(idx)
-                metadata = self._id_to_metadata.get(idx, {})
-                similarity = float(similarities[idx])
-                
-                results.append({
-                    "index_id": idx,
-                    "content_id": metadata.get("content_id"),
-                    "score": similarity,
-                    "distance": 1 - similarity if include_distances else None,
-                    **metadata
-                })
-            
-            return results
+            return self._top_results(similarities, top_k, include_distances)
             
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
     
+    async def search_batch(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int = 10,
+        include_distances: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several query vectors with a single matrix product
+        
+        Args:
+            query_vectors: Query embeddings
+            top_k: Number of results to return per query
+            include_distances: Whether to include distance scores
+            
+        Returns:
+            One result list per query vector, as returned by search()
+        """
+        if self._vectors is None or len(self._vectors) == 0 or not query_vectors:
+            return [[] for _ in query_vectors]
+        
+        try:
+            queries = np.array(query_vectors, dtype=np.float32)
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            queries = queries / norms
+            
+            if self._hnsw_index is not None:
+                return self._ann_search(queries, top_k, include_distances)
+            
+            # (num_queries, num_vectors) cosine similarities
+            similarities = queries @ self._vectors.T
+            
+            return [self._top_results(row, top_k, include_distances) for row in similarities]
+            
+        except Exception as e:
+            logger.error(f"Batch search failed: {e}")
+            return [[] for _ in query_vectors]
+    
+    def _top_results(
+        self,
+        similarities: np.ndarray,
+        top_k: int,
+        include_distances: bool
+    ) -> List[Dict[str, Any]]:
+        """Build result dicts for the top-k entries of a similarity vector"""
+        top_indices = np.argsort(similarities)[::-1][:top_k]
+        return self._build_results(top_indices, similarities[top_indices], include_distances)
+    
+    def _build_results(
+        self,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        include_distances: bool
+    ) -> List[Dict[str, Any]]:
+        """Build result dicts for vector indices and their similarity scores"""
+        results = []
+        for idx, similarity in zip(indices.tolist(), scores.tolist()):
+            metadata = self._id_to_metadata.get(idx, {})
+            
+            results.append({
+                "index_id": idx,
+                "content_id": metadata.get("content_id"),
+                "score": similarity,
+                "distance": 1 - similarity if include_distances else None,
+                **metadata
+            })
+        
+        return results
+    
     async def get_vector(self, vector_id: str) -> Optional[List[float]]:
         """Get a vector by its ID"""
         if self._vectors is None:
@@ -0,0 +1,21 @@
+"""
+Shared test fixtures
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.utils import rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_llm_limits(monkeypatch):
+    """Give each test its own LLM rate limiter and concurrency bound, as each runs its own event loop"""
+    monkeypatch.setattr(rate_limiter, "_llm_semaphore", asyncio.Semaphore(settings.llm_max_concurrency))
+    monkeypatch.setattr(
+        rate_limiter,
+        "_llm_rate_limiter",
+        rate_limiter.AsyncTokenBucket(settings.llm_requests_per_minute, burst=settings.llm_burst)
+    )
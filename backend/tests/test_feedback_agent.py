@@ -0,0 +1,49 @@
+"""
+Feedback Agent tests
+"""
+
+import asyncio
+import json
+
+from app.agents import feedback_agent
+from app.agents.feedback_agent import FeedbackAgent
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Models:
+    """Fake client.aio.models answering with the queued replies in order"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+
+    async def generate_content(self, model, contents, config=None):
+        return _Response(self.replies.pop(0))
+
+
+class _Client:
+    def __init__(self, models):
+        self.aio = type("Aio", (), {"models": models})()
+
+
+def test_unparseable_feedback_is_not_cached(monkeypatch):
+    monkeypatch.setattr(feedback_agent, "_feedback_cache", feedback_agent.TTLCache(maxsize=8, ttl=60))
+    agent = FeedbackAgent(_Client(_Models(["not json", json.dumps({"summary": "Well reasoned"})])))
+    evaluation = {"is_correct": True, "score": 8, "misconceptions": [], "knowledge_gaps": []}
+    query_analysis = {"topic": {"main": "Recursion"}}
+
+    async def scenario():
+        first = await agent._llm_generate_feedback(evaluation, query_analysis, {})
+        second = await agent._llm_generate_feedback(evaluation, query_analysis, {})
+        third = await agent._llm_generate_feedback(evaluation, query_analysis, {})
+        await agent.batcher.close()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first is None
+    assert second["summary"] == "Well reasoned"
+    # Served from the cache; the fake client has no replies left
+    assert third == second
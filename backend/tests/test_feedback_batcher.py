@@ -0,0 +1,91 @@
+"""
+Feedback Batcher tests
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+from app.agents.feedback_agent import FeedbackBatcher
+
+_ITEM_RE = re.compile(r"=== ITEM (\d+) ===\n(\S+)")
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Models:
+    """Fake client.aio.models answering each prompt with {"summary": <prompt>}"""
+
+    def __init__(self, item_numbers=None, delay=0.0):
+        self.item_numbers = item_numbers
+        self.delay = delay
+        self.batch_calls = 0
+        self.single_calls = 0
+
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.delay)
+        items = _ITEM_RE.findall(contents)
+        if not items:
+            self.single_calls += 1
+            return _Response(json.dumps({"summary": contents.split()[0]}))
+
+        self.batch_calls += 1
+        numbers = self.item_numbers or [int(number) for number, _ in items]
+        # Answer in reverse order; the echoed item numbers carry the mapping
+        answers = [{"item": number, "summary": prompt} for number, (_, prompt) in zip(numbers, items)]
+        return _Response(json.dumps(answers[::-1]))
+
+
+class _Client:
+    def __init__(self, models):
+        self.aio = type("Aio", (), {"models": models})()
+
+
+def _summaries(results):
+    return [json.loads(result)["summary"] for result in results]
+
+
+def test_batched_results_follow_item_numbers():
+    models = _Models()
+    batcher = FeedbackBatcher(_Client(models), max_batch=4, timeout_ms=20)
+
+    async def scenario():
+        results = await asyncio.gather(*(batcher.submit(f"prompt-{i}") for i in range(4)))
+        await batcher.close()
+        return results
+
+    assert _summaries(asyncio.run(scenario())) == [f"prompt-{i}" for i in range(4)]
+    assert (models.batch_calls, models.single_calls) == (1, 0)
+
+
+def test_unmatched_item_numbers_fall_back_to_single_calls():
+    models = _Models(item_numbers=[1, 1, 2])
+    batcher = FeedbackBatcher(_Client(models), max_batch=3, timeout_ms=20)
+
+    async def scenario():
+        results = await asyncio.gather(*(batcher.submit(f"prompt-{i}") for i in range(3)))
+        await batcher.close()
+        return results
+
+    assert _summaries(asyncio.run(scenario())) == [f"prompt-{i}" for i in range(3)]
+    assert (models.batch_calls, models.single_calls) == (1, 3)
+
+
+def test_close_fails_waiting_prompts():
+    batcher = FeedbackBatcher(_Client(_Models(delay=10)), max_batch=2, timeout_ms=10)
+
+    async def scenario():
+        # The first two are in flight, the third is still filling the next batch
+        waiters = [asyncio.ensure_future(batcher.submit(f"prompt-{i}")) for i in range(3)]
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(batcher.close(), 1)
+        return await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), 1)
+
+    results = asyncio.run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,197 @@
+"""
+Information Retrieval Agent ranking tests
+"""
+
+import asyncio
+import copy
+
+from app.agents.information_retrieval_agent import InformationRetrievalAgent, _reciprocal_rank_fusion
+from app.models.knowledge import KnowledgeSearchResult
+from app.services.knowledge_base import KnowledgeBaseService
+
+
+def _result(content_id, concepts, relevance_score=0.5):
+    return {
+        "content_id": content_id,
+        "content": content_id,
+        "concepts": concepts,
+        "relevance_score": relevance_score,
+        "source": "local_knowledge_base",
+    }
+
+
+def test_rank_results_leaves_context_untouched_and_follows_profile_changes():
+    agent = InformationRetrievalAgent()
+    results = [_result("recursion", ["Recursion"]), _result("sorting", ["Sorting"])]
+    context = {"learner_profile": {"weaknesses": ["recursion"], "knowledge_gaps": []}}
+    snapshot = copy.deepcopy(context)
+
+    ranked = agent._rank_results(results, {}, context)
+    assert [r["content_id"] for r in ranked] == ["recursion", "sorting"]
+    assert context == snapshot
+
+    # The same context with an updated profile must be ranked against the new profile
+    context["learner_profile"] = {"weaknesses": [], "knowledge_gaps": ["sorting"]}
+    ranked = agent._rank_results(results, {}, context)
+    assert [r["content_id"] for r in ranked] == ["sorting", "recursion"]
+
+
+def test_fusion_weighting_decides_the_order():
+    agent = InformationRetrievalAgent()
+    local = [_result("local", [], relevance_score=0.2)]
+    tavily = [{**_result("web", [], relevance_score=0.9), "source": "tavily_search"}]
+
+    for weights, expected in (((0.7, 0.3), ["local", "web"]), ((0.3, 0.7), ["web", "local"])):
+        fused = _reciprocal_rank_fusion([local, tavily], weights)
+        ranked = agent._rank_results(fused, {}, {})
+        assert [r["content_id"] for r in ranked] == expected
+
+
+def test_bm25_hits_do_not_outrank_semantic_hits_on_relative_scores(monkeypatch):
+    def hit(content_id, relevance_score):
+        return KnowledgeSearchResult(
+            content_id=content_id,
+            content_text=content_id,
+            content_summary="",
+            topic="Cryptography",
+            difficulty="medium",
+            relevance_score=relevance_score,
+            concepts=[],
+        )
+
+    async def search_many(**kwargs):
+        return [hit("semantic", 0.6)]
+
+    async def bm25_search(query, **kwargs):
+        # The best keyword hit always scores 1.0
+        return [hit("keyword", 1.0)]
+
+    monkeypatch.setattr(KnowledgeBaseService, "search_many", search_many)
+    monkeypatch.setattr(KnowledgeBaseService, "bm25_search", bm25_search)
+
+    agent = InformationRetrievalAgent(knowledge_service=KnowledgeBaseService)
+    results = asyncio.run(agent._local_retrieval("AES-256", "Cryptography", "medium", {}, "text"))
+    keyword = next(r for r in results if r["content_id"] == "keyword")
+    assert "relevance_score" not in keyword
+
+    ranked = agent._rank_results(results, {}, {})
+    assert [r["content_id"] for r in ranked] == ["semantic", "keyword"]
+
+
+def test_served_chunks_are_counted_once(monkeypatch):
+    def hit(content_id):
+        return KnowledgeSearchResult(
+            content_id=content_id,
+            content_text=content_id,
+            content_summary="",
+            topic="Cryptography",
+            difficulty="medium",
+            relevance_score=0.8,
+            concepts=[],
+        )
+
+    async def search_many(**kwargs):
+        return [hit(f"semantic-{i}") for i in range(6)]
+
+    async def bm25_search(query, **kwargs):
+        return [hit("semantic-0"), hit("keyword")]
+
+    recorded = []
+
+    async def record_retrievals(content_ids):
+        recorded.append(list(content_ids))
+
+    monkeypatch.setattr(KnowledgeBaseService, "search_many", search_many)
+    monkeypatch.setattr(KnowledgeBaseService, "bm25_search", bm25_search)
+    monkeypatch.setattr(KnowledgeBaseService, "record_retrievals", record_retrievals)
+
+    agent = InformationRetrievalAgent(knowledge_service=KnowledgeBaseService)
+    agent.tavily_client = None
+    query_analysis = {"topic": {"main": "Cryptography", "subject": "Computer Science"}}
+    result = asyncio.run(agent.retrieve(query_analysis, {}))
+
+    served = [chunk["content_id"] for chunk in result["content_chunks"]]
+    assert recorded == [served]
+    assert len(set(served)) == len(served) == 5
+
+
+class _WebStubAgent(InformationRetrievalAgent):
+    """Agent whose Tavily search returns fixed results after a short delay"""
+
+    def __init__(self, web_results):
+        super().__init__(knowledge_service=KnowledgeBaseService)
+        self.web_results = web_results
+        self.web_started = 0
+        self.web_finished = 0
+
+    async def _tavily_dynamic_search(self, **kwargs):
+        self.web_started += 1
+        await asyncio.sleep(0.05)
+        self.web_finished += 1
+        return self.web_results
+
+
+def _patch_local_search(monkeypatch, count):
+    async def search_many(**kwargs):
+        return [
+            KnowledgeSearchResult(
+                content_id=f"local-{i}",
+                content_text=f"local-{i}",
+                content_summary="",
+                topic="Cryptography",
+                difficulty="medium",
+                relevance_score=0.8,
+                concepts=[],
+            )
+            for i in range(count)
+        ]
+
+    async def bm25_search(query, **kwargs):
+        return []
+
+    async def record_retrievals(content_ids):
+        pass
+
+    monkeypatch.setattr(KnowledgeBaseService, "search_many", search_many)
+    monkeypatch.setattr(KnowledgeBaseService, "bm25_search", bm25_search)
+    monkeypatch.setattr(KnowledgeBaseService, "record_retrievals", record_retrievals)
+
+
+_WEB_RESULT = {"content": "web", "concepts": [], "relevance_score": 0.9, "source": "tavily_ai_answer"}
+_QUERY_ANALYSIS = {"topic": {"main": "Cryptography", "subject": "Computer Science"}}
+
+
+def test_tavily_is_cancelled_when_local_results_fill_the_ranking(monkeypatch):
+    _patch_local_search(monkeypatch, 6)
+    agent = _WebStubAgent([_WEB_RESULT])
+
+    result = asyncio.run(agent.retrieve(_QUERY_ANALYSIS, {}))
+
+    assert (agent.web_started, agent.web_finished) == (1, 0)
+    assert [chunk["content_id"] for chunk in result["content_chunks"]] == [f"local-{i}" for i in range(5)]
+
+
+def test_tavily_is_not_started_when_prefetched_local_results_fill_the_ranking(monkeypatch):
+    _patch_local_search(monkeypatch, 6)
+    agent = _WebStubAgent([_WEB_RESULT])
+
+    async def scenario():
+        local = await agent.retrieve_local(_QUERY_ANALYSIS, {})
+        return await agent.retrieve(_QUERY_ANALYSIS, {}, local=local)
+
+    result = asyncio.run(scenario())
+
+    assert agent.web_started == 0
+    assert len(result["content_chunks"]) == 5
+
+
+def test_tavily_results_fill_slots_local_results_leave_open(monkeypatch):
+    _patch_local_search(monkeypatch, 2)
+    agent = _WebStubAgent([_WEB_RESULT])
+
+    result = asyncio.run(agent.retrieve(_QUERY_ANALYSIS, {}))
+
+    assert agent.web_finished == 1
+    assert [chunk.get("content_id", chunk["content"]) for chunk in result["content_chunks"]] == [
+        "local-0", "local-1", "web"
+    ]
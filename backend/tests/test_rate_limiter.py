@@ -0,0 +1,56 @@
+"""
+Rate Limiter tests
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.utils.rate_limiter import AsyncTokenBucket, llm_request_slot
+
+
+def test_burst_then_paced():
+    async def scenario():
+        bucket = AsyncTokenBucket(600, burst=2)  # 10 tokens per second
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert 0.08 <= asyncio.run(scenario()) < 0.5
+
+
+def test_non_positive_rate_disables_limiting():
+    async def scenario():
+        bucket = AsyncTokenBucket(0, burst=1)
+        for _ in range(100):
+            await bucket.acquire()
+
+    asyncio.run(scenario())
+
+
+def test_acquire_more_than_capacity_raises():
+    with pytest.raises(ValueError):
+        asyncio.run(AsyncTokenBucket(60, burst=2).acquire(3))
+
+
+def test_llm_request_slot_bounds_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def request():
+        nonlocal in_flight, peak
+        async with llm_request_slot():
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    async def scenario():
+        # Stays within the default burst, so only the concurrency bound applies
+        await asyncio.gather(*(request() for _ in range(settings.llm_max_concurrency + 2)))
+
+    asyncio.run(scenario())
+    assert peak == settings.llm_max_concurrency
@@ -0,0 +1,94 @@
+"""
+Semantic Cache tests
+"""
+
+import asyncio
+
+from app.utils.semantic_cache import SemanticCache
+
+KEY = ("model", "medium")
+VECTORS = {
+    "binary trees": [1.0, 0.0, 0.0],
+    "hash tables": [0.0, 1.0, 0.0],
+    "sorting": [0.0, 0.0, 1.0],
+}
+
+
+def make_cache(on_embed=None) -> SemanticCache:
+    """Cache over fixed vectors; `on_embed(text)` runs while an embedding is awaited"""
+    async def embed(text):
+        await asyncio.sleep(0)
+        if on_embed is not None:
+            on_embed(text)
+        return VECTORS[text]
+
+    return SemanticCache(embed, threshold=0.9, ttl=60)
+
+
+def test_hit_and_miss():
+    async def scenario():
+        cache = make_cache()
+        await cache.set(KEY, "binary trees", "trees")
+        assert await cache.get(KEY, "binary trees") == "trees"
+        assert await cache.get(KEY, "hash tables") is None
+        assert await cache.get(("other",), "binary trees") is None
+
+    asyncio.run(scenario())
+
+
+def test_get_many_matches_each_text():
+    async def scenario():
+        cache = make_cache()
+        await cache.set_many(KEY, ["binary trees", "hash tables"], ["trees", "hashing"])
+        assert await cache.get_many(KEY, ["hash tables", "sorting", "binary trees"]) == [
+            "hashing", None, "trees"
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_partition_replaced_during_embedding():
+    """A lookup must not pair its stale entry list with a matrix built for the replacement"""
+    cache = None
+
+    def replace_partition(text):
+        if text != "binary trees":
+            return
+        # Same length, different order: what a purge/rewrite racing the lookup leaves behind
+        cache._entries[KEY] = list(reversed(cache._entries[KEY]))
+        cache._matrices.pop(KEY, None)
+        # A concurrent lookup caches the matrix of the new list
+        cache._matrix(KEY, cache._entries[KEY])
+
+    async def scenario():
+        nonlocal cache
+        cache = make_cache(replace_partition)
+        await cache.set_many(KEY, ["hash tables", "sorting"], ["hashing", "sorting"])
+        await cache.set(KEY, "binary trees", "trees")
+        # Warm the matrix for the original list
+        assert await cache.get(KEY, "sorting") == "sorting"
+
+        cache._vector_memo.clear()
+        assert await cache.get(KEY, "binary trees") == "trees"
+        cache._vector_memo.clear()
+        assert await cache.get_many(KEY, ["binary trees", "hash tables"]) == ["trees", "hashing"]
+
+    asyncio.run(scenario())
+
+
+def test_partition_expired_during_embedding():
+    cache = None
+
+    def expire_partition(text):
+        for entry in cache._entries.get(KEY, []):
+            entry[2] = 0
+
+    async def scenario():
+        nonlocal cache
+        cache = make_cache(expire_partition)
+        await cache.set(KEY, "binary trees", "trees")
+        cache._vector_memo.clear()
+        assert await cache.get(KEY, "binary trees") is None
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(scenario())